@@ -0,0 +1,768 @@
+"""Benchmark suite for scoring, serialization and repositories.
+
+Every benchmark sets up its data once and then times a single operation repeatedly. Results can be
+saved per git commit and compared against a baseline, so regressions show up as numbers.
+
+Usage:
+    python -m scripts.benchmark                      # run everything available
+    python -m scripts.benchmark -k calc_score        # run benchmarks matching a substring
+    python -m scripts.benchmark --save               # save to .benchmarks/<commit>.json
+    python -m scripts.benchmark --compare baseline   # compare with .benchmarks/baseline.json
+
+Repository benchmarks need a migrated and seeded Postgres (see `scripts.generate_data`), auth
+and live feed benchmarks need Redis. Both use the same environment variables as the server (see `.env.dist`)
+and are skipped when `POSTGRES_HOST` / `REDIS_HOST` are not set.
+"""
+
+import argparse
+import asyncio
+import dataclasses
+import inspect
+import json
+import multiprocessing
+import os
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import AsyncExitStack
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+import httpx
+import pydantic_core
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from pydantic import TypeAdapter
+from redis.asyncio import Redis
+from sqlalchemy import URL, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from server.db import models as db_models
+from server.middlewares.compression import make_compressor
+from server.models.game import Game, GamePlayer
+from server.models.page import PaginatedResponse
+from server.models.score import ScoreRow
+from server.repo.base import BaseRepo
+from server.repo.cache import AuthRepo, SignedAuthRepo
+from server.repo.db import GamesRepo, PlayersRepo, TablesRepo
+from server.routes import health
+from server.utils.calc_score import ScoreCalculator, TournamentGame, calc_score, compact_games
+from server.utils.live_feed import LiveFeed
+from server.utils.model_construct import construct, set_validation_enabled
+from server.utils.responses import FastJSONResponse
+from server.utils.security import sign_access_token
+from server.utils.settings import Settings
+
+from .generate_data import DataGenerator
+
+_RESULTS_DIR = Path(__file__).parent.parent / ".benchmarks"
+
+type Operation = Callable[[], Any]
+type Setup = Callable[["BenchmarkContext"], Awaitable[Operation]]
+
+
+@dataclasses.dataclass(kw_only=True)
+class Benchmark:
+    name: str
+    setup: Setup
+    requires: frozenset[str]
+
+
+@dataclasses.dataclass(kw_only=True)
+class BenchmarkResult:
+    name: str
+    rounds: int
+    min: float
+    median: float
+    mean: float
+    stdev: float
+    extra: dict[str, Any] = dataclasses.field(default_factory=dict)
+
+
+class BenchmarkContext:
+    """Lazily created resources shared between benchmarks of a single run."""
+
+    def __init__(self, exit_stack: AsyncExitStack) -> None:
+        # Benchmarks may keep their resources open until the end of the run here
+        self.exit_stack = exit_stack
+        self._settings: Settings | None = None
+        self._db_sessions: async_sessionmaker[AsyncSession] | None = None
+        self._redis: Redis | None = None
+        self._process_pool: ProcessPoolExecutor | None = None
+        self._generated: dict[int, list[TournamentGame]] = {}
+        # Benchmarks may report additional numbers (e.g. allocations) here
+        self.extra: dict[str, Any] = {}
+
+    @property
+    def settings(self) -> Settings:
+        if self._settings is None:
+            self._settings = Settings.from_env()
+        return self._settings
+
+    @property
+    def db_sessions(self) -> async_sessionmaker[AsyncSession]:
+        if self._db_sessions is None:
+            env = self.settings
+            engine = create_async_engine(
+                URL.create(
+                    drivername="postgresql+asyncpg",
+                    username=env.postgres_user,
+                    password=env.postgres_password,
+                    host=env.postgres_host,
+                    port=env.postgres_port,
+                    database=env.postgres_db,
+                )
+            )
+            self.exit_stack.push_async_callback(engine.dispose)
+            self._db_sessions = async_sessionmaker(engine)
+        return self._db_sessions
+
+    @property
+    def redis(self) -> Redis:
+        if self._redis is None:
+            env = self.settings
+            self._redis = Redis(
+                host=env.redis_host,
+                port=env.redis_port,
+                db=env.redis_db,
+                password=env.redis_password,
+            )
+            self.exit_stack.push_async_callback(self._redis.aclose)
+        return self._redis
+
+    @property
+    def process_pool(self) -> ProcessPoolExecutor:
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            self.exit_stack.callback(self._process_pool.shutdown)
+        return self._process_pool
+
+    def tournament_games(self, count: int) -> list[TournamentGame]:
+        """Returns `count` generated games played by `count // 4` players (at least 10)."""
+        if count not in self._generated:
+            generator = DataGenerator(seed=count, player_count=max(count // 4, 10))
+            self._generated[count] = generator.generate_tournament_games(count)
+        return self._generated[count]
+
+
+_BENCHMARKS: list[Benchmark] = []
+
+
+def benchmark(name: str, *, requires: set[str] | None = None) -> Callable[[Setup], Setup]:
+    def decorator(setup: Setup) -> Setup:
+        _BENCHMARKS.append(Benchmark(name=name, setup=setup, requires=frozenset(requires or ())))
+        return setup
+
+    return decorator
+
+
+# region Scoring
+
+
+def _register_calc_score(size: int) -> None:
+    @benchmark(f"calc_score[{size} games]")
+    async def bench(ctx: BenchmarkContext) -> Operation:
+        games = ctx.tournament_games(size)
+        return lambda: calc_score(games)
+
+
+for _size in (100, 1_000, 10_000):
+    _register_calc_score(_size)
+
+
+def _p99(latencies: list[float]) -> float:
+    if len(latencies) < 2:
+        return max(latencies)
+    return statistics.quantiles(latencies, n=100, method="inclusive")[98]
+
+
+_HEALTH_POLL_INTERVAL = 0.01
+
+
+async def _poll_health(
+    client: httpx.AsyncClient,
+    *,
+    done: Callable[[list[float]], bool],
+) -> list[float]:
+    latencies: list[float] = []
+    while not done(latencies):
+        # A blocked event loop delays a request before it is even sent, so the delay of waking up
+        # after the poll interval counts as latency too
+        start = time.perf_counter()
+        await asyncio.sleep(_HEALTH_POLL_INTERVAL)
+        (await client.get("/health")).raise_for_status()
+        latencies.append(time.perf_counter() - start - _HEALTH_POLL_INTERVAL)
+    return latencies
+
+
+def _register_health_during_scoring(*, offload: bool, size: int = 100_000) -> None:
+    mode = "offloaded" if offload else "inline"
+
+    @benchmark(f"health_during_scoring[{mode}, {size} games]")
+    async def bench(ctx: BenchmarkContext) -> Operation:
+        # Repeating generated games is much cheaper than generating all of them, scoring cost and
+        # payload size are the same
+        seats = compact_games(ctx.tournament_games(10_000)) * (size // 10_000)
+        calculator = ScoreCalculator(
+            executor=ctx.process_pool if offload else None,
+            offload_threshold=0,
+        )
+        app = FastAPI()
+        app.include_router(health.router)
+        transport = httpx.ASGITransport(app=app)
+
+        async def operation() -> None:
+            """Polls the liveness check while a ranking is computed, reports its p99 latency."""
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                idle = await _poll_health(client, done=lambda latencies: len(latencies) >= 50)
+                scoring = asyncio.create_task(calculator(seats))
+                busy = await _poll_health(client, done=lambda _: scoring.done())
+                await scoring
+            ctx.extra["health_idle_p99_ms"] = round(_p99(idle) * 1000, 2)
+            ctx.extra["health_p99_ms"] = round(_p99(busy) * 1000, 2)
+            ctx.extra["health_requests"] = len(busy)
+
+        return operation
+
+
+_register_health_during_scoring(offload=False)
+_register_health_during_scoring(offload=True)
+
+
+# endregion
+# region Serialization
+
+
+def _fastapi_default_encode(type_: Any, content: Any) -> Callable[[], bytes]:
+    """Reproduces what FastAPI does with a value returned from an endpoint."""
+    field = create_response_field(name="Response", type_=type_)
+
+    async def encode() -> bytes:
+        serialized = await serialize_response(field=field, response_content=content)
+        return JSONResponse(serialized).body
+
+    return encode
+
+
+def _fast_encode(type_: Any, content: Any) -> Callable[[], bytes]:
+    """Reproduces what `FastResponseRoute` does with a value returned from an endpoint."""
+    adapter = TypeAdapter(type_)
+    return lambda: FastJSONResponse(content, adapter=adapter).body
+
+
+def _register_serialization(size: int) -> None:
+    @benchmark(f"serialize_scores[{size} games]")
+    async def bench_scores(ctx: BenchmarkContext) -> Operation:
+        score = calc_score(ctx.tournament_games(size))
+        ctx.extra["rows"] = len(score)
+        response = PaginatedResponse[ScoreRow](page=1, total_pages=1, result=score)
+        return _fastapi_default_encode(PaginatedResponse[ScoreRow], response)
+
+    @benchmark(f"serialize_scores_fast[{size} games]")
+    async def bench_scores_fast(ctx: BenchmarkContext) -> Operation:
+        score = calc_score(ctx.tournament_games(size))
+        return _fast_encode(
+            PaginatedResponse[ScoreRow],
+            PaginatedResponse(page=1, total_pages=1, result=score),
+        )
+
+    @benchmark(f"serialize_games[{size} games]")
+    async def bench_games(ctx: BenchmarkContext) -> Operation:
+        games = [game.game for game in ctx.tournament_games(size)]
+        response = PaginatedResponse[Game](page=1, total_pages=1, result=games)
+        return _fastapi_default_encode(PaginatedResponse[Game], response)
+
+    @benchmark(f"serialize_games_fast[{size} games]")
+    async def bench_games_fast(ctx: BenchmarkContext) -> Operation:
+        games = [game.game for game in ctx.tournament_games(size)]
+        return _fast_encode(
+            PaginatedResponse[Game],
+            PaginatedResponse(page=1, total_pages=1, result=games),
+        )
+
+
+for _size in (1_000, 10_000):
+    _register_serialization(_size)
+
+
+# endregion
+# region Compression
+
+
+def _register_compression(payload: str, encoding: str, level: int, *, size: int = 1_000) -> None:
+    @benchmark(f"compress_{payload}[{encoding}-{level}, {size} games]")
+    async def bench(ctx: BenchmarkContext) -> Operation:
+        if payload == "scores":
+            content = calc_score(ctx.tournament_games(size))
+        else:
+            content = [game.game for game in ctx.tournament_games(size)]
+        body = FastJSONResponse(PaginatedResponse(page=1, total_pages=1, result=content)).body
+
+        def operation() -> None:
+            compressor = make_compressor(encoding, level)
+            compressed = compressor.compress(body) + compressor.finish()
+            ctx.extra["original_kib"] = round(len(body) / 1024, 1)
+            ctx.extra["compressed_kib"] = round(len(compressed) / 1024, 1)
+            ctx.extra["saved_percent"] = round((1 - len(compressed) / len(body)) * 100, 1)
+
+        return operation
+
+
+for _payload in ("scores", "games"):
+    for _encoding, _level in (
+        ("gzip", 1),
+        ("gzip", 5),
+        ("gzip", 9),
+        ("br", 1),
+        ("br", 4),
+        ("br", 6),
+        ("zstd", 1),
+        ("zstd", 3),
+        ("zstd", 9),
+    ):
+        _register_compression(_payload, _encoding, _level)
+
+
+# endregion
+# region Model construction
+
+
+def _register_model_construction(*, validate: bool, size: int = 10_000) -> None:
+    mode = "validated" if validate else "trusted"
+
+    @benchmark(f"construct_games[{mode}, {size} games]")
+    async def bench(ctx: BenchmarkContext) -> Operation:
+        # Rows shaped the way `GamesRepo._db_to_model` receives them from the database
+        rows = [
+            (
+                str(uuid.UUID(int=number)),
+                number,
+                str(uuid.UUID(int=0)),
+                [(game_player.nickname, game_player.role) for game_player in game.game.players],
+            )
+            for number, game in enumerate(ctx.tournament_games(size), start=1)
+        ]
+
+        def operation() -> list[Game]:
+            set_validation_enabled(validate)
+            try:
+                return [
+                    construct(
+                        Game,
+                        id=uuid.UUID(game_id),
+                        number=number,
+                        table_id=uuid.UUID(table_id),
+                        players=[
+                            construct(GamePlayer, nickname=nickname, role=role)
+                            for nickname, role in players
+                        ],
+                    )
+                    for game_id, number, table_id, players in rows
+                ]
+            finally:
+                set_validation_enabled(False)
+
+        tracemalloc.start()
+        operation()
+        ctx.extra["peak_kib"] = tracemalloc.get_traced_memory()[1] // 1024
+        tracemalloc.stop()
+        return operation
+
+
+_register_model_construction(validate=True)
+_register_model_construction(validate=False)
+
+
+# endregion
+# region Repositories
+
+
+async def _largest_tournament(ctx: BenchmarkContext) -> tuple[str, str, str]:
+    """Returns IDs of the tournament with most tables, of its first table and of a finished game."""
+    async with ctx.db_sessions() as session:
+        tournament_id = (
+            await session.execute(
+                select(db_models.Table.tournament_id)
+                .group_by(db_models.Table.tournament_id)
+                .order_by(func.count().desc())
+                .limit(1)
+            )
+        ).scalar_one_or_none()
+        if tournament_id is None:
+            raise RuntimeError("Database is empty, seed it with scripts.generate_data first")
+        table_id = (
+            await session.execute(
+                select(db_models.Table.id)
+                .where(db_models.Table.tournament_id == tournament_id)
+                .order_by(db_models.Table.number)
+                .limit(1)
+            )
+        ).scalar_one()
+        game_id = (
+            await session.execute(
+                select(db_models.Game.id)
+                .join(db_models.GameResult)
+                .where(db_models.Game.table_id == table_id)
+                .limit(1)
+            )
+        ).scalar_one()
+    return tournament_id, table_id, game_id
+
+
+# fmt: off
+def _repo_operation[R: BaseRepo[AsyncSession]](
+    ctx: BenchmarkContext,
+    repo_type: type[R],
+    call: Callable[[R], Awaitable[Any]],
+) -> Operation:
+    # fmt: on
+    """Runs `call` on a fresh session every time, the same way a request does."""
+
+    async def operation() -> None:
+        async with ctx.db_sessions() as session:
+            await call(repo_type(session))
+
+    return operation
+
+
+@benchmark("GamesRepo.get_by_id", requires={"postgres"})
+async def bench_games_get_by_id(ctx: BenchmarkContext) -> Operation:
+    _, _, game_id = await _largest_tournament(ctx)
+    return _repo_operation(ctx, GamesRepo, lambda repo: repo.get_by_id(game_id))
+
+
+@benchmark("GamesRepo.get_result", requires={"postgres"})
+async def bench_games_get_result(ctx: BenchmarkContext) -> Operation:
+    _, _, game_id = await _largest_tournament(ctx)
+    return _repo_operation(ctx, GamesRepo, lambda repo: repo.get_result(game_id))
+
+
+@benchmark("GamesRepo.get_by_table", requires={"postgres"})
+async def bench_games_get_by_table(ctx: BenchmarkContext) -> Operation:
+    _, table_id, _ = await _largest_tournament(ctx)
+    return _repo_operation(ctx, GamesRepo, lambda repo: repo.get_by_table(table_id))
+
+
+@benchmark("TablesRepo.get_by_id", requires={"postgres"})
+async def bench_tables_get_by_id(ctx: BenchmarkContext) -> Operation:
+    _, table_id, _ = await _largest_tournament(ctx)
+    return _repo_operation(ctx, TablesRepo, lambda repo: repo.get_by_id(table_id))
+
+
+@benchmark("TablesRepo.get_by_tournament", requires={"postgres"})
+async def bench_tables_get_by_tournament(ctx: BenchmarkContext) -> Operation:
+    tournament_id, _, _ = await _largest_tournament(ctx)
+    return _repo_operation(ctx, TablesRepo, lambda repo: repo.get_by_tournament(tournament_id))
+
+
+async def _median_nickname(ctx: BenchmarkContext) -> str:
+    async with ctx.db_sessions() as session:
+        count = (await session.execute(select(func.count()).select_from(db_models.Player))).scalar()
+        if not count:
+            raise RuntimeError("Database is empty, seed it with scripts.generate_data first")
+        return (
+            await session.execute(
+                select(db_models.Player.nickname)
+                .order_by(db_models.Player.nickname)
+                .offset(count // 2)
+                .limit(1)
+            )
+        ).scalar_one()
+
+
+@benchmark("PlayersRepo.search[prefix]", requires={"postgres"})
+async def bench_players_search_prefix(ctx: BenchmarkContext) -> Operation:
+    nickname = await _median_nickname(ctx)
+    text_ = nickname[: max(len(nickname) - 2, 1)].upper()
+    return _repo_operation(ctx, PlayersRepo, lambda repo: repo.search(text_, limit=10))
+
+
+@benchmark("PlayersRepo.search[typo]", requires={"postgres"})
+async def bench_players_search_typo(ctx: BenchmarkContext) -> Operation:
+    nickname = await _median_nickname(ctx)
+    text_ = "x" + nickname[1:]  # No nickname starts with it, so only the trigram index matches
+    return _repo_operation(ctx, PlayersRepo, lambda repo: repo.search(text_, limit=10))
+
+
+# endregion
+# region Auth
+
+
+_BENCH_USER_ID = "00000000-0000-0000-0000-00000000be9c"
+_BENCH_AUTH_SECRET = b"benchmark"
+
+
+def _signed_auth_repo(redis: Redis) -> SignedAuthRepo:
+    return SignedAuthRepo(redis, secret=_BENCH_AUTH_SECRET, access_expire=timedelta(minutes=5))
+
+
+@benchmark("AuthRepo.save_user_auth", requires={"redis"})
+async def bench_auth_save(ctx: BenchmarkContext) -> Operation:
+    repo = AuthRepo(ctx.redis)
+    await repo.revoke_all_tokens(_BENCH_USER_ID)
+
+    async def operation() -> None:
+        await repo.save_user_auth(_BENCH_USER_ID)
+
+    return operation
+
+
+@benchmark("AuthRepo.get_user_id_by_auth", requires={"redis"})
+async def bench_auth_get_user_id(ctx: BenchmarkContext) -> Operation:
+    repo = AuthRepo(ctx.redis)
+    token, _ = await repo.save_user_auth(_BENCH_USER_ID)
+    return lambda: repo.get_user_id_by_auth(token)
+
+
+@benchmark("AuthRepo.update_tokens_by_refresh", requires={"redis"})
+async def bench_auth_refresh(ctx: BenchmarkContext) -> Operation:
+    repo = AuthRepo(ctx.redis)
+    await repo.revoke_all_tokens(_BENCH_USER_ID)
+    _, refresh = await repo.save_user_auth(_BENCH_USER_ID)
+
+    async def operation() -> None:
+        nonlocal refresh
+        tokens = await repo.update_tokens_by_refresh(refresh)
+        assert tokens is not None
+        refresh = tokens[1]
+
+    return operation
+
+
+@benchmark("SignedAuthRepo.save_user_auth", requires={"redis"})
+async def bench_signed_auth_save(ctx: BenchmarkContext) -> Operation:
+    repo = _signed_auth_repo(ctx.redis)
+
+    async def operation() -> None:
+        await repo.save_user_auth(_BENCH_USER_ID)
+
+    return operation
+
+
+@benchmark("SignedAuthRepo.get_user_id_by_auth")
+async def bench_signed_auth_get_user_id(ctx: BenchmarkContext) -> Operation:
+    # Access tokens are verified locally, the client never connects
+    repo = _signed_auth_repo(Redis())
+    token = sign_access_token(_BENCH_AUTH_SECRET, _BENCH_USER_ID, expires_at=2**40)
+    return lambda: repo.get_user_id_by_auth(token)
+
+
+@benchmark("SignedAuthRepo.update_tokens_by_refresh", requires={"redis"})
+async def bench_signed_auth_refresh(ctx: BenchmarkContext) -> Operation:
+    repo = _signed_auth_repo(ctx.redis)
+    _, refresh = await repo.save_user_auth(_BENCH_USER_ID)
+
+    async def operation() -> None:
+        nonlocal refresh
+        tokens = await repo.update_tokens_by_refresh(refresh)
+        assert tokens is not None
+        refresh = tokens[1]
+
+    return operation
+
+
+# endregion
+# region Live feed
+
+
+_LIVE_VIEWERS = 1_000
+
+
+@benchmark(f"LiveFeed.publish_update[{_LIVE_VIEWERS} viewers]", requires={"redis"})
+async def bench_live_feed_publish_update(ctx: BenchmarkContext) -> Operation:
+    tournament_id = str(uuid.uuid4())
+    standings = pydantic_core.to_json(calc_score(ctx.tournament_games(100)))
+    computations = 0
+
+    async def compute_standings(_: str) -> bytes:
+        nonlocal computations
+        computations += 1
+        return standings
+
+    feed = LiveFeed(ctx.redis, compute_standings)
+    ctx.exit_stack.push_async_callback(feed.close)
+    queues = [
+        await ctx.exit_stack.enter_async_context(feed.subscribe(tournament_id))
+        for _ in range(_LIVE_VIEWERS)
+    ]
+
+    async def operation() -> None:
+        """Publishes a result and waits until every viewer got it and the new standings."""
+        before = computations
+        await feed.publish_update(tournament_id, "result", b"{}")
+        for queue in queues:
+            await queue.get()
+            await queue.get()
+        ctx.extra["computations_per_update"] = computations - before
+
+    return operation
+
+
+# endregion
+
+
+async def _time_once(operation: Operation) -> float:
+    start = time.perf_counter()
+    result = operation()
+    if inspect.isawaitable(result):
+        await result
+    return time.perf_counter() - start
+
+
+async def _run_benchmark(
+    bench: Benchmark,
+    ctx: BenchmarkContext,
+    *,
+    min_time: float,
+    min_rounds: int,
+) -> BenchmarkResult:
+    ctx.extra = {}
+    operation = await bench.setup(ctx)
+    await _time_once(operation)  # warm-up
+    timings: list[float] = []
+    deadline = time.perf_counter() + min_time
+    while len(timings) < min_rounds or time.perf_counter() < deadline:
+        timings.append(await _time_once(operation))
+    return BenchmarkResult(
+        name=bench.name,
+        rounds=len(timings),
+        min=min(timings),
+        median=statistics.median(timings),
+        mean=statistics.fmean(timings),
+        stdev=statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        extra=ctx.extra,
+    )
+
+
+async def _run(
+    benchmarks: list[Benchmark],
+    *,
+    min_time: float,
+    min_rounds: int,
+) -> AsyncIterator[BenchmarkResult]:
+    async with AsyncExitStack() as exit_stack:
+        ctx = BenchmarkContext(exit_stack)
+        for bench in benchmarks:
+            yield await _run_benchmark(bench, ctx, min_time=min_time, min_rounds=min_rounds)
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("µs", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3f} {unit}"
+    return f"{seconds / 1e-9:.1f} ns"
+
+
+def _load_results(ref: str) -> dict[str, BenchmarkResult]:
+    path = Path(ref) if ref.endswith(".json") else _RESULTS_DIR / f"{ref}.json"
+    data = json.loads(path.read_text())
+    return {item["name"]: BenchmarkResult(**item) for item in data["results"]}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-k", dest="pattern", help="only run benchmarks containing this string")
+    parser.add_argument("--list", action="store_true", help="list benchmarks and exit")
+    parser.add_argument("--min-time", type=float, default=1.0, help="seconds per benchmark")
+    parser.add_argument("--min-rounds", type=int, default=5)
+    parser.add_argument(
+        "--save",
+        nargs="?",
+        const="",
+        metavar="NAME",
+        help="save results to .benchmarks/NAME.json, NAME defaults to the current commit",
+    )
+    parser.add_argument(
+        "--compare",
+        metavar="REF",
+        help="compare with saved results, either a name in .benchmarks/ or a path to a .json file",
+    )
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=None,
+        metavar="PERCENT",
+        help="exit with an error if any median is this many percent slower than in --compare",
+    )
+    args = parser.parse_args()
+
+    available = {"postgres": "POSTGRES_HOST" in os.environ, "redis": "REDIS_HOST" in os.environ}
+    selected: list[Benchmark] = []
+    for bench in _BENCHMARKS:
+        if args.pattern is not None and args.pattern not in bench.name:
+            continue
+        missing = [name for name in bench.requires if not available[name]]
+        if missing:
+            print(f"SKIP {bench.name}: {', '.join(missing)} not configured", file=sys.stderr)
+            continue
+        selected.append(bench)
+    if args.list:
+        print("\n".join(bench.name for bench in selected))
+        return
+
+    baseline = _load_results(args.compare) if args.compare is not None else {}
+    regressions: list[str] = []
+    results: list[BenchmarkResult] = []
+
+    async def run() -> None:
+        async for result in _run(selected, min_time=args.min_time, min_rounds=args.min_rounds):
+            results.append(result)
+            line = (
+                f"{result.name:<45} median {_format_time(result.median):>12}"
+                f"  min {_format_time(result.min):>12}  rounds {result.rounds:>6}"
+            )
+            if result.name in baseline:
+                change = (result.median / baseline[result.name].median - 1) * 100
+                line += f"  {change:+7.1f}%"
+                if args.max_regression is not None and change > args.max_regression:
+                    regressions.append(result.name)
+            if result.extra:
+                line += "  " + " ".join(f"{k}={v}" for k, v in result.extra.items())
+            print(line)
+
+    asyncio.run(run())
+
+    if args.save is not None:
+        name = args.save or _git_revision()
+        _RESULTS_DIR.mkdir(exist_ok=True)
+        path = _RESULTS_DIR / f"{name}.json"
+        path.write_text(
+            json.dumps(
+                {
+                    "revision": _git_revision(),
+                    "python": sys.version,
+                    "results": [dataclasses.asdict(result) for result in results],
+                },
+                indent=2,
+            )
+        )
+        print(f"Saved to {path}", file=sys.stderr)
+    if regressions:
+        print(f"Regressed: {', '.join(regressions)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
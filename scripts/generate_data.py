@@ -0,0 +1,427 @@
+"""Synthetic tournament data generator.
+
+Generates players, tournaments, tables and games with valid role distributions and results that
+satisfy the database check constraints. The same seed always produces the same data.
+
+Usage:
+    python -m scripts.generate_data --games 100000 --seed 1 postgres
+    python -m scripts.generate_data --games 1000 ndjson > data.ndjson
+
+The `postgres` target uses the same environment variables as the server (see `.env.dist`) and
+bulk-loads rows with `COPY` into an already migrated database.
+"""
+
+import argparse
+import asyncio
+import dataclasses
+import datetime
+import json
+import math
+import random
+import sys
+import uuid
+from typing import Any, Iterator, TextIO
+
+from sqlalchemy import JSON
+
+from server.db import models as db_models
+from server.models.game import Game, GamePlayer, GameResult, PlayerExtraScore, PlayerResult
+from server.utils.calc_score import TournamentGame
+from server.utils.enums import Role, Team
+from server.utils.security import password_context
+
+_ROLES = [Role.MAFIA, Role.MAFIA, Role.DON, Role.SHERIFF] + [Role.CITIZEN] * 6
+_WARN_WEIGHTS = [70, 18, 8, 3, 1]  # 0..4 warns
+_GUESSED_MAFIA_WEIGHTS = [30, 35, 25, 10]  # 0..3 guessed mafia
+_EXTRA_SCORE_REASONS = ["Good speech", "Best move", "Excellent voting", "Rude behaviour"]
+# Tables in insertion order, parents before children
+_TABLES = [
+    db_models.Player.__table__,
+    db_models.User.__table__,
+    db_models.Tournament.__table__,
+    db_models.TournamentPlayer.__table__,
+    db_models.Table.__table__,
+    db_models.Game.__table__,
+    db_models.GamePlayer.__table__,
+    db_models.GameResult.__table__,
+    db_models.GamePlayerResult.__table__,
+    db_models.GamePlayerExtraScore.__table__,
+    db_models.GameLog.__table__,
+]
+
+type Row = tuple[str, dict[str, Any]]
+
+
+@dataclasses.dataclass(kw_only=True, slots=True)
+class GeneratedSeat:
+    player_id: str | None
+    role: Role
+    warn_count: int
+    was_kicked: bool
+    caused_other_team_won: bool
+    found_mafia_count: int
+    has_found_sheriff: bool
+    was_killed_first_night: bool
+    guessed_mafia_count: int
+    extra_scores: list[tuple[float, str]]
+
+
+@dataclasses.dataclass(kw_only=True, slots=True)
+class GeneratedGame:
+    id: str
+    table_id: str
+    number: int
+    winner: Team | None
+    finished_at: datetime.datetime
+    seats: list[GeneratedSeat]
+    raw_game_log: dict[str, Any]
+
+
+@dataclasses.dataclass(kw_only=True, slots=True)
+class GeneratedPlayer:
+    id: str
+    nickname: str
+    real_name: str
+
+
+class DataGenerator:
+    def __init__(
+        self,
+        *,
+        seed: int,
+        player_count: int,
+        tables_per_tournament: int = 20,
+        games_per_table: int = 10,
+        guest_rate: float = 0.01,
+        nickname_prefix: str = "Player",
+    ) -> None:
+        self._rng = random.Random(seed)
+        self._tables_per_tournament = tables_per_tournament
+        self._games_per_table = games_per_table
+        self._guest_rate = guest_rate
+        self.players = [
+            GeneratedPlayer(
+                id=self._uuid(),
+                nickname=f"{nickname_prefix} {i:07}",
+                real_name=f"Real Name {i:07}",
+            )
+            for i in range(player_count)
+        ]
+        self.nicknames = {player.id: player.nickname for player in self.players}
+
+    def _uuid(self) -> str:
+        return str(uuid.UUID(int=self._rng.getrandbits(128), version=4))
+
+    def _generate_seat(
+        self, player_id: str | None, role: Role, winner: Team | None
+    ) -> GeneratedSeat:
+        rng = self._rng
+        warn_count = rng.choices(range(5), _WARN_WEIGHTS)[0]
+        was_kicked = warn_count == 4 or rng.random() < 0.002
+        # At most one extra score per seat, it's the primary key of the extra scores table
+        extra_scores = []
+        if rng.random() < 0.1:
+            extra_scores.append(
+                (round(rng.uniform(-0.5, 0.6), 1) or 0.1, rng.choice(_EXTRA_SCORE_REASONS))
+            )
+        return GeneratedSeat(
+            player_id=player_id,
+            role=role,
+            warn_count=warn_count,
+            was_kicked=was_kicked,
+            caused_other_team_won=(
+                was_kicked and winner is not None and winner != role.team and rng.random() < 0.3
+            ),
+            found_mafia_count=(
+                rng.choices(range(4), [35, 35, 22, 8])[0] if role == Role.SHERIFF else 0
+            ),
+            has_found_sheriff=role == Role.DON and rng.random() < 0.5,
+            was_killed_first_night=False,
+            guessed_mafia_count=0,
+            extra_scores=extra_scores,
+        )
+
+    def generate_game(
+        self, *, table_id: str, number: int, finished_at: datetime.datetime
+    ) -> GeneratedGame:
+        rng = self._rng
+        roles = _ROLES.copy()
+        rng.shuffle(roles)
+        players = rng.sample(self.players, len(roles))
+        winner = rng.choices([Team.CITIZEN, Team.MAFIA, None], [55, 43, 2])[0]
+        seats = [
+            self._generate_seat(
+                player.id if rng.random() >= self._guest_rate else None,
+                role,
+                winner,
+            )
+            for player, role in zip(players, roles)
+        ]
+        if rng.random() < 0.85:
+            victim = rng.choice([seat for seat in seats if seat.role.team == Team.CITIZEN])
+            victim.was_killed_first_night = True
+            victim.guessed_mafia_count = rng.choices(range(4), _GUESSED_MAFIA_WEIGHTS)[0]
+        return GeneratedGame(
+            id=self._uuid(),
+            table_id=table_id,
+            number=number,
+            winner=winner,
+            finished_at=finished_at,
+            seats=seats,
+            raw_game_log={
+                "version": 1,
+                "roles": [seat.role.value for seat in seats],
+                "winner": winner.value if winner is not None else None,
+            },
+        )
+
+    def generate(self, game_count: int, *, organizer_password: str) -> Iterator[Row]:
+        """Yields database rows, parents always before their children."""
+        rng = self._rng
+        for player in self.players:
+            yield "players", dataclasses.asdict(player)
+        organizer_id = self._uuid()
+        yield "users", {
+            "id": organizer_id,
+            "username": "seed",
+            "player_id": self.players[0].id,
+            "password_hash": password_context.hash(organizer_password),
+        }
+        games_per_tournament = self._tables_per_tournament * self._games_per_table
+        tournament_count = math.ceil(game_count / games_per_tournament)
+        start = datetime.datetime(2020, 1, 4, 10, tzinfo=datetime.timezone.utc)
+        games_left = game_count
+        for tournament_number in range(1, tournament_count + 1):
+            date_from = start + datetime.timedelta(weeks=tournament_number)
+            tournament_id = self._uuid()
+            yield "tournaments", {
+                "id": tournament_id,
+                "name": f"Tournament {tournament_number}",
+                "date_from": date_from,
+                "date_to": date_from + datetime.timedelta(days=1),
+                "created_by_user_id": organizer_id,
+            }
+            roster: set[str] = set()
+            for table_number in range(1, self._tables_per_tournament + 1):
+                if games_left <= 0:
+                    break
+                table_id = self._uuid()
+                yield "tables", {
+                    "id": table_id,
+                    "tournament_id": tournament_id,
+                    "number": table_number,
+                    "judge_id": rng.choice(self.players).id,
+                }
+                for game_number in range(1, min(self._games_per_table, games_left) + 1):
+                    games_left -= 1
+                    finished_at = date_from + datetime.timedelta(
+                        minutes=50 * game_number + rng.randint(-10, 10)
+                    )
+                    game = self.generate_game(
+                        table_id=table_id,
+                        number=game_number,
+                        finished_at=finished_at,
+                    )
+                    roster.update(seat.player_id for seat in game.seats if seat.player_id)
+                    yield from _game_to_rows(game)
+            for player_id in sorted(roster):
+                yield "tournament_players", {"player_id": player_id, "tournament_id": tournament_id}
+
+    def generate_tournament_games(self, game_count: int) -> list[TournamentGame]:
+        """Generates games as API models, e.g. for feeding `calc_score` directly."""
+        start = datetime.datetime(2020, 1, 4, 10, tzinfo=datetime.timezone.utc)
+        table_id = self._uuid()
+        return [
+            to_tournament_game(
+                self.generate_game(
+                    table_id=table_id,
+                    number=number,
+                    finished_at=start + datetime.timedelta(minutes=50 * number),
+                ),
+                self.nicknames,
+            )
+            for number in range(1, game_count + 1)
+        ]
+
+
+def _game_to_rows(game: GeneratedGame) -> Iterator[Row]:
+    yield "games", {"id": game.id, "table_id": game.table_id, "number": game.number}
+    for seat_number, seat in enumerate(game.seats, start=1):
+        yield "game_players", {
+            "game_id": game.id,
+            "player_id": seat.player_id,
+            "role": seat.role.name,
+            "seat": seat_number,
+        }
+    yield "game_results", {
+        "game_id": game.id,
+        "winner": game.winner.name if game.winner is not None else None,
+        "finished_at": game.finished_at,
+    }
+    for seat_number, seat in enumerate(game.seats, start=1):
+        yield "game_player_results", {
+            "game_id": game.id,
+            "seat": seat_number,
+            "warn_count": seat.warn_count,
+            "was_kicked": seat.was_kicked,
+            "caused_other_team_won": seat.caused_other_team_won,
+            "found_mafia_count": seat.found_mafia_count,
+            "has_found_sheriff": seat.has_found_sheriff,
+            "was_killed_first_night": seat.was_killed_first_night,
+            "guessed_mafia_count": seat.guessed_mafia_count,
+        }
+        for points, reason in seat.extra_scores:
+            yield "game_player_extra_scores", {
+                "game_id": game.id,
+                "seat": seat_number,
+                "score": points,
+                "reason": reason,
+            }
+    yield "game_logs", {"game_id": game.id, "raw_game_log": game.raw_game_log}
+
+
+def to_tournament_game(game: GeneratedGame, nicknames: dict[str, str]) -> TournamentGame:
+    return TournamentGame(
+        game=Game(
+            id=game.id,
+            number=game.number,
+            table_id=game.table_id,
+            players=[
+                GamePlayer(
+                    nickname=nicknames[seat.player_id] if seat.player_id is not None else None,
+                    role=seat.role,
+                )
+                for seat in game.seats
+            ],
+        ),
+        result=GameResult(
+            winner=game.winner,
+            finished_at=game.finished_at,
+            results=[
+                PlayerResult(
+                    warn_count=seat.warn_count,
+                    was_kicked=seat.was_kicked,
+                    caused_other_team_won=seat.caused_other_team_won,
+                    found_mafia_count=seat.found_mafia_count,
+                    has_found_sheriff=seat.has_found_sheriff,
+                    was_killed_first_night=seat.was_killed_first_night,
+                    guessed_mafia_count=seat.guessed_mafia_count,
+                    extra_scores=[
+                        PlayerExtraScore(points=points, reason=reason)
+                        for points, reason in seat.extra_scores
+                    ],
+                )
+                for seat in game.seats
+            ],
+        ),
+    )
+
+
+def _json_default(obj: object) -> str:
+    if isinstance(obj, datetime.datetime):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def write_ndjson(rows: Iterator[Row], output: TextIO) -> int:
+    count = 0
+    for table, row in rows:
+        output.write(json.dumps({"table": table, "row": row}, default=_json_default))
+        output.write("\n")
+        count += 1
+    return count
+
+
+async def write_postgres(rows: Iterator[Row], *, batch_size: int) -> int:
+    import asyncpg
+
+    from server.utils.settings import Settings
+
+    env = Settings.from_env()
+    connection = await asyncpg.connect(
+        host=env.postgres_host,
+        port=env.postgres_port,
+        user=env.postgres_user,
+        password=env.postgres_password,
+        database=env.postgres_db,
+    )
+    json_columns = {
+        (table.name, column.name)
+        for table in _TABLES
+        for column in table.columns
+        if isinstance(column.type, JSON)
+    }
+    buffers: dict[str, list[dict[str, Any]]] = {table.name: [] for table in _TABLES}
+    count = 0
+
+    async def flush() -> None:
+        # Parent tables are flushed first, so foreign keys are always satisfied
+        for name, buffer in buffers.items():
+            if not buffer:
+                continue
+            columns = list(buffer[0])
+            await connection.copy_records_to_table(
+                name,
+                columns=columns,
+                records=(
+                    tuple(
+                        json.dumps(row[c]) if (name, c) in json_columns else row[c] for c in columns
+                    )
+                    for row in buffer
+                ),
+            )
+            buffer.clear()
+
+    try:
+        async with connection.transaction():
+            for table, row in rows:
+                buffers[table].append(row)
+                count += 1
+                if count % batch_size == 0:
+                    await flush()
+            await flush()
+    finally:
+        await connection.close()
+    return count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("target", choices=["postgres", "ndjson"])
+    parser.add_argument("--games", type=int, default=1000, help="number of games to generate")
+    parser.add_argument(
+        "--players",
+        type=int,
+        default=None,
+        help="number of players, default is games / 5, but at least 100",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--tables-per-tournament", type=int, default=20)
+    parser.add_argument("--games-per-table", type=int, default=10)
+    parser.add_argument(
+        "--password",
+        default="seed",
+        help='password of the generated "seed" user owning all tournaments',
+    )
+    parser.add_argument("--batch-size", type=int, default=50_000, help="rows per COPY batch")
+    args = parser.parse_args()
+
+    generator = DataGenerator(
+        seed=args.seed,
+        player_count=args.players if args.players is not None else max(args.games // 5, 100),
+        tables_per_tournament=args.tables_per_tournament,
+        games_per_table=args.games_per_table,
+    )
+    rows = generator.generate(args.games, organizer_password=args.password)
+    match args.target:
+        case "ndjson":
+            count = write_ndjson(rows, sys.stdout)
+        case "postgres":
+            count = asyncio.run(write_postgres(rows, batch_size=args.batch_size))
+        case _:
+            raise AssertionError(args.target)
+    print(f"Generated {count} rows", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,433 @@
+"""Load test modelling a live tournament day.
+
+Runs against an already started API (e.g. `docker compose up`, which limits the API container to
+0.5 CPU) and simulates an event:
+
+1. judges of all tables log in at once;
+2. every table creates a game and posts its result on a schedule;
+3. spectators keep polling the scoreboard and the games of a random table;
+4. optionally, viewers follow the live feed, measuring how long a result takes to reach them
+   (`live_result`, from submitting the result to receiving its event);
+5. optionally, attackers flood the login with wrong passwords of the judges (`login_attack`). Its
+   errors are attempts that weren't throttled and got to the password check, latencies of the
+   other operations show whether the attack slows the API down.
+
+At the end, latency percentiles and error rates are reported per operation ID. To find the
+maximum event size, repeat the run with growing `--tables` / `--spectators` until p99 latency or
+the error rate stops being acceptable.
+
+All simulated clients share one IP, so runs with more tables than `LOGIN_THROTTLE_IP_LIMIT` allows
+logins per window need a higher limit on the API.
+
+Usage:
+    python -m scripts.load_test --username seed --password seed --tables 20 --spectators 300
+    python -m scripts.load_test --username seed --password seed --login-attackers 50
+"""
+
+import argparse
+import asyncio
+import dataclasses
+import datetime
+import json
+import random
+import statistics
+import sys
+import time
+import uuid
+from collections import defaultdict
+from typing import Any
+
+import httpx
+
+from .generate_data import DataGenerator, to_tournament_game
+
+
+@dataclasses.dataclass(kw_only=True)
+class Sample:
+    latency: float
+    ok: bool
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.samples: defaultdict[str, list[Sample]] = defaultdict(list)
+        self.started = time.perf_counter()
+
+    async def request(
+        self,
+        client: httpx.AsyncClient,
+        operation_id: str,
+        method: str,
+        url: str,
+        *,
+        expected: tuple[int, ...] = (200,),
+        **kwargs: Any,
+    ) -> httpx.Response | None:
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.samples[operation_id].append(Sample(latency=time.perf_counter() - start, ok=False))
+            return None
+        ok = response.status_code in expected
+        self.samples[operation_id].append(Sample(latency=time.perf_counter() - start, ok=ok))
+        return response if ok else None
+
+    def report(self) -> dict[str, dict[str, float]]:
+        elapsed = time.perf_counter() - self.started
+        report = {}
+        for operation_id, samples in sorted(self.samples.items()):
+            latencies = sorted(s.latency for s in samples)
+            quantiles = (
+                statistics.quantiles(latencies, n=100, method="inclusive")
+                if len(latencies) > 1
+                else latencies * 99
+            )
+            report[operation_id] = {
+                "count": len(samples),
+                "rps": len(samples) / elapsed,
+                "error_rate": sum(not s.ok for s in samples) / len(samples),
+                "p50_ms": quantiles[49] * 1000,
+                "p95_ms": quantiles[94] * 1000,
+                "p99_ms": quantiles[98] * 1000,
+            }
+        return report
+
+
+@dataclasses.dataclass(kw_only=True)
+class Event:
+    tournament_id: str
+    table_ids: list[str]
+    judges: list[tuple[str, str]]  # (username, password) per table
+    generator: DataGenerator
+    # perf_counter() when submitting the result, per game ID
+    results_submitted: dict[str, float] = dataclasses.field(default_factory=dict)
+
+
+def _auth(token: str) -> dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def _login(client: httpx.AsyncClient, username: str, password: str) -> str:
+    response = await client.post("/auth/login", data={"username": username, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def prepare_event(client: httpx.AsyncClient, args: argparse.Namespace) -> Event:
+    """Creates players, judges, a tournament and its tables."""
+    token = await _login(client, args.username, args.password)
+    run_id = uuid.uuid4().hex[:8]
+    generator = DataGenerator(
+        seed=args.seed,
+        player_count=args.players,
+        guest_rate=0,
+        nickname_prefix=f"Load {run_id}",
+    )
+    semaphore = asyncio.Semaphore(20)
+
+    async def create_player(nickname: str, real_name: str) -> str:
+        async with semaphore:
+            response = await client.post(
+                "/players/",
+                json={"nickname": nickname, "real_name": real_name},
+                headers=_auth(token),
+            )
+            response.raise_for_status()
+            return response.json()["id"]
+
+    player_ids = await asyncio.gather(
+        *(create_player(p.nickname, p.real_name) for p in generator.players)
+    )
+    for player, player_id in zip(generator.players, player_ids):
+        player.id = player_id
+    generator.nicknames = {player.id: player.nickname for player in generator.players}
+
+    judges = []
+    for number in range(1, args.tables + 1):
+        judge_id = await create_player(f"Judge {run_id} {number}", f"Judge {number}")
+        username, password = f"judge-{run_id}-{number}", uuid.uuid4().hex
+        response = await client.post(
+            f"/players/{judge_id}/invite",
+            json={"username": username, "password": password},
+            headers=_auth(token),
+        )
+        response.raise_for_status()
+        judges.append((username, password))
+
+    now = datetime.datetime.now(tz=datetime.timezone.utc)
+    response = await client.post(
+        "/tournaments/",
+        json={
+            "name": f"Load test {run_id}",
+            "date_from": (now - datetime.timedelta(hours=1)).isoformat(),
+            "date_to": (now + datetime.timedelta(days=1)).isoformat(),
+        },
+        headers=_auth(token),
+    )
+    response.raise_for_status()
+    tournament_id = response.json()["id"]
+    table_ids = []
+    for username, _ in judges:
+        response = await client.post(
+            f"/tournaments/{tournament_id}/tables",
+            json={"judge_username": username},
+            headers=_auth(token),
+        )
+        response.raise_for_status()
+        table_ids.append(response.json()["id"])
+    return Event(
+        tournament_id=tournament_id,
+        table_ids=table_ids,
+        judges=judges,
+        generator=generator,
+    )
+
+
+async def run_table(
+    client: httpx.AsyncClient,
+    recorder: Recorder,
+    event: Event,
+    table_index: int,
+    *,
+    token: str,
+    game_interval: float,
+    deadline: float,
+) -> None:
+    table_id = event.table_ids[table_index]
+    # Tables don't start at exactly the same moment
+    await asyncio.sleep(random.uniform(0, game_interval))
+    while time.perf_counter() < deadline:
+        generated = event.generator.generate_game(
+            table_id=table_id,
+            number=0,
+            finished_at=datetime.datetime.now(tz=datetime.timezone.utc),
+        )
+        game = to_tournament_game(generated, event.generator.nicknames)
+        response = await recorder.request(
+            client,
+            "create_table_game",
+            "POST",
+            f"/tables/{table_id}/games/",
+            expected=(201,),
+            json={"players": [p.model_dump(mode="json") for p in game.game.players]},
+            headers=_auth(token),
+        )
+        # Judges submit the result when the game is over, roughly one interval later
+        await asyncio.sleep(game_interval * random.uniform(0.8, 1.2))
+        if response is None:
+            continue
+        game_id = response.json()["id"]
+        event.results_submitted[game_id] = time.perf_counter()
+        await recorder.request(
+            client,
+            "set_game_result",
+            "POST",
+            f"/games/{game_id}/result",
+            json=game.result.model_dump(mode="json"),
+            headers=_auth(token),
+        )
+
+
+async def run_spectator(
+    client: httpx.AsyncClient,
+    recorder: Recorder,
+    event: Event,
+    *,
+    poll_interval: float,
+    deadline: float,
+) -> None:
+    await asyncio.sleep(random.uniform(0, poll_interval))
+    while time.perf_counter() < deadline:
+        await recorder.request(
+            client,
+            "get_tournament_scores",
+            "GET",
+            f"/tournaments/{event.tournament_id}/scores",
+        )
+        await recorder.request(
+            client,
+            "get_table_games",
+            "GET",
+            f"/tables/{random.choice(event.table_ids)}/games/",
+        )
+        await asyncio.sleep(poll_interval * random.uniform(0.8, 1.2))
+
+
+async def run_viewer(
+    client: httpx.AsyncClient,
+    recorder: Recorder,
+    event: Event,
+    *,
+    deadline: float,
+) -> None:
+    start = time.perf_counter()
+    try:
+        async with asyncio.timeout(deadline - start):
+            async with client.stream("GET", f"/tournaments/{event.tournament_id}/live") as response:
+                recorder.samples["live_feed"].append(
+                    Sample(latency=time.perf_counter() - start, ok=response.status_code == 200)
+                )
+                event_name = None
+                async for line in response.aiter_lines():
+                    if line.startswith("event: "):
+                        event_name = line.removeprefix("event: ")
+                    elif line.startswith("data: ") and event_name == "result":
+                        game_id = json.loads(line.removeprefix("data: "))["game_id"]
+                        submitted = event.results_submitted.get(game_id)
+                        if submitted is not None:
+                            recorder.samples["live_result"].append(
+                                Sample(latency=time.perf_counter() - submitted, ok=True)
+                            )
+    except TimeoutError:
+        pass
+    except httpx.HTTPError:
+        recorder.samples["live_feed"].append(Sample(latency=time.perf_counter() - start, ok=False))
+
+
+async def run_login_attacker(
+    client: httpx.AsyncClient,
+    recorder: Recorder,
+    event: Event,
+    *,
+    deadline: float,
+) -> None:
+    while time.perf_counter() < deadline:
+        username, _ = random.choice(event.judges)
+        await recorder.request(
+            client,
+            "login_attack",
+            "POST",
+            "/auth/login",
+            expected=(429,),
+            data={"username": username, "password": uuid.uuid4().hex},
+        )
+
+
+async def run(args: argparse.Namespace) -> dict[str, dict[str, float]]:
+    limits = httpx.Limits(max_connections=args.max_connections)
+    # Viewers hold their connection for the whole run, so they don't share the pool of requests
+    viewer_limits = httpx.Limits(max_connections=max(args.sse_viewers, 1))
+    # Attackers neither, so that they don't delay requests of the others before they are sent
+    attacker_limits = httpx.Limits(max_connections=max(args.login_attackers, 1))
+    async with (
+        httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=30) as client,
+        httpx.AsyncClient(
+            base_url=args.base_url,
+            limits=viewer_limits,
+            timeout=httpx.Timeout(30, read=None),
+        ) as viewer_client,
+        httpx.AsyncClient(
+            base_url=args.base_url,
+            limits=attacker_limits,
+            timeout=30,
+        ) as attacker_client,
+    ):
+        print("Preparing the event...", file=sys.stderr)
+        event = await prepare_event(client, args)
+        recorder = Recorder()
+
+        print("Judges are logging in...", file=sys.stderr)
+        login_responses = await asyncio.gather(
+            *(
+                recorder.request(
+                    client,
+                    "login",
+                    "POST",
+                    "/auth/login",
+                    data={"username": username, "password": password},
+                )
+                for username, password in event.judges
+            )
+        )
+        tokens = [r.json()["access_token"] if r is not None else "" for r in login_responses]
+
+        print(f"Running for {args.duration} s...", file=sys.stderr)
+        deadline = time.perf_counter() + args.duration
+        await asyncio.gather(
+            *(
+                run_table(
+                    client,
+                    recorder,
+                    event,
+                    index,
+                    token=tokens[index],
+                    game_interval=args.game_interval,
+                    deadline=deadline,
+                )
+                for index in range(len(event.table_ids))
+            ),
+            *(
+                run_spectator(
+                    client,
+                    recorder,
+                    event,
+                    poll_interval=args.poll_interval,
+                    deadline=deadline,
+                )
+                for _ in range(args.spectators)
+            ),
+            *(
+                run_viewer(viewer_client, recorder, event, deadline=deadline)
+                for _ in range(args.sse_viewers)
+            ),
+            *(
+                run_login_attacker(attacker_client, recorder, event, deadline=deadline)
+                for _ in range(args.login_attackers)
+            ),
+        )
+        return recorder.report()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--username", required=True, help="existing user to prepare the event")
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--tables", type=int, default=20)
+    parser.add_argument("--spectators", type=int, default=300)
+    parser.add_argument(
+        "--sse-viewers",
+        type=int,
+        default=0,
+        help="viewers following the live feed of the tournament",
+    )
+    parser.add_argument(
+        "--login-attackers",
+        type=int,
+        default=0,
+        help="clients flooding the login with wrong passwords",
+    )
+    parser.add_argument("--players", type=int, default=200, help="players taking part")
+    parser.add_argument("--duration", type=float, default=300, help="seconds")
+    parser.add_argument(
+        "--game-interval",
+        type=float,
+        default=30,
+        help="seconds between creating a game and posting its result, compressed game time",
+    )
+    parser.add_argument("--poll-interval", type=float, default=5, help="spectator refresh, s")
+    parser.add_argument("--max-connections", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(
+        f"{'operation_id':<25} {'count':>7} {'rps':>7} {'errors':>7}"
+        f" {'p50, ms':>9} {'p95, ms':>9} {'p99, ms':>9}"
+    )
+    for operation_id, stats in report.items():
+        print(
+            f"{operation_id:<25} {stats['count']:>7} {stats['rps']:>7.1f}"
+            f" {stats['error_rate']:>7.1%} {stats['p50_ms']:>9.1f}"
+            f" {stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
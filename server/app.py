@@ -2,22 +2,30 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.routing import APIRoute
 
+from .middlewares.compression import CompressionMiddleware
+from .middlewares.idempotency import IdempotencyMiddleware
+from .middlewares.profiler import ProfilerMiddleware
+from .middlewares.request_context import RequestContextMiddleware
 from .routes.auth import router as auth_router
 from .routes.games import router as games_router
 from .routes.health import router as health_router
 from .routes.players import router as players_router
 from .routes.root import router as root_router
+from .routes.sync import router as sync_router
 from .routes.tables import router as tables_router
 from .routes.tournaments import router as tournaments_router
 from .routes.users import router as users_router
 from .utils.app_lifespan import lifespan
+from .utils.responses import FastJSONResponse
 
 app = FastAPI(
     title="Mafia companion API",
     version="0.1.0-alpha.0",
     lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
+app.add_middleware(IdempotencyMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -25,6 +33,9 @@ app.add_middleware(
     allow_headers=["*"],
     allow_credentials=True,
 )
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(RequestContextMiddleware)
+app.add_middleware(ProfilerMiddleware)
 
 for router in [
     auth_router,
@@ -32,6 +43,7 @@ for router in [
     health_router,
     players_router,
     root_router,
+    sync_router,
     tables_router,
     tournaments_router,
     users_router,
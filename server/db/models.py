@@ -3,19 +3,24 @@ from typing import Annotated
 
 from sqlalchemy import (
     JSON,
+    BigInteger,
     CheckConstraint,
+    ColumnElement,
     DateTime,
     ForeignKey,
     ForeignKeyConstraint,
+    Index,
     PrimaryKeyConstraint,
+    Sequence,
     UniqueConstraint,
     Uuid,
+    func,
     text,
 )
 from sqlalchemy.ext.asyncio import AsyncAttrs
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
-from ..utils.enums import Role, Team
+from ..utils.enums import Role, SyncEntity, Team
 from ..utils.types import JsonT
 
 _uuid = Annotated[
@@ -26,6 +31,18 @@ _uuid = Annotated[
     ),
 ]
 _json_dict = dict[str, JsonT]
+# Global order of changes across synced tables, see `SyncRepo`
+_change_seq = Annotated[
+    int,
+    mapped_column(BigInteger, server_default=text("nextval('change_seq')")),
+]
+# Transaction which made the change, `xid8` has no cast to `bigint` but through text
+_change_xid = Annotated[
+    int,
+    mapped_column(
+        BigInteger, server_default=text("pg_current_xact_id()::text::bigint"), index=True
+    ),
+]
 
 
 def _fk(column: Mapped[str] | str, *, pk: bool = False) -> Mapped[str]:
@@ -43,12 +60,34 @@ class BaseDBModel(AsyncAttrs, DeclarativeBase):
     }
 
 
+change_seq = Sequence("change_seq", metadata=BaseDBModel.metadata)
+
+
+def search_key(text_: Mapped[str] | ColumnElement[str]) -> ColumnElement[str]:
+    """Case- and diacritics-insensitive form of a text, see the `search_key` SQL function."""
+    return func.search_key(text_)
+
+
 class Player(BaseDBModel):
     __tablename__ = "players"
 
     id: Mapped[_uuid] = _pk()
     nickname: Mapped[str] = mapped_column(unique=True)
     real_name: Mapped[str]
+    change_seq: Mapped[_change_seq]
+    change_xid: Mapped[_change_xid]
+
+    __table_args__ = (
+        # Prefix matches in order, including ones shorter than a trigram
+        Index("ix_players_nickname_search_prefix", search_key(nickname).collate("C")),
+        # Fuzzy matches ordered by similarity straight from the index
+        Index(
+            "ix_players_nickname_search_trgm",
+            search_key(nickname).label("nickname_key"),
+            postgresql_using="gist",
+            postgresql_ops={"nickname_key": "gist_trgm_ops"},
+        ),
+    )
 
 
 # class UserConnection(BaseDBModel):
@@ -76,6 +115,8 @@ class Tournament(BaseDBModel):
     date_from: Mapped[datetime.datetime]
     date_to: Mapped[datetime.datetime]
     created_by_user_id: Mapped[_uuid] = _fk(User.id)
+    change_seq: Mapped[_change_seq]
+    change_xid: Mapped[_change_xid]
 
 
 class TournamentPlayer(BaseDBModel):
@@ -84,7 +125,11 @@ class TournamentPlayer(BaseDBModel):
     player_id: Mapped[_uuid] = _fk(Player.id)
     tournament_id: Mapped[_uuid] = _fk(Tournament.id)
 
-    __table_args__ = (PrimaryKeyConstraint(player_id, tournament_id),)
+    __table_args__ = (
+        PrimaryKeyConstraint(player_id, tournament_id),
+        # Rosters are read by tournament
+        Index("ix_tournament_players_tournament_id", tournament_id),
+    )
 
 
 class Table(BaseDBModel):
@@ -94,6 +139,8 @@ class Table(BaseDBModel):
     tournament_id: Mapped[_uuid] = _fk(Tournament.id)
     number: Mapped[int] = mapped_column()
     judge_id: Mapped[_uuid] = _fk(Player.id)
+    change_seq: Mapped[_change_seq]
+    change_xid: Mapped[_change_xid]
 
     __table_args__ = (UniqueConstraint(tournament_id, number),)
 
@@ -104,6 +151,8 @@ class Game(BaseDBModel):
     id: Mapped[_uuid] = _pk()
     table_id: Mapped[_uuid] = _fk(Table.id)
     number: Mapped[int] = mapped_column()
+    change_seq: Mapped[_change_seq]
+    change_xid: Mapped[_change_xid]
 
     __table_args__ = (UniqueConstraint(table_id, number),)
 
@@ -128,6 +177,8 @@ class GameResult(BaseDBModel):
     game_id: Mapped[_uuid] = _fk(Game.id, pk=True)
     winner: Mapped[Team | None]
     finished_at: Mapped[datetime.datetime]
+    change_seq: Mapped[_change_seq]
+    change_xid: Mapped[_change_xid]
 
 
 class GameLog(BaseDBModel):
@@ -178,4 +229,30 @@ class GamePlayerExtraScore(BaseDBModel):
     )
 
 
+class StandingsSnapshot(BaseDBModel):
+    __tablename__ = "standings_snapshots"
+
+    tournament_id: Mapped[_uuid] = _fk(Tournament.id)
+    # Standings after all games with number up to and including this one
+    round: Mapped[int] = mapped_column()
+    standings: Mapped[_json_dict]
+
+    __table_args__ = (PrimaryKeyConstraint(tournament_id, round),)
+
+
+class DeletedRecord(BaseDBModel):
+    """Tombstone of a deleted synced record, so that clients learn about the deletion."""
+
+    __tablename__ = "deleted_records"
+
+    change_seq: Mapped[int] = mapped_column(
+        BigInteger,
+        server_default=text("nextval('change_seq')"),
+        primary_key=True,
+    )
+    change_xid: Mapped[_change_xid]
+    entity: Mapped[SyncEntity]
+    entity_id: Mapped[str] = mapped_column(Uuid(as_uuid=False))
+
+
 # TODO: add permissions
@@ -0,0 +1,53 @@
+import re
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from ..utils.exceptions.instrumentation import QueryBudgetExceededError
+from ..utils.request_context import get_request_context
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_PARAM_RE = re.compile(r"\$\d+|%\(\w+\)s|\?")
+_PARAM_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+def fingerprint(statement: str) -> str:
+    """Normalizes an SQL statement so that the same query shape always yields the same string.
+
+    Bound parameter placeholders are replaced with `?` and expanded `IN` lists are collapsed, so
+    e.g. a judge lookup issued for every table of a tournament is reported as one fingerprint.
+    """
+    statement = _WHITESPACE_RE.sub(" ", statement).strip()
+    statement = _PARAM_RE.sub("?", statement)
+    return _PARAM_LIST_RE.sub("(...)", statement)
+
+
+def _count_statement(
+    conn: Connection,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: Any,
+    executemany: bool,
+) -> None:
+    ctx = get_request_context()
+    if ctx is None:
+        return
+    ctx.statements[fingerprint(statement)] += 1
+    if (
+        ctx.query_budget is not None
+        and ctx.query_budget_strict
+        and ctx.query_count > ctx.query_budget
+    ):
+        raise QueryBudgetExceededError(
+            ctx.route_path,
+            ctx.query_budget,
+            ctx.repeated_statements(),
+        )
+
+
+def install_query_counter(engine: AsyncEngine) -> None:
+    """Counts every statement executed by the engine against the current request context."""
+    event.listen(engine.sync_engine, "before_cursor_execute", _count_statement)
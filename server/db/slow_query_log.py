@@ -0,0 +1,95 @@
+import json
+import logging
+import random
+import time
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from ..utils.request_context import get_request_context
+from .query_counter import fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Set on the execution context, which is dropped with the statement even if it raises
+_START_TIME_ATTR = "_slow_query_log_start_time"
+_EXPLAIN_SAVEPOINT = "slow_query_log_explain"
+
+
+class SlowQueryLogger:
+    """Logs SQL statements slower than a threshold as JSON, optionally with their query plan.
+
+    Only `SELECT` statements are explained, since `EXPLAIN ANALYZE` executes the statement once
+    more. The plan is captured inside a savepoint so that a failing `EXPLAIN` never breaks the
+    transaction of the request that issued the statement.
+    """
+
+    def __init__(self, *, threshold_ms: float, explain_sample_rate: float = 0.0) -> None:
+        self._threshold = threshold_ms / 1000
+        self._explain_sample_rate = explain_sample_rate
+
+    def install(self, engine: AsyncEngine) -> None:
+        event.listen(engine.sync_engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine.sync_engine, "after_cursor_execute", self._after_cursor_execute)
+
+    @staticmethod
+    def _before_cursor_execute(
+        conn: Connection,
+        cursor: Any,
+        statement: str,
+        parameters: Any,
+        context: Any,
+        executemany: bool,
+    ) -> None:
+        if context is not None:
+            setattr(context, _START_TIME_ATTR, time.perf_counter())
+
+    def _after_cursor_execute(
+        self,
+        conn: Connection,
+        cursor: Any,
+        statement: str,
+        parameters: Any,
+        context: Any,
+        executemany: bool,
+    ) -> None:
+        start = getattr(context, _START_TIME_ATTR, None)
+        if start is None:
+            return
+        duration = time.perf_counter() - start
+        if duration < self._threshold:
+            return
+        ctx = get_request_context()
+        record: dict[str, Any] = {
+            "event": "slow_query",
+            "duration_ms": round(duration * 1000, 3),
+            "fingerprint": fingerprint(statement),
+            "method": ctx.scope.get("method") if ctx is not None else None,
+            "route": ctx.route_path if ctx is not None else None,
+            "operation_id": ctx.operation_id if ctx is not None else None,
+        }
+        if (
+            not executemany
+            and statement.lstrip()[:6].upper() == "SELECT"
+            and random.random() < self._explain_sample_rate
+        ):
+            record["explain"] = self._explain(conn, statement, parameters)
+        logger.warning(json.dumps(record, default=str))
+
+    @staticmethod
+    def _explain(conn: Connection, statement: str, parameters: Any) -> Any:
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(f"SAVEPOINT {_EXPLAIN_SAVEPOINT}")
+            try:
+                cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}", parameters)
+                plan = cursor.fetchone()[0]
+            except Exception as e:
+                cursor.execute(f"ROLLBACK TO SAVEPOINT {_EXPLAIN_SAVEPOINT}")
+                return {"error": str(e)}
+            cursor.execute(f"RELEASE SAVEPOINT {_EXPLAIN_SAVEPOINT}")
+        finally:
+            cursor.close()
+        return json.loads(plan) if isinstance(plan, str) else plan
@@ -1,11 +1,16 @@
+from datetime import timedelta
 from typing import Annotated
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 
 from ..models.auth import LoginModel
-from ..repo.cache import AuthRepo
-from .repo import get_auth_repo
+from ..models.user import UserProfile
+from ..repo.cache import AuthRepo, ProfilesRepo
+from ..repo.db import UsersRepo
+from ..utils.settings import Settings
+from .repo import get_auth_repo, get_profiles_repo, get_users_repo
+from .settings import get_app_settings
 
 auth = OAuth2PasswordBearer(tokenUrl="auth/login")
 
@@ -42,3 +47,29 @@ async def get_current_user_id(
             headers={"WWW-Authenticate": "Bearer"},
         )
     return user_id
+
+
+async def get_current_user(
+    *,
+    user_id: Annotated[str, Depends(get_current_user_id)],
+    profiles_repo: Annotated[ProfilesRepo, Depends(get_profiles_repo)],
+    users_repo: Annotated[UsersRepo, Depends(get_users_repo)],
+    app_settings: Annotated[Settings, Depends(get_app_settings)],
+) -> UserProfile:
+    """Resolves the current user from the profile cache, querying the database only on a miss."""
+    profile = await profiles_repo.get(user_id)
+    if profile is not None:
+        return profile
+    profile = await users_repo.get_profile(user_id)
+    if profile is None:
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    await profiles_repo.save(
+        user_id,
+        profile,
+        expire=timedelta(seconds=app_settings.profile_cache_ttl),
+    )
+    return profile
@@ -0,0 +1,20 @@
+from ..utils.request_context import get_request_context
+
+
+class QueryBudget:
+    """Declares the maximum number of SQL statements an endpoint may issue per request.
+
+    Overrides the app-wide `SQL_QUERY_BUDGET` for the endpoint. Has no effect when query
+    counting is disabled.
+
+    Example:
+        @router.get("/{table_id}/", dependencies=[Depends(QueryBudget(2))])
+    """
+
+    def __init__(self, budget: int) -> None:
+        self.budget = budget
+
+    async def __call__(self) -> None:
+        ctx = get_request_context()
+        if ctx is not None and ctx.query_budget is not None:
+            ctx.query_budget = self.budget
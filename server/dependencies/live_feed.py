@@ -0,0 +1,8 @@
+from fastapi import FastAPI, Request
+
+from ..utils.live_feed import LiveFeed
+
+
+async def get_live_feed(request: Request) -> LiveFeed:
+    app: FastAPI = request.app
+    return app.state.live_feed
@@ -1,19 +1,43 @@
+from datetime import timedelta
 from typing import Annotated, Callable
 
 from fastapi import Depends, FastAPI, Request
 from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..repo.cache import AuthRepo
-from ..repo.db import GamesRepo, PlayersRepo, TablesRepo, TournamentsRepo, UsersRepo
+from ..repo.cache import AuthRepo, LoginThrottleRepo, ProfilesRepo, SignedAuthRepo
+from ..repo.db import (
+    GamesRepo,
+    PlayersRepo,
+    RosterRepo,
+    StandingsRepo,
+    SyncRepo,
+    TablesRepo,
+    TournamentsRepo,
+    UsersRepo,
+    pop_stale_profiles,
+)
+from ..utils.enums import AuthMode
+from ..utils.settings import Settings
+from .settings import get_app_settings
 
 
-async def get_db_connection(request: Request) -> AsyncSession:
+def get_cache_connection(request: Request) -> Redis:
+    app: FastAPI = request.app
+    return app.state.redis_pool
+
+
+async def get_db_connection(
+    request: Request,
+    cache: Annotated[Redis, Depends(get_cache_connection)],
+) -> AsyncSession:
     app: FastAPI = request.app
     pool: Callable[[], AsyncSession] = app.state.db_pool
     async with pool() as connection:
         yield connection
         await connection.commit()
+        # Only now, so that a concurrent request can't cache the profiles again from before
+        await ProfilesRepo(cache).invalidate(pop_stale_profiles(connection))
 
 
 def get_users_repo(
@@ -34,6 +58,12 @@ def get_tournaments_repo(
     return TournamentsRepo(connection)
 
 
+def get_roster_repo(
+    connection: Annotated[AsyncSession, Depends(get_db_connection)],
+) -> RosterRepo:
+    return RosterRepo(connection)
+
+
 def get_tables_repo(
     connection: Annotated[AsyncSession, Depends(get_db_connection)],
 ) -> TablesRepo:
@@ -46,12 +76,45 @@ def get_games_repo(
     return GamesRepo(connection)
 
 
-def get_cache_connection(request: Request) -> Redis:
-    app: FastAPI = request.app
-    return app.state.redis_pool
+def get_standings_repo(
+    connection: Annotated[AsyncSession, Depends(get_db_connection)],
+) -> StandingsRepo:
+    return StandingsRepo(connection)
+
+
+def get_sync_repo(
+    connection: Annotated[AsyncSession, Depends(get_db_connection)],
+) -> SyncRepo:
+    return SyncRepo(connection)
 
 
 def get_auth_repo(
     connection: Annotated[Redis, Depends(get_cache_connection)],
+    app_settings: Annotated[Settings, Depends(get_app_settings)],
 ) -> AuthRepo:
+    if app_settings.auth_mode is AuthMode.SIGNED:
+        assert app_settings.auth_secret is not None  # Checked by the settings
+        return SignedAuthRepo(
+            connection,
+            secret=app_settings.auth_secret.encode(),
+            access_expire=timedelta(seconds=app_settings.auth_access_token_ttl),
+        )
     return AuthRepo(connection)
+
+
+def get_profiles_repo(
+    connection: Annotated[Redis, Depends(get_cache_connection)],
+) -> ProfilesRepo:
+    return ProfilesRepo(connection)
+
+
+def get_login_throttle_repo(
+    connection: Annotated[Redis, Depends(get_cache_connection)],
+    app_settings: Annotated[Settings, Depends(get_app_settings)],
+) -> LoginThrottleRepo:
+    return LoginThrottleRepo(
+        connection,
+        window=timedelta(seconds=app_settings.login_throttle_window),
+        username_limit=app_settings.login_throttle_username_limit,
+        ip_limit=app_settings.login_throttle_ip_limit,
+    )
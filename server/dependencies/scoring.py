@@ -0,0 +1,8 @@
+from fastapi import FastAPI, Request
+
+from ..utils.calc_score import ScoreCalculator
+
+
+async def get_score_calculator(request: Request) -> ScoreCalculator:
+    app: FastAPI = request.app
+    return app.state.score_calculator
@@ -0,0 +1,216 @@
+import zlib
+from typing import Callable, Protocol
+
+import brotli
+import zstandard
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..utils.settings import Settings
+
+# Already compressed or streamed event by event, where buffering in a compressor delays delivery
+_UNCOMPRESSIBLE_TYPES = ("image/", "video/", "audio/", "text/event-stream", "application/zip")
+
+
+class _Compressor(Protocol):
+    def compress(self, data: bytes) -> bytes: ...
+
+    def flush(self) -> bytes: ...
+
+    def finish(self) -> bytes: ...
+
+
+class _GzipCompressor:
+    def __init__(self, level: int) -> None:
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _BrotliCompressor:
+    def __init__(self, quality: int) -> None:
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class _ZstdCompressor:
+    def __init__(self, level: int) -> None:
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+_COMPRESSORS: dict[str, Callable[[int], _Compressor]] = {
+    "gzip": _GzipCompressor,
+    "br": _BrotliCompressor,
+    "zstd": _ZstdCompressor,
+}
+
+
+def make_compressor(encoding: str, level: int) -> _Compressor:
+    return _COMPRESSORS[encoding](level)
+
+
+def negotiate_encoding(accept_encoding: str, supported: tuple[str, ...]) -> str | None:
+    """Picks the encoding the client prefers most, ties are resolved in the `supported` order."""
+    accepted: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    best, best_quality = None, 0.0
+    for encoding in supported:
+        if encoding not in _COMPRESSORS:
+            continue
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class CompressionMiddleware:
+    """Compresses response bodies with the best of the encodings accepted by the client.
+
+    Bodies smaller than `COMPRESSION_MIN_SIZE` are sent as is, the size is known from the
+    `Content-Length` header or from the first body message. Bodies sent in multiple messages
+    (chunked or NDJSON streams) are compressed on the fly, message by message, without buffering
+    the whole body. Streams without `Content-Length` are flushed after every message, so each one
+    reaches the client as soon as it is sent. Server-Sent Events are never compressed at all.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        settings: Settings = scope["app"].state.settings
+        encoding = negotiate_encoding(
+            Headers(scope=scope).get("Accept-Encoding", ""),
+            settings.compression_encodings,
+        )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        level = {
+            "gzip": settings.compression_gzip_level,
+            "br": settings.compression_brotli_quality,
+            "zstd": settings.compression_zstd_level,
+        }[encoding]
+        responder = _CompressedResponder(
+            self.app,
+            encoding=encoding,
+            level=level,
+            min_size=settings.compression_min_size,
+        )
+        await responder(scope, receive, send)
+
+
+class _CompressedResponder:
+    def __init__(self, app: ASGIApp, *, encoding: str, level: int, min_size: int) -> None:
+        self.app = app
+        self.encoding = encoding
+        self.level = level
+        self.min_size = min_size
+        self.send: Send | None = None
+        self.start_message: Message | None = None
+        self.compressor: _Compressor | None = None
+        self.streaming = False
+        self.passthrough = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    def _is_compressible(self, message: Message) -> bool:
+        headers = Headers(raw=message["headers"])
+        if message["status"] < 200 or message["status"] in (204, 304):
+            return False
+        if "Content-Encoding" in headers or "Content-Range" in headers:
+            return False
+        if headers.get("Content-Type", "").startswith(_UNCOMPRESSIBLE_TYPES):
+            return False
+        content_length = headers.get("Content-Length")
+        return content_length is None or int(content_length) >= self.min_size
+
+    async def send_compressed(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            if self._is_compressible(message):
+                # Sent with the first body message, as a copy so that the inner app's one stays as is
+                self.start_message = {**message, "headers": list(message["headers"])}
+            else:
+                self.passthrough = True
+                await self.send(message)
+            return
+        if self.passthrough or message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body: bytes = message.get("body", b"")
+        more_body: bool = message.get("more_body", False)
+        if self.compressor is not None:
+            compressed = self.compressor.compress(body)
+            if not more_body:
+                compressed += self.compressor.finish()
+            elif self.streaming:
+                compressed += self.compressor.flush()
+            if compressed or not more_body:
+                await self.send(
+                    {"type": "http.response.body", "body": compressed, "more_body": more_body}
+                )
+            return
+
+        if not more_body and len(body) < self.min_size:
+            self.passthrough = True
+            await self.send(self.start_message)
+            await self.send(message)
+            return
+        self.compressor = make_compressor(self.encoding, self.level)
+        compressed = self.compressor.compress(body)
+        headers = MutableHeaders(scope=self.start_message)
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if "ETag" in headers and not headers["ETag"].startswith("W/"):
+            # The compressed body is a different representation, only semantically the same
+            headers["ETag"] = "W/" + headers["ETag"]
+        if more_body:
+            # Without a length the body is produced over time, don't hold back what is ready
+            self.streaming = "Content-Length" not in headers
+            if self.streaming:
+                compressed += self.compressor.flush()
+            del headers["Content-Length"]
+        else:
+            compressed += self.compressor.finish()
+            headers["Content-Length"] = str(len(compressed))
+        await self.send(self.start_message)
+        await self.send({"type": "http.response.body", "body": compressed, "more_body": more_body})
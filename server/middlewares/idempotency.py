@@ -0,0 +1,155 @@
+import hashlib
+from datetime import timedelta
+
+from fastapi import status
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..repo.cache import IdempotencyRepo, StoredResponse
+from ..utils.responses import FastJSONResponse
+from ..utils.settings import Settings
+
+_MAX_KEY_LENGTH = 255
+# Larger responses are sent as usual, but not stored
+_MAX_STORED_BODY = 1024 * 1024
+
+
+def _hash(*parts: bytes) -> str:
+    return hashlib.blake2b(b"\x1f".join(parts), digest_size=16).hexdigest()
+
+
+class IdempotencyMiddleware:
+    """Replays the stored response to a POST request retried with the same `Idempotency-Key`.
+
+    Keys are scoped by the `Authorization` header, so clients can't see each other's responses.
+    A replay is answered from Redis without running the endpoint, and marked with the
+    `Idempotent-Replayed` header. Reusing a key for a different request is rejected with 422, and a
+    duplicate arriving while the first request is still processed gets 409 with `Retry-After`.
+    Server errors (and 429) aren't stored, so the request may be retried with the same key.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        idempotency_key = headers.get("Idempotency-Key")
+        if idempotency_key is None:
+            await self.app(scope, receive, send)
+            return
+        if not 0 < len(idempotency_key) <= _MAX_KEY_LENGTH:
+            response = FastJSONResponse(
+                {"detail": f"Idempotency-Key must be 1 to {_MAX_KEY_LENGTH} characters long"},
+                status_code=status.HTTP_400_BAD_REQUEST,
+            )
+            await response(scope, receive, send)
+            return
+
+        settings: Settings = scope["app"].state.settings
+        repo = IdempotencyRepo(scope["app"].state.redis_pool)
+        key = _hash(headers.get("Authorization", "").encode(), idempotency_key.encode())
+        # The whole request is read here, it is passed on to the endpoint below
+        messages: list[Message] = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            messages.append(message)
+            more_body = message.get("more_body", False) and message["type"] == "http.request"
+        fingerprint = _hash(
+            scope["path"].encode(),
+            scope["query_string"],
+            *(message.get("body", b"") for message in messages),
+        ).encode()
+
+        stored = await repo.get_response(key)
+        if stored is None:
+            lock_token = await repo.acquire_lock(
+                key, expire=timedelta(seconds=settings.idempotency_lock_ttl)
+            )
+            if lock_token is None:
+                response = FastJSONResponse(
+                    {"detail": "A request with this Idempotency-Key is being processed"},
+                    status_code=status.HTTP_409_CONFLICT,
+                    headers={"Retry-After": "1"},
+                )
+                await response(scope, receive, send)
+                return
+            try:
+                # The first request may have finished between the two reads
+                stored = await repo.get_response(key)
+                if stored is None:
+                    await self._run_and_store(
+                        scope, messages, receive, send, repo, key, fingerprint
+                    )
+                    return
+            finally:
+                await repo.release_lock(key, lock_token)
+
+        if stored.fingerprint != fingerprint:
+            response = FastJSONResponse(
+                {"detail": "Idempotency-Key was already used for a different request"},
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+            await response(scope, receive, send)
+            return
+        await send(
+            {
+                "type": "http.response.start",
+                "status": stored.status,
+                "headers": [*stored.headers, (b"idempotent-replayed", b"true")],
+            }
+        )
+        await send({"type": "http.response.body", "body": stored.body})
+
+    async def _run_and_store(
+        self,
+        scope: Scope,
+        messages: list[Message],
+        receive: Receive,
+        send: Send,
+        repo: IdempotencyRepo,
+        key: str,
+        fingerprint: bytes,
+    ) -> None:
+        settings: Settings = scope["app"].state.settings
+        start_message: Message | None = None
+        body: list[bytes] = []
+        body_size = 0
+
+        async def replay_receive() -> Message:
+            if messages:
+                return messages.pop(0)
+            return await receive()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message, body_size
+            if message["type"] == "http.response.start":
+                # Copied before sending, outer middlewares may change the headers of the message
+                start_message = {**message, "headers": list(message.get("headers", []))}
+                await send(message)
+                return
+            await send(message)
+            if message["type"] != "http.response.body" or start_message is None:
+                return
+            body.append(message.get("body", b""))
+            body_size += len(body[-1])
+            if message.get("more_body", False) or body_size > _MAX_STORED_BODY:
+                return
+            if start_message["status"] >= 500 or start_message["status"] == 429:
+                return
+            # Stored as soon as the response is sent, before background tasks of the endpoint
+            await repo.save_response(
+                key,
+                StoredResponse(
+                    fingerprint=fingerprint,
+                    status=start_message["status"],
+                    headers=list(start_message.get("headers", [])),
+                    body=b"".join(body),
+                ),
+                expire=timedelta(seconds=settings.idempotency_key_ttl),
+            )
+
+        await self.app(scope, replay_receive, send_wrapper)
@@ -0,0 +1,58 @@
+import secrets
+
+from starlette.datastructures import Headers, QueryParams
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..utils.profiler import StackSampler
+from ..utils.settings import Settings
+
+
+class ProfilerMiddleware:
+    """Profiles a single request on demand and returns the profile instead of the response body.
+
+    Profiling is requested with the `X-Profile-Token` header or the `profile_token` query parameter
+    holding the configured `PROFILER_TOKEN`. The profile covers everything the app does for the
+    request, including dependency resolution and response serialization. The original status code
+    is reported in the `X-Profiled-Status` header.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    @staticmethod
+    def _is_requested(scope: Scope, token: str) -> bool:
+        supplied = Headers(scope=scope).get("X-Profile-Token")
+        if supplied is None:
+            supplied = QueryParams(scope["query_string"]).get("profile_token")
+        return supplied is not None and secrets.compare_digest(supplied, token)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        settings: Settings = scope["app"].state.settings
+        if settings.profiler_token is None or not self._is_requested(
+            scope, settings.profiler_token
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def discard_body(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+
+        with StackSampler(interval=settings.profiler_interval_ms / 1000) as sampler:
+            await self.app(scope, receive, discard_body)
+        response = PlainTextResponse(
+            sampler.render_collapsed(),
+            headers={
+                "X-Profiled-Status": str(status_code),
+                "X-Profile-Samples": str(sampler.sample_count),
+                "Content-Disposition": 'attachment; filename="profile.folded"',
+            },
+        )
+        await response(scope, receive, send)
@@ -0,0 +1,53 @@
+import logging
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..utils.request_context import RequestContext, current_request_context
+from ..utils.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+
+class RequestContextMiddleware:
+    """Binds a `RequestContext` to every HTTP request and reports query budget overruns.
+
+    When a query budget is configured, the number of executed SQL statements is exposed in the
+    `X-Query-Count` response header, and requests going over the budget are logged together with
+    the statements they repeated.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        settings: Settings = scope["app"].state.settings
+        ctx = RequestContext(
+            scope=scope,
+            query_budget=settings.sql_query_budget,
+            query_budget_strict=settings.sql_query_budget_strict,
+        )
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and ctx.query_budget is not None:
+                headers = MutableHeaders(scope=message)
+                headers["X-Query-Count"] = str(ctx.query_count)
+            await send(message)
+
+        token = current_request_context.set(ctx)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_request_context.reset(token)
+            if ctx.query_budget is not None and ctx.query_count > ctx.query_budget:
+                logger.warning(
+                    "%s %s issued %d SQL statements (budget is %d), repeated: %r",
+                    scope["method"],
+                    ctx.route_path,
+                    ctx.query_count,
+                    ctx.query_budget,
+                    ctx.repeated_statements(),
+                )
@@ -4,7 +4,7 @@ from uuid import UUID
 
 from pydantic import BaseModel, Field
 
-from ..utils.enums import Role, Team
+from ..utils.enums import Role, SubmissionStatus, Team
 
 
 class GamePlayer(BaseModel):
@@ -50,3 +50,32 @@ class NewGameResult(BaseGameResult):
 
 class GameResult(BaseGameResult):
     finished_at: datetime.datetime
+
+
+class GamesBatchGet(BaseModel):
+    ids: Annotated[list[UUID], Field(min_length=1, max_length=500)]
+    include_results: bool = False
+
+
+class GameWithResult(Game):
+    # Also `None` when results weren't requested
+    result: GameResult | None = None
+
+
+class GamesBatch(BaseModel):
+    games: list[GameWithResult]
+    missing: list[UUID]
+
+
+class GameResultSubmission(NewGameResult):
+    game_id: UUID
+
+
+class GameResultsBatchSubmission(BaseModel):
+    results: Annotated[list[GameResultSubmission], Field(min_length=1, max_length=200)]
+
+
+class GameResultSubmissionOutcome(BaseModel):
+    game_id: UUID
+    status: SubmissionStatus
+    result: GameResult | None = None
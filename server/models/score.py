@@ -1,3 +1,5 @@
+from functools import cached_property
+
 from pydantic import BaseModel, computed_field
 
 from ..utils.enums import Role
@@ -21,6 +23,7 @@ class CountByRole(BaseModel):
 
 
 class ScoreRow(BaseModel):
+    # Computed fields are cached: rows are built once from final counters and never modified
     nickname: str
     judge_extra_points: float = 0
     judge_penalty_points: float = 0
@@ -38,33 +41,53 @@ class ScoreRow(BaseModel):
     guessed_mafia_counts: list[int] = [0, 0, 0, 0]
 
     @computed_field
-    @property
+    @cached_property
     def win_count(self) -> int:
         return self.wins_by_role.sum
 
     @computed_field
-    @property
+    @cached_property
     def play_count(self) -> int:
         return self.games_by_role.sum
 
     @computed_field
-    @property
+    @cached_property
     def total_extra_points(self) -> float:
         return self.judge_extra_points + self.best_turn_points
 
     @computed_field
-    @property
+    @cached_property
     def total_penalty_points(self) -> float:
         return (
             self.judge_penalty_points + self.times_kicked * 0.5 + self.times_caused_other_team_won
         )
 
     @computed_field
-    @property
+    @cached_property
     def sum(self) -> float:
         return self.win_count + self.total_extra_points - self.total_penalty_points + self.ci_points
 
     @computed_field
-    @property
+    @cached_property
     def win_rate(self) -> float | None:
         return (self.win_count / self.play_count) if self.play_count > 0 else None
+
+
+class RankedPlayer(BaseModel):
+    nickname: str
+    rank: int
+    sum: float
+
+
+class RoundStandings(BaseModel):
+    round: int
+    standings: list[RankedPlayer]
+
+
+class RankDelta(BaseModel):
+    nickname: str
+    rank_from: int | None
+    rank_to: int
+    # Positive when the player went up the ranking, `None` if they weren't ranked before
+    rank_delta: int | None
+    sum_delta: float
@@ -0,0 +1,35 @@
+from uuid import UUID
+
+from pydantic import BaseModel
+
+from ..utils.enums import SyncEntity
+from .game import Game, GameResult
+from .player import Player
+from .tournament import Table, Tournament
+
+
+class SyncTable(Table):
+    tournament_id: UUID
+
+
+class SyncGameResult(GameResult):
+    game_id: UUID
+
+
+class DeletedRecord(BaseModel):
+    entity: SyncEntity
+    id: UUID
+
+
+class SyncChanges(BaseModel):
+    """Records changed after a cursor. Deletions are to be applied before the other changes."""
+
+    players: list[Player]
+    tournaments: list[Tournament]
+    tables: list[SyncTable]
+    games: list[Game]
+    results: list[SyncGameResult]
+    deleted: list[DeletedRecord]
+    # Pass as `since` to get the following changes
+    cursor: int
+    has_more: bool
@@ -1,7 +1,8 @@
 import datetime
+from typing import Annotated
 from uuid import UUID
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class NewTournament(BaseModel):
@@ -22,3 +23,13 @@ class Table(BaseModel):
     id: UUID
     number: int
     judge_nickname: str
+
+
+class RosterPlayers(BaseModel):
+    player_ids: Annotated[list[UUID], Field(min_length=1, max_length=500)]
+
+
+class RosterChange(BaseModel):
+    changed: list[UUID]
+    # Already on (or missing from) the roster, or not existing at all
+    unchanged: list[UUID]
@@ -5,3 +5,9 @@ class User(BaseModel):
     username: str
     nickname: str
     real_name: str
+
+
+class UserProfile(User):
+    """User with the ID of their player, as cached for authenticated requests."""
+
+    player_id: str
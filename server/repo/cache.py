@@ -1,9 +1,20 @@
+import hashlib
+import secrets
+import time
+from dataclasses import dataclass
 from datetime import timedelta
-from typing import overload
+from typing import Iterable, overload
 
+import pydantic_core
 from redis.asyncio import Redis
 
-from ..utils.security import generate_auth_token, generate_refresh_token
+from ..models.user import UserProfile
+from ..utils.security import (
+    generate_auth_token,
+    generate_refresh_token,
+    sign_access_token,
+    verify_access_token,
+)
 from .base import BaseRepo
 
 
@@ -76,3 +87,230 @@ class AuthRepo(BaseRepo[Redis]):
     async def revoke_all_tokens(self, user_id: str) -> None:
         auth_keys, refresh_keys = await self._find_keys(user_id)
         await self._conn.delete(*auth_keys, *refresh_keys)
+
+
+class SignedAuthRepo(AuthRepo):
+    """Issues signed access tokens, verified without Redis, see `AUTH_MODE`.
+
+    Only refresh tokens are kept in Redis, with the time they were issued at. A refresh token is
+    deleted when used, other sessions of the user are left alone. Revoking tokens of a user moves
+    their revocation watermark instead of looking the tokens up: refresh tokens issued before it
+    are rejected, access tokens stay valid until they expire.
+    """
+
+    _REFRESH_FORMAT = "signed_refresh:{token}"
+    _WATERMARK_FORMAT = "revoked:{user_id}"
+
+    def __init__(self, connection: Redis, *, secret: bytes, access_expire: timedelta) -> None:
+        super().__init__(connection)
+        self._secret = secret
+        self._access_expire = access_expire
+
+    async def _now_us(self) -> int:
+        # Time of Redis, so that instances with skewed clocks agree on the watermark
+        seconds, microseconds = await self._conn.time()
+        return seconds * 1_000_000 + microseconds
+
+    async def save_user_auth(self, user_id: str) -> tuple[str, str]:
+        expires_at = int(time.time() + self._access_expire.total_seconds())
+        auth = sign_access_token(self._secret, user_id, expires_at=expires_at)
+        refresh = generate_refresh_token()
+        await self._conn.set(
+            self._REFRESH_FORMAT.format(token=refresh),
+            f"{user_id}:{await self._now_us()}",
+            ex=self._REFRESH_EXPIRE,
+        )
+        return auth, refresh
+
+    async def get_user_id_by_auth(self, auth_token: str) -> str | None:
+        return verify_access_token(self._secret, auth_token, now=time.time())
+
+    async def update_tokens_by_refresh(self, refresh_token: str) -> tuple[str, str] | None:
+        refresh_key = self._REFRESH_FORMAT.format(token=refresh_token)
+        refresh = _b2u(await self._conn.getdel(refresh_key))
+        if refresh is None:
+            return None
+        user_id, _, issued_at = refresh.rpartition(":")
+        watermark = await self._conn.get(self._WATERMARK_FORMAT.format(user_id=user_id))
+        if watermark is not None and int(issued_at) < int(watermark):
+            return None
+        return await self.save_user_auth(user_id)
+
+    async def revoke_all_tokens(self, user_id: str) -> None:
+        # Refresh tokens issued before it have expired once the watermark does
+        await self._conn.set(
+            self._WATERMARK_FORMAT.format(user_id=user_id),
+            await self._now_us(),
+            ex=self._REFRESH_EXPIRE,
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class StoredResponse:
+    fingerprint: bytes
+    status: int
+    headers: list[tuple[bytes, bytes]]
+    body: bytes
+
+
+class IdempotencyRepo(BaseRepo[Redis]):
+    """Responses to requests made with an `Idempotency-Key`, and locks of the ones in progress."""
+
+    _RESPONSE_FORMAT = "idempotency:{key}"
+    _LOCK_FORMAT = "idempotency:{key}:lock"
+    # Deletes the lock only if it is still held by the caller, it may have expired meanwhile
+    _RELEASE_SCRIPT = """
+        if redis.call("GET", KEYS[1]) == ARGV[1] then
+            return redis.call("DEL", KEYS[1])
+        end
+        return 0
+    """
+
+    async def get_response(self, key: str) -> StoredResponse | None:
+        stored = await self._conn.hgetall(self._RESPONSE_FORMAT.format(key=key))
+        if not stored:
+            return None
+        return StoredResponse(
+            fingerprint=stored[b"fingerprint"],
+            status=int(stored[b"status"]),
+            headers=[
+                (name.encode("latin-1"), value.encode("latin-1"))
+                for name, value in pydantic_core.from_json(stored[b"headers"])
+            ],
+            body=stored[b"body"],
+        )
+
+    async def save_response(
+        self,
+        key: str,
+        response: StoredResponse,
+        *,
+        expire: timedelta,
+    ) -> None:
+        response_key = self._RESPONSE_FORMAT.format(key=key)
+        headers = [
+            (name.decode("latin-1"), value.decode("latin-1")) for name, value in response.headers
+        ]
+        async with self._conn.pipeline() as pipe:
+            pipe.hset(
+                response_key,
+                mapping={
+                    "fingerprint": response.fingerprint,
+                    "status": response.status,
+                    "headers": pydantic_core.to_json(headers),
+                    "body": response.body,
+                },
+            )
+            pipe.expire(response_key, expire)
+            await pipe.execute()
+
+    async def acquire_lock(self, key: str, *, expire: timedelta) -> str | None:
+        """Returns a token to release the lock with, or None if the lock is already held."""
+        token = secrets.token_hex(16)
+        if await self._conn.set(self._LOCK_FORMAT.format(key=key), token, ex=expire, nx=True):
+            return token
+        return None
+
+    async def release_lock(self, key: str, token: str) -> None:
+        await self._conn.eval(self._RELEASE_SCRIPT, 1, self._LOCK_FORMAT.format(key=key), token)
+
+
+class ProfilesRepo(BaseRepo[Redis]):
+    """Profiles of the users making authenticated requests, see `get_current_user`.
+
+    Writes changing a profile mark it stale in their session, it is dropped from here once the
+    session is committed.
+    """
+
+    _PROFILE_FORMAT = "profile:{user_id}"
+
+    async def get(self, user_id: str) -> UserProfile | None:
+        profile = await self._conn.get(self._PROFILE_FORMAT.format(user_id=user_id))
+        if profile is None:
+            return None
+        return UserProfile.model_validate_json(profile)
+
+    async def save(self, user_id: str, profile: UserProfile, *, expire: timedelta) -> None:
+        await self._conn.set(
+            self._PROFILE_FORMAT.format(user_id=user_id),
+            pydantic_core.to_json(profile),
+            ex=expire,
+        )
+
+    async def invalidate(self, user_ids: Iterable[str]) -> None:
+        keys = [self._PROFILE_FORMAT.format(user_id=user_id) for user_id in user_ids]
+        if keys:
+            await self._conn.delete(*keys)
+
+
+class LoginThrottleRepo(BaseRepo[Redis]):
+    """Sliding windows of login attempts per username and per client IP.
+
+    Attempts are checked and recorded before the password is verified, so that a flood of them
+    can't keep the CPU busy with hashing. Rejected attempts aren't recorded.
+    """
+
+    _USERNAME_FORMAT = "login_throttle:username:{username}"
+    _IP_FORMAT = "login_throttle:ip:{ip}"
+    # KEYS are sorted sets of attempt times per subject, ARGV are the window in microseconds, a
+    # nonce and the limits per key. Returns microseconds until the attempt is allowed, or 0 after
+    # recording it.
+    _HIT_SCRIPT = """
+        local time = redis.call("TIME")
+        local now = tonumber(time[1]) * 1000000 + tonumber(time[2])
+        local window = tonumber(ARGV[1])
+        local retry_after = 0
+        for i, key in ipairs(KEYS) do
+            redis.call("ZREMRANGEBYSCORE", key, "-inf", now - window)
+            if redis.call("ZCARD", key) >= tonumber(ARGV[i + 2]) then
+                local oldest = redis.call("ZRANGE", key, 0, 0, "WITHSCORES")
+                retry_after = math.max(retry_after, tonumber(oldest[2]) + window - now)
+            end
+        end
+        if retry_after > 0 then
+            return retry_after
+        end
+        for _, key in ipairs(KEYS) do
+            redis.call("ZADD", key, now, now .. ":" .. ARGV[2])
+            redis.call("PEXPIRE", key, math.ceil(window / 1000))
+        end
+        return 0
+    """
+
+    def __init__(
+        self,
+        connection: Redis,
+        *,
+        window: timedelta,
+        username_limit: int,
+        ip_limit: int,
+    ) -> None:
+        super().__init__(connection)
+        self._window = window
+        self._username_limit = username_limit
+        self._ip_limit = ip_limit
+
+    def _username_key(self, username: str) -> str:
+        # Usernames come straight from the request, keys stay short whatever they are
+        digest = hashlib.blake2b(username.encode(), digest_size=16).hexdigest()
+        return self._USERNAME_FORMAT.format(username=digest)
+
+    async def hit(self, *, username: str, ip: str) -> timedelta | None:
+        """Records a login attempt, or returns how long to wait if it is over a limit."""
+        retry_after = await self._conn.eval(
+            self._HIT_SCRIPT,
+            2,
+            self._username_key(username),
+            self._IP_FORMAT.format(ip=ip),
+            self._window // timedelta(microseconds=1),
+            secrets.token_hex(4),
+            self._username_limit,
+            self._ip_limit,
+        )
+        if retry_after == 0:
+            return None
+        return timedelta(microseconds=retry_after)
+
+    async def reset_username(self, username: str) -> None:
+        """Forgets attempts of a username, e.g. after a successful login."""
+        await self._conn.delete(self._username_key(username))
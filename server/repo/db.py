@@ -1,8 +1,24 @@
+import asyncio
 import datetime
-from typing import AsyncIterator, overload
+from collections import defaultdict
+from typing import AsyncIterator, Iterable, overload
+from uuid import UUID
 
-from sqlalchemy import delete, func, select, text, update
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import (
+    ColumnElement,
+    Select,
+    String,
+    cast,
+    delete,
+    func,
+    literal,
+    literal_column,
+    select,
+    text,
+    union_all,
+    update,
+)
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -16,22 +32,93 @@ from ..models.game import (
     PlayerResult,
 )
 from ..models.player import Player
+from ..models.sync import DeletedRecord, SyncChanges, SyncGameResult, SyncTable
 from ..models.tournament import Table, Tournament
-from ..models.user import User
+from ..models.user import User, UserProfile
+from ..utils.calc_score import CompactSeat, Standings
 from ..utils.datetime_utils import get_current_datetime_utc
+from ..utils.enums import SyncEntity
 from ..utils.exceptions.repo import (
     InvalidPasswordError,
     PlayerAlreadyExistsError,
+    PlayerNotFoundError,
     UserAlreadyExistsError,
     UserNotFoundError,
 )
+from ..utils.model_construct import construct
 from ..utils.security import password_context
 from .base import BaseRepo
+from .loader import get_loader
 
 type WithID[T] = tuple[str, T]
+type Versioned = tuple[str, datetime.datetime]  # (version, end date of the tournament)
 SQLDefault = text("DEFAULT")
 
 
+# Values of the columns ordering changes of synced records, see `SyncRepo`
+_NEW_CHANGE = dict(
+    change_seq=func.nextval(db_models.change_seq.name),
+    change_xid=literal_column("pg_current_xact_id()::text::bigint"),
+)
+
+
+_LIKE_ESCAPE = "/"
+
+
+def _escape_like(text_: str) -> str:
+    for char in (_LIKE_ESCAPE, "%", "_"):
+        text_ = text_.replace(char, _LIKE_ESCAPE + char)
+    return text_
+
+
+_STALE_PROFILES_KEY = "stale_profiles"
+
+
+def _invalidate_profiles(session: AsyncSession, user_ids: Iterable[str]) -> None:
+    session.info.setdefault(_STALE_PROFILES_KEY, set()).update(user_ids)
+
+
+def pop_stale_profiles(session: AsyncSession) -> set[str]:
+    """Returns IDs of the users whose cached profiles the writes made in the session outdated.
+
+    They are to be dropped from the cache once the session is committed, see `ProfilesRepo`.
+    """
+    return session.info.pop(_STALE_PROFILES_KEY, set())
+
+
+def _games_of_player(player_id: str) -> Select[tuple[str]]:
+    return select(db_models.GamePlayer.game_id).where(db_models.GamePlayer.player_id == player_id)
+
+
+def _xmin(model: type[db_models.BaseDBModel]) -> ColumnElement[str]:
+    # ID of the transaction which last inserted or updated the row, it works as a row version
+    return literal_column(f"{model.__tablename__}.xmin::text")
+
+
+# Changes whenever any of the aggregated games, their players (e.g. nicknames) or results change
+_GAMES_VERSION = func.coalesce(
+    func.md5(
+        func.string_agg(
+            func.concat(
+                _xmin(db_models.Game),
+                ":",
+                _xmin(db_models.GamePlayer),
+                ":",
+                _xmin(db_models.Player),
+                ":",
+                _xmin(db_models.GameResult),
+            ),
+            aggregate_order_by(
+                literal_column("','"),
+                db_models.GamePlayer.game_id,
+                db_models.GamePlayer.seat,
+            ),
+        )
+    ),
+    "",
+)
+
+
 class UsersRepo(BaseRepo[AsyncSession]):
     @overload
     async def _db_to_model(self, db_user: None, db_player: db_models.Player | None = None) -> None:
@@ -55,14 +142,28 @@ class UsersRepo(BaseRepo[AsyncSession]):
         if db_player is None:
             players = PlayersRepo(self._conn)
             db_player = await players.get_by_id(db_user.player_id)
-        return User(
+        return construct(
+            User,
             username=db_user.username,
             nickname=db_player.nickname,
             real_name=db_player.real_name,
         )
 
     async def get_by_id(self, user_id: str) -> User | None:
-        return await self._db_to_model(await self._conn.get(db_models.User, user_id))
+        return await self._db_to_model(await get_loader(self._conn, db_models.User).load(user_id))
+
+    async def get_profile(self, user_id: str) -> UserProfile | None:
+        db_user = await get_loader(self._conn, db_models.User).load(user_id)
+        if db_user is None:
+            return None
+        db_player = await get_loader(self._conn, db_models.Player).load(db_user.player_id)
+        return construct(
+            UserProfile,
+            username=db_user.username,
+            nickname=db_player.nickname,
+            real_name=db_player.real_name,
+            player_id=db_user.player_id,
+        )
 
     async def get_by_username(self, username: str) -> User | None:
         query = select(db_models.User).where(db_models.User.username == username)
@@ -82,7 +183,7 @@ class UsersRepo(BaseRepo[AsyncSession]):
         return True
 
     async def verify_password(self, user_id: str, password: str) -> bool:
-        user: User | None = await self._conn.get(db_models.User, user_id)
+        user: User | None = await get_loader(self._conn, db_models.User).load(user_id)
         if user is None:
             return False
         return await self._verify_password(user, password)
@@ -184,6 +285,7 @@ class UsersRepo(BaseRepo[AsyncSession]):
             .where(db_models.User.id == user_id)
             .values(password_hash=password_hash)
         )
+        _invalidate_profiles(self._conn, [user_id])
 
 
 class PlayersRepo(BaseRepo[AsyncSession]):
@@ -191,14 +293,15 @@ class PlayersRepo(BaseRepo[AsyncSession]):
     def _db_to_model(db_player: db_models.Player | None) -> Player | None:
         if db_player is None:
             return None
-        return Player(
-            id=db_player.id,
+        return construct(
+            Player,
+            id=UUID(db_player.id),
             nickname=db_player.nickname,
             real_name=db_player.real_name,
         )
 
     async def get_by_id(self, player_id: str) -> Player | None:
-        return self._db_to_model(await self._conn.get(db_models.Player, player_id))
+        return self._db_to_model(await get_loader(self._conn, db_models.Player).load(player_id))
 
     async def get_by_nickname(self, nickname: str) -> Player | None:
         query = select(db_models.Player).where(db_models.Player.nickname == nickname)
@@ -209,6 +312,41 @@ class PlayersRepo(BaseRepo[AsyncSession]):
         query = select(db_models.Player)
         return [self._db_to_model(p) for p in (await self._conn.execute(query)).scalars().all()]
 
+    async def search(self, text_: str, *, limit: int) -> list[Player]:
+        """Finds players by nickname, ignoring case and diacritics.
+
+        Nicknames starting with the text come first, then the most similar others.
+        """
+        key = db_models.search_key(db_models.Player.nickname)
+        # The prefix index is in the "C" collation, byte order allows a range scan for LIKE
+        prefix_key = key.collate("C")
+        prefix_query = (
+            select(db_models.Player)
+            .where(
+                prefix_key.like(
+                    db_models.search_key(literal(_escape_like(text_))) + "%",
+                    escape=_LIKE_ESCAPE,
+                )
+            )
+            .order_by(prefix_key)
+            .limit(limit)
+        )
+        players = {
+            player.id: player for player in (await self._conn.execute(prefix_query)).scalars()
+        }
+        if len(players) < limit:
+            # `%` is "similar enough" and `<->` is the distance, both served by the trigram index
+            text_key = db_models.search_key(literal(text_))
+            similar_query = (
+                select(db_models.Player)
+                .where(key.op("%")(text_key))
+                .order_by(key.op("<->")(text_key))
+                .limit(limit)
+            )
+            for player in (await self._conn.execute(similar_query)).scalars():
+                players.setdefault(player.id, player)
+        return [self._db_to_model(player) for player in list(players.values())[:limit]]
+
     async def get_all_as_stream(self) -> AsyncIterator[Player]:
         query = select(db_models.Player).order_by(db_models.Player.id)
         async for player in await self._conn.stream_scalars(query):
@@ -218,6 +356,10 @@ class PlayersRepo(BaseRepo[AsyncSession]):
         query = select(func.count()).select_from(db_models.Player)
         return (await self._conn.execute(query)).scalar()
 
+    async def _invalidate_profiles(self, player_id: str) -> None:
+        query = select(db_models.User.id).where(db_models.User.player_id == player_id)
+        _invalidate_profiles(self._conn, (await self._conn.execute(query)).scalars())
+
     async def edit_or_create(
         self,
         nickname: str,
@@ -225,6 +367,7 @@ class PlayersRepo(BaseRepo[AsyncSession]):
         real_name: str,
         id_: str | None,
     ) -> Player:
+        sync = SyncRepo(self._conn)
         query = (
             insert(db_models.Player)
             .values(
@@ -234,17 +377,45 @@ class PlayersRepo(BaseRepo[AsyncSession]):
             )
             .on_conflict_do_update(
                 index_elements=[db_models.Player.id],
-                set_=dict(nickname=nickname, real_name=real_name),
+                set_=dict(nickname=nickname, real_name=real_name, **_NEW_CHANGE),
             )
             .returning(db_models.Player)
+            # A renamed player may already be loaded in the session
+            .execution_options(populate_existing=True)
         )
         try:
             result = await self._conn.execute(query)
         except IntegrityError as e:
             raise PlayerAlreadyExistsError(nickname) from e
+        if id_ is not None:
+            # Standings, games, tables and user profiles show the nickname, which may have changed
+            await self._invalidate_profiles(id_)
+            await StandingsRepo(self._conn).invalidate_by_player(id_)
+            await sync.mark_changed(db_models.Game, db_models.Game.id.in_(_games_of_player(id_)))
+            await sync.mark_changed(db_models.Table, db_models.Table.judge_id == id_)
         return self._db_to_model(result.scalar_one())
 
     async def delete(self, player_id: str) -> None:
+        await self._invalidate_profiles(player_id)
+        await StandingsRepo(self._conn).invalidate_by_player(player_id)
+        sync = SyncRepo(self._conn)
+        await sync.record_deleted(
+            SyncEntity.PLAYER,
+            select(db_models.Player.id).where(db_models.Player.id == player_id),
+        )
+        # Deleting the player cascades to their user and tournaments created by it, to the tables
+        # they judge and to their seats in games
+        await sync.record_deleted_tournaments(
+            db_models.Tournament.created_by_user_id.in_(
+                select(db_models.User.id).where(db_models.User.player_id == player_id)
+            )
+        )
+        await sync.record_deleted_tables(db_models.Table.judge_id == player_id)
+        await sync.mark_changed(db_models.Game, db_models.Game.id.in_(_games_of_player(player_id)))
+        await sync.mark_changed(
+            db_models.GameResult,
+            db_models.GameResult.game_id.in_(_games_of_player(player_id)),
+        )
         await self._conn.execute(delete(db_models.Player).where(db_models.Player.id == player_id))
 
 
@@ -253,15 +424,24 @@ class TournamentsRepo(BaseRepo[AsyncSession]):
     def _db_to_model(db_tournament: db_models.Tournament | None) -> Tournament | None:
         if db_tournament is None:
             return None
-        return Tournament(
-            id=db_tournament.id,
+        return construct(
+            Tournament,
+            id=UUID(db_tournament.id),
             name=db_tournament.name,
             date_from=db_tournament.date_from,
             date_to=db_tournament.date_to,
         )
 
     async def get_by_id(self, tournament_id: str) -> Tournament | None:
-        return self._db_to_model(await self._conn.get(db_models.Tournament, tournament_id))
+        return self._db_to_model(
+            await get_loader(self._conn, db_models.Tournament).load(tournament_id)
+        )
+
+    async def get_version(self, tournament_id: str) -> Versioned | None:
+        query = select(_xmin(db_models.Tournament), db_models.Tournament.date_to).where(
+            db_models.Tournament.id == tournament_id
+        )
+        return (await self._conn.execute(query)).tuples().one_or_none()
 
     async def get_all(self) -> list[Tournament]:
         query = select(db_models.Tournament)
@@ -308,24 +488,105 @@ class TournamentsRepo(BaseRepo[AsyncSession]):
         await self._conn.execute(
             update(db_models.Tournament)
             .where(db_models.Tournament.id == tournament_id)
-            .values(name=name)
+            .values(name=name, **_NEW_CHANGE)
         )
 
     async def edit_date_from(self, tournament_id: str, date_from: datetime.datetime) -> None:
         await self._conn.execute(
             update(db_models.Tournament)
             .where(db_models.Tournament.id == tournament_id)
-            .values(date_from=date_from)
+            .values(date_from=date_from, **_NEW_CHANGE)
         )
 
     async def edit_date_to(self, tournament_id: str, date_to: datetime.datetime) -> None:
         await self._conn.execute(
             update(db_models.Tournament)
             .where(db_models.Tournament.id == tournament_id)
-            .values(date_to=date_to)
+            .values(date_to=date_to, **_NEW_CHANGE)
         )
 
 
+class RosterRepo(BaseRepo[AsyncSession]):
+    """Players registered for a tournament."""
+
+    async def get_page(
+        self,
+        tournament_id: str,
+        *,
+        page: int,
+        page_size: int,
+    ) -> tuple[list[Player], int]:
+        """Returns players of the page in nickname order, and the total number of players."""
+        criteria = db_models.TournamentPlayer.tournament_id == tournament_id
+        count_query = select(func.count()).select_from(db_models.TournamentPlayer).where(criteria)
+        query = (
+            select(db_models.Player)
+            .join(db_models.TournamentPlayer)
+            .where(criteria)
+            .order_by(db_models.Player.nickname)
+            .offset((page - 1) * page_size)
+            .limit(page_size)
+        )
+        players = [
+            PlayersRepo._db_to_model(player)
+            for player in (await self._conn.execute(query)).scalars()
+        ]
+        return players, (await self._conn.execute(count_query)).scalar()
+
+    async def get_nickname_map(self, tournament_id: str) -> dict[str, str]:
+        """Returns IDs of players on the roster by nickname, in a single query."""
+        query = (
+            select(db_models.Player.nickname, db_models.Player.id)
+            .join(db_models.TournamentPlayer)
+            .where(db_models.TournamentPlayer.tournament_id == tournament_id)
+        )
+        return dict((await self._conn.execute(query)).tuples().all())
+
+    async def add(self, tournament_id: str, player_ids: list[str]) -> list[str]:
+        """Adds the existing players to the roster, returns IDs of the ones which weren't on it."""
+        query = (
+            insert(db_models.TournamentPlayer)
+            .from_select(
+                [db_models.TournamentPlayer.player_id, db_models.TournamentPlayer.tournament_id],
+                select(
+                    db_models.Player.id,
+                    literal(tournament_id, db_models.TournamentPlayer.tournament_id.type),
+                ).where(db_models.Player.id.in_(player_ids)),
+            )
+            .on_conflict_do_nothing()
+            .returning(db_models.TournamentPlayer.player_id)
+        )
+        return list((await self._conn.execute(query)).scalars())
+
+    async def add_by_nicknames(self, tournament_id: str, nicknames: set[str]) -> dict[str, str]:
+        """Adds the players to the roster, returns IDs of the existing ones by nickname."""
+        query = select(db_models.Player.nickname, db_models.Player.id).where(
+            db_models.Player.nickname.in_(nicknames)
+        )
+        player_ids = dict((await self._conn.execute(query)).tuples().all())
+        if player_ids:
+            await self._conn.execute(
+                insert(db_models.TournamentPlayer).on_conflict_do_nothing(),
+                [
+                    dict(player_id=player_id, tournament_id=tournament_id)
+                    for player_id in player_ids.values()
+                ],
+            )
+        return player_ids
+
+    async def remove(self, tournament_id: str, player_ids: list[str]) -> list[str]:
+        """Removes the players from the roster, returns IDs of the ones which were on it."""
+        query = (
+            delete(db_models.TournamentPlayer)
+            .where(
+                db_models.TournamentPlayer.tournament_id == tournament_id,
+                db_models.TournamentPlayer.player_id.in_(player_ids),
+            )
+            .returning(db_models.TournamentPlayer.player_id)
+        )
+        return list((await self._conn.execute(query)).scalars())
+
+
 class TablesRepo(BaseRepo[AsyncSession]):
     async def _db_to_model(
         self,
@@ -335,24 +596,40 @@ class TablesRepo(BaseRepo[AsyncSession]):
         if db_table is None:
             return None
         if judge_nickname is None:
-            query = select(db_models.Player).where(db_models.Player.id == db_table.judge_id)
-            judge_player = (await self._conn.execute(query)).scalar_one()
+            judge_player = await get_loader(self._conn, db_models.Player).load(db_table.judge_id)
             judge_nickname = judge_player.nickname
-        return Table(
-            id=db_table.id,
+        return construct(
+            Table,
+            id=UUID(db_table.id),
             number=db_table.number,
             judge_nickname=judge_nickname,
         )
 
     async def get_by_id(self, table_id: str) -> Table | None:
-        return await self._db_to_model(await self._conn.get(db_models.Table, table_id))
+        return await self._db_to_model(await get_loader(self._conn, db_models.Table).load(table_id))
+
+    async def get_version(self, table_id: str) -> Versioned | None:
+        query = (
+            select(
+                func.concat(_xmin(db_models.Table), ":", _xmin(db_models.Player)),
+                db_models.Tournament.date_to,
+            )
+            .select_from(db_models.Table)
+            .join(db_models.Player, db_models.Player.id == db_models.Table.judge_id)
+            .join(db_models.Tournament)
+            .where(db_models.Table.id == table_id)
+        )
+        return (await self._conn.execute(query)).tuples().one_or_none()
+
+    async def get_tournament_id(self, table_id: str) -> str | None:
+        query = select(db_models.Table.tournament_id).where(db_models.Table.id == table_id)
+        return (await self._conn.execute(query)).scalar_one_or_none()
 
     async def get_by_tournament(self, tournament_id: str) -> list[Table]:
         query = select(db_models.Table).where(db_models.Table.tournament_id == tournament_id)
-        return [
-            await self._db_to_model(table)
-            for table in (await self._conn.execute(query)).scalars().all()
-        ]
+        tables = (await self._conn.execute(query)).scalars().all()
+        # Judges of all tables are loaded by a single batched query
+        return list(await asyncio.gather(*(self._db_to_model(table) for table in tables)))
 
     async def get_by_tournament_as_stream(self, tournament_id: str) -> AsyncIterator[Table]:
         query = select(db_models.Table).where(db_models.Table.tournament_id == tournament_id)
@@ -377,6 +654,9 @@ class TablesRepo(BaseRepo[AsyncSession]):
         return await self._db_to_model(res, judge_username)
 
     async def delete(self, table_id: str) -> None:
+        await StandingsRepo(self._conn).invalidate_by_table(table_id)
+        sync = SyncRepo(self._conn)
+        await sync.record_deleted_tables(db_models.Table.id == table_id)
         await self._conn.execute(delete(db_models.Table).where(db_models.Table.id == table_id))
 
 
@@ -396,14 +676,15 @@ class GamesRepo(BaseRepo[AsyncSession]):
                 .order_by(db_models.GamePlayer.seat)
             )
             players = [
-                GamePlayer(nickname=nickname, role=role)
+                construct(GamePlayer, nickname=nickname, role=role)
                 for nickname, role in await self._conn.execute(query)
             ]
-        return Game(
-            id=db_game.id,
+        return construct(
+            Game,
+            id=UUID(db_game.id),
             number=db_game.number,
             players=players,
-            table_id=db_game.table_id,
+            table_id=UUID(db_game.table_id),
         )
 
     async def _db_result_to_model(
@@ -424,7 +705,8 @@ class GamesRepo(BaseRepo[AsyncSession]):
                 db_models.GamePlayerExtraScore.game_id == db_game_result.game_id
             )
             player_results = [
-                PlayerResult(
+                construct(
+                    PlayerResult,
                     warn_count=item.warn_count,
                     was_kicked=item.was_kicked,
                     caused_other_team_won=item.caused_other_team_won,
@@ -433,7 +715,7 @@ class GamesRepo(BaseRepo[AsyncSession]):
                     was_killed_first_night=item.was_killed_first_night,
                     guessed_mafia_count=item.guessed_mafia_count,
                     extra_scores=[
-                        PlayerExtraScore(points=score.score, reason=score.reason)
+                        construct(PlayerExtraScore, points=score.score, reason=score.reason)
                         for score in (
                             await self._conn.execute(
                                 q_score.where(db_models.GamePlayerExtraScore.seat == item.seat)
@@ -445,14 +727,129 @@ class GamesRepo(BaseRepo[AsyncSession]):
                 )
                 for item in (await self._conn.execute(query)).scalars()
             ]
-        return GameResult(
+        return construct(
+            GameResult,
             winner=db_game_result.winner,
             results=player_results,
             finished_at=db_game_result.finished_at,
         )
 
     async def get_by_id(self, game_id: str) -> Game | None:
-        return await self._db_to_model(await self._conn.get(db_models.Game, game_id))
+        return await self._db_to_model(await get_loader(self._conn, db_models.Game).load(game_id))
+
+    async def get_many(self, game_ids: list[str]) -> list[Game]:
+        """Returns the existing ones of the games in two queries, in no particular order."""
+        query = select(db_models.Game).where(db_models.Game.id.in_(game_ids))
+        db_games = (await self._conn.execute(query)).scalars().all()
+        players_query = (
+            select(
+                db_models.GamePlayer.game_id, db_models.Player.nickname, db_models.GamePlayer.role
+            )
+            .outerjoin(db_models.Player)
+            .where(db_models.GamePlayer.game_id.in_(game_ids))
+            .order_by(db_models.GamePlayer.game_id, db_models.GamePlayer.seat)
+        )
+        players: defaultdict[str, list[GamePlayer]] = defaultdict(list)
+        for game_id, nickname, role in await self._conn.execute(players_query):
+            players[game_id].append(construct(GamePlayer, nickname=nickname, role=role))
+        return [await self._db_to_model(db_game, players[db_game.id]) for db_game in db_games]
+
+    async def get_many_results(self, game_ids: list[str]) -> dict[str, GameResult]:
+        """Returns results of the games having one by game ID, in three queries."""
+        query = select(db_models.GameResult).where(db_models.GameResult.game_id.in_(game_ids))
+        db_results = (await self._conn.execute(query)).scalars().all()
+        scores_query = select(db_models.GamePlayerExtraScore).where(
+            db_models.GamePlayerExtraScore.game_id.in_(game_ids)
+        )
+        extra_scores: defaultdict[tuple[str, int], list[PlayerExtraScore]] = defaultdict(list)
+        for score in (await self._conn.execute(scores_query)).scalars():
+            extra_scores[score.game_id, score.seat].append(
+                construct(PlayerExtraScore, points=score.score, reason=score.reason)
+            )
+        player_results_query = (
+            select(db_models.GamePlayerResult)
+            .where(db_models.GamePlayerResult.game_id.in_(game_ids))
+            .order_by(db_models.GamePlayerResult.game_id, db_models.GamePlayerResult.seat)
+        )
+        player_results: defaultdict[str, list[PlayerResult]] = defaultdict(list)
+        for item in (await self._conn.execute(player_results_query)).scalars():
+            player_results[item.game_id].append(
+                construct(
+                    PlayerResult,
+                    warn_count=item.warn_count,
+                    was_kicked=item.was_kicked,
+                    caused_other_team_won=item.caused_other_team_won,
+                    found_mafia_count=item.found_mafia_count,
+                    has_found_sheriff=item.has_found_sheriff,
+                    was_killed_first_night=item.was_killed_first_night,
+                    guessed_mafia_count=item.guessed_mafia_count,
+                    extra_scores=extra_scores[item.game_id, item.seat],
+                )
+            )
+        return {
+            db_result.game_id: await self._db_result_to_model(
+                db_result, player_results[db_result.game_id]
+            )
+            for db_result in db_results
+        }
+
+    @staticmethod
+    def _games_version_query(*criteria: ColumnElement[bool]) -> Select[tuple[str]]:
+        return (
+            select(_GAMES_VERSION)
+            .select_from(db_models.Game)
+            .join(db_models.GamePlayer)
+            .outerjoin(db_models.Player, db_models.Player.id == db_models.GamePlayer.player_id)
+            .outerjoin(db_models.GameResult, db_models.GameResult.game_id == db_models.Game.id)
+            .where(*criteria)
+            .correlate(None)
+        )
+
+    async def get_version(self, game_id: str) -> Versioned | None:
+        query = (
+            select(
+                self._games_version_query(db_models.Game.id == game_id).scalar_subquery(),
+                db_models.Tournament.date_to,
+            )
+            .select_from(db_models.Game)
+            .join(db_models.Table)
+            .join(db_models.Tournament)
+            .where(db_models.Game.id == game_id)
+        )
+        return (await self._conn.execute(query)).tuples().one_or_none()
+
+    async def get_result_version(self, game_id: str) -> Versioned | None:
+        """Returns the version of the game result, `None` if the game or its result don't exist."""
+        query = (
+            select(_xmin(db_models.GameResult), db_models.Tournament.date_to)
+            .select_from(db_models.GameResult)
+            .join(db_models.Game)
+            .join(db_models.Table)
+            .join(db_models.Tournament)
+            .where(db_models.GameResult.game_id == game_id)
+        )
+        return (await self._conn.execute(query)).tuples().one_or_none()
+
+    async def get_by_table_version(self, table_id: str) -> Versioned | None:
+        query = (
+            select(
+                self._games_version_query(db_models.Game.table_id == table_id).scalar_subquery(),
+                db_models.Tournament.date_to,
+            )
+            .select_from(db_models.Table)
+            .join(db_models.Tournament)
+            .where(db_models.Table.id == table_id)
+        )
+        return (await self._conn.execute(query)).tuples().one_or_none()
+
+    async def get_tournament_version(self, tournament_id: str) -> str:
+        """Returns the version of all games of the tournament, their players and results."""
+        query = self._games_version_query(
+            db_models.Game.table_id.in_(
+                select(db_models.Table.id).where(db_models.Table.tournament_id == tournament_id)
+            )
+        )
+        return (await self._conn.execute(query)).scalar_one()
 
     async def get_by_table(
         self,
@@ -497,6 +894,22 @@ class GamesRepo(BaseRepo[AsyncSession]):
         players: list[GamePlayer],
         id_: str | None = None,
     ) -> Game:
+        # Seats are resolved against the roster of the tournament, loaded in a single query
+        tournament_id = await TablesRepo(self._conn).get_tournament_id(table_id)
+        roster = RosterRepo(self._conn)
+        player_ids = await roster.get_nickname_map(tournament_id)
+        not_on_roster = {
+            player.nickname
+            for player in players
+            if player.nickname is not None and player.nickname not in player_ids
+        }
+        if not_on_roster:
+            # Players join the roster of the tournament by playing in it
+            player_ids |= await roster.add_by_nicknames(tournament_id, not_on_roster)
+            unknown = not_on_roster - player_ids.keys()
+            if unknown:
+                raise PlayerNotFoundError(min(unknown))
+
         last_number_query = select(func.max(db_models.Game.number)).where(
             db_models.Game.table_id == table_id
         )
@@ -513,20 +926,139 @@ class GamesRepo(BaseRepo[AsyncSession]):
             .returning(db_models.Game)
         )
         res = (await self._conn.execute(query)).scalar_one()
-        game_id = res.id
-        players_repo = PlayersRepo(self._conn)
-        for seat, player in enumerate(players, start=1):
-            if player.nickname is not None:
-                player_id = (await players_repo.get_by_nickname(player.nickname)).id
-            else:
-                player_id = None
-            await self._conn.execute(
-                insert(db_models.GamePlayer)
-                .values(game_id=game_id, player_id=player_id, role=player.role, seat=seat)
-                .returning(db_models.GamePlayer)
-            )
+        await self._conn.execute(
+            insert(db_models.GamePlayer),
+            [
+                dict(
+                    game_id=res.id,
+                    player_id=player_ids[player.nickname] if player.nickname is not None else None,
+                    role=player.role,
+                    seat=seat,
+                )
+                for seat, player in enumerate(players, start=1)
+            ],
+        )
         return await self._db_to_model(res, players)
 
+    @staticmethod
+    def _tournament_seats_query(
+        tournament_id: str,
+        *,
+        played_from: datetime.datetime | None = None,
+        played_to: datetime.datetime | None = None,
+        after_round: int | None = None,
+        until_round: int | None = None,
+    ) -> Select[CompactSeat]:
+        extra_score = db_models.GamePlayerExtraScore.score
+        query = (
+            select(
+                db_models.Player.nickname,
+                db_models.GamePlayer.role,
+                db_models.GameResult.winner,
+                db_models.GamePlayerResult.warn_count,
+                db_models.GamePlayerResult.was_kicked,
+                db_models.GamePlayerResult.caused_other_team_won,
+                db_models.GamePlayerResult.found_mafia_count,
+                db_models.GamePlayerResult.has_found_sheriff,
+                db_models.GamePlayerResult.was_killed_first_night,
+                db_models.GamePlayerResult.guessed_mafia_count,
+                func.coalesce(func.sum(extra_score).filter(extra_score > 0), 0.0),
+                func.coalesce(func.sum(extra_score).filter(extra_score < 0), 0.0),
+            )
+            .select_from(db_models.Game)
+            .join(db_models.Table)
+            .join(db_models.GameResult)
+            .join(db_models.GamePlayer)
+            .join(db_models.Player)
+            .join(
+                db_models.GamePlayerResult,
+                (db_models.GamePlayerResult.game_id == db_models.GamePlayer.game_id)
+                & (db_models.GamePlayerResult.seat == db_models.GamePlayer.seat),
+            )
+            .outerjoin(
+                db_models.GamePlayerExtraScore,
+                (db_models.GamePlayerExtraScore.game_id == db_models.GamePlayer.game_id)
+                & (db_models.GamePlayerExtraScore.seat == db_models.GamePlayer.seat),
+            )
+            .where(db_models.Table.tournament_id == tournament_id)
+            .group_by(
+                db_models.Game.id,
+                db_models.GamePlayer.game_id,
+                db_models.GamePlayer.seat,
+                db_models.Player.nickname,
+                db_models.GameResult.winner,
+                db_models.GamePlayerResult.game_id,
+                db_models.GamePlayerResult.seat,
+            )
+        )
+        if played_from is not None:
+            query = query.where(db_models.GameResult.finished_at >= played_from)
+        if played_to is not None:
+            query = query.where(db_models.GameResult.finished_at <= played_to)
+        if after_round is not None:
+            query = query.where(db_models.Game.number > after_round)
+        if until_round is not None:
+            query = query.where(db_models.Game.number <= until_round)
+        return query
+
+    async def get_tournament_seats(
+        self,
+        tournament_id: str,
+        *,
+        played_from: datetime.datetime | None = None,
+        played_to: datetime.datetime | None = None,
+        after_round: int | None = None,
+        until_round: int | None = None,
+    ) -> list[CompactSeat]:
+        """Returns non-guest seats of finished tournament games, ready for scoring.
+
+        A round consists of games with the same number at all tables of the tournament.
+        """
+        query = self._tournament_seats_query(
+            tournament_id,
+            played_from=played_from,
+            played_to=played_to,
+            after_round=after_round,
+            until_round=until_round,
+        )
+        return [tuple(row) for row in await self._conn.execute(query)]
+
+    async def get_tournament_seats_by_round(
+        self,
+        tournament_id: str,
+        *,
+        after_round: int | None = None,
+        until_round: int | None = None,
+    ) -> dict[int, list[CompactSeat]]:
+        """Returns non-guest seats of finished tournament games grouped by round, in round order."""
+        query = (
+            self._tournament_seats_query(
+                tournament_id,
+                after_round=after_round,
+                until_round=until_round,
+            )
+            .add_columns(db_models.Game.number)
+            .order_by(db_models.Game.number)
+        )
+        seats: dict[int, list[CompactSeat]] = {}
+        for *seat, round_ in await self._conn.execute(query):
+            seats.setdefault(round_, []).append(tuple(seat))
+        return seats
+
+    async def get_tournaments_and_judges(self, game_ids: list[str]) -> dict[str, tuple[str, str]]:
+        """Returns the tournament ID and the judge nickname of every existing game by game ID."""
+        query = (
+            select(db_models.Game.id, db_models.Table.tournament_id, db_models.Player.nickname)
+            .select_from(db_models.Game)
+            .join(db_models.Table)
+            .join(db_models.Player, db_models.Player.id == db_models.Table.judge_id)
+            .where(db_models.Game.id.in_(game_ids))
+        )
+        return {
+            game_id: (tournament_id, judge_nickname)
+            for game_id, tournament_id, judge_nickname in await self._conn.execute(query)
+        }
+
     async def get_result(self, game_id: str) -> GameResult | None:
         query = select(db_models.GameResult).where(db_models.GameResult.game_id == game_id)
         return await self._db_result_to_model(
@@ -573,4 +1105,398 @@ class GamesRepo(BaseRepo[AsyncSession]):
             await self._conn.execute(
                 insert(db_models.GameLog).values(game_id=game_id, raw_game_log=result.raw_game_log)
             )
+        await StandingsRepo(self._conn).refresh_by_game(game_id)
         return await self._db_result_to_model(db_result, result.results)
+
+    async def set_many_results(self, results: dict[str, NewGameResult]) -> dict[str, GameResult]:
+        """Stores results of many games, inserting all rows of a table in a single statement.
+
+        Games which already have a result are skipped and are missing from the returned mapping.
+        """
+        now = get_current_datetime_utc()
+        query = (
+            insert(db_models.GameResult)
+            .values(
+                [
+                    {
+                        "game_id": game_id,
+                        "winner": result.winner,
+                        "finished_at": (
+                            result.finished_at if result.finished_at is not None else now
+                        ),
+                    }
+                    for game_id, result in results.items()
+                ]
+            )
+            .on_conflict_do_nothing()
+            .returning(db_models.GameResult)
+        )
+        db_results = (await self._conn.execute(query)).scalars().all()
+        if not db_results:
+            return {}
+        player_rows = []
+        extra_score_rows = []
+        game_log_rows = []
+        for db_result in db_results:
+            result = results[db_result.game_id]
+            for seat, player_result in enumerate(result.results, start=1):
+                player_rows.append(
+                    {
+                        "game_id": db_result.game_id,
+                        "seat": seat,
+                        "warn_count": player_result.warn_count,
+                        "was_kicked": player_result.was_kicked,
+                        "caused_other_team_won": player_result.caused_other_team_won,
+                        "found_mafia_count": player_result.found_mafia_count,
+                        "has_found_sheriff": player_result.has_found_sheriff,
+                        "was_killed_first_night": player_result.was_killed_first_night,
+                        "guessed_mafia_count": player_result.guessed_mafia_count,
+                    }
+                )
+                extra_score_rows.extend(
+                    {
+                        "game_id": db_result.game_id,
+                        "seat": seat,
+                        "score": extra_score.points,
+                        "reason": extra_score.reason,
+                    }
+                    for extra_score in player_result.extra_scores
+                )
+            if result.raw_game_log is not None:
+                game_log_rows.append(
+                    {"game_id": db_result.game_id, "raw_game_log": result.raw_game_log}
+                )
+        await self._conn.execute(insert(db_models.GamePlayerResult), player_rows)
+        if extra_score_rows:
+            await self._conn.execute(insert(db_models.GamePlayerExtraScore), extra_score_rows)
+        if game_log_rows:
+            await self._conn.execute(insert(db_models.GameLog), game_log_rows)
+        await StandingsRepo(self._conn).refresh_by_games([r.game_id for r in db_results])
+        return {
+            db_result.game_id: await self._db_result_to_model(
+                db_result, results[db_result.game_id].results
+            )
+            for db_result in db_results
+        }
+
+
+class StandingsRepo(BaseRepo[AsyncSession]):
+    """Tournament standings after a round, computed from stored snapshots.
+
+    Standings after round N are the latest snapshot at or before round N plus seats of the games
+    played since. Snapshots become stale when a game of their round or an earlier one changes, so
+    they are deleted then. Setting results stores them again right away, other changes leave it to
+    the next read.
+
+    Snapshots are written under a per-tournament advisory lock: writers changing seats hold it
+    exclusively from the invalidation until they commit, readers storing snapshots hold it shared.
+    So a reader never stores standings missing a result committed after it read the seats, the
+    writer would have to wait for it and delete them.
+    """
+
+    _LOCK_CLASS = 0x7374616E  # "stan"
+
+    async def _lock(self, tournament_id: str, *, shared: bool) -> None:
+        lock = func.pg_advisory_xact_lock_shared if shared else func.pg_advisory_xact_lock
+        await self._conn.execute(select(lock(self._LOCK_CLASS, func.hashtext(tournament_id))))
+
+    async def _get_snapshot(self, tournament_id: str, until_round: int) -> tuple[int, Standings]:
+        """Returns the latest snapshot at or before the round, or the empty one before round 1."""
+        query = (
+            select(db_models.StandingsSnapshot)
+            .where(
+                db_models.StandingsSnapshot.tournament_id == tournament_id,
+                db_models.StandingsSnapshot.round <= until_round,
+            )
+            .order_by(db_models.StandingsSnapshot.round.desc())
+            .limit(1)
+        )
+        snapshot = (await self._conn.execute(query)).scalar_one_or_none()
+        if snapshot is None:
+            return 0, Standings()
+        return snapshot.round, Standings.from_json(snapshot.standings)
+
+    async def _extend(
+        self,
+        tournament_id: str,
+        standings: Standings,
+        *,
+        after_round: int,
+        until_round: int | None = None,
+    ) -> list[tuple[int, Standings]]:
+        """Adds seats of the rounds to the standings, storing a snapshot after each round.
+
+        Must be called holding the lock. Returns standings after each of the rounds having seats.
+        """
+        games = GamesRepo(self._conn)
+        seats_by_round = await games.get_tournament_seats_by_round(
+            tournament_id,
+            after_round=after_round,
+            until_round=until_round,
+        )
+        history = []
+        for round_, seats in seats_by_round.items():
+            standings.add(seats)
+            history.append((round_, standings.copy()))
+        if history:
+            await self._conn.execute(
+                insert(db_models.StandingsSnapshot)
+                .values(
+                    [
+                        dict(tournament_id=tournament_id, round=round_, standings=after.to_json())
+                        for round_, after in history
+                    ]
+                )
+                .on_conflict_do_nothing()
+            )
+        return history
+
+    async def get_after_round(self, tournament_id: str, round_: int) -> Standings:
+        snapshot_round, standings = await self._get_snapshot(tournament_id, round_)
+        if snapshot_round == round_:
+            return standings
+        await self._lock(tournament_id, shared=True)
+        # Read again, a writer may have replaced the snapshots while we waited for the lock
+        snapshot_round, standings = await self._get_snapshot(tournament_id, round_)
+        if snapshot_round == round_:
+            return standings
+        history = await self._extend(
+            tournament_id,
+            standings,
+            after_round=snapshot_round,
+            until_round=round_,
+        )
+        return history[-1][1] if history else standings
+
+    async def get_history(self, tournament_id: str) -> list[tuple[int, Standings]]:
+        """Returns standings after every round having finished games, in round order."""
+        await self._lock(tournament_id, shared=True)
+        query = (
+            select(db_models.StandingsSnapshot.round, db_models.StandingsSnapshot.standings)
+            .where(db_models.StandingsSnapshot.tournament_id == tournament_id)
+            .order_by(db_models.StandingsSnapshot.round)
+        )
+        # Snapshots are stored for every round having seats up to the last stored one
+        history = [
+            (round_, Standings.from_json(standings))
+            for round_, standings in await self._conn.execute(query)
+        ]
+        last_round, standings = history[-1] if history else (0, Standings())
+        history += await self._extend(tournament_id, standings.copy(), after_round=last_round)
+        return history
+
+    async def _invalidate(self, tournament_ids: list[str], from_round: int = 1) -> None:
+        for tournament_id in sorted(tournament_ids):  # The same order everywhere, no deadlocks
+            await self._lock(tournament_id, shared=False)
+        await self._conn.execute(
+            delete(db_models.StandingsSnapshot).where(
+                db_models.StandingsSnapshot.tournament_id.in_(tournament_ids),
+                db_models.StandingsSnapshot.round >= from_round,
+            )
+        )
+
+    async def refresh_by_game(self, game_id: str) -> None:
+        await self.refresh_by_games([game_id])
+
+    async def refresh_by_games(self, game_ids: list[str]) -> None:
+        """Stores snapshots again after results of the games are set, must be called after that."""
+        query = (
+            select(db_models.Table.tournament_id, func.min(db_models.Game.number))
+            .join(db_models.Game)
+            .where(db_models.Game.id.in_(game_ids))
+            .group_by(db_models.Table.tournament_id)
+            .order_by(db_models.Table.tournament_id)
+        )
+        for tournament_id, round_ in (await self._conn.execute(query)).all():
+            await self._invalidate([tournament_id], from_round=round_)
+            snapshot_round, standings = await self._get_snapshot(tournament_id, round_ - 1)
+            await self._extend(tournament_id, standings, after_round=snapshot_round)
+
+    async def invalidate_by_table(self, table_id: str) -> None:
+        query = select(db_models.Table.tournament_id).where(db_models.Table.id == table_id)
+        await self._invalidate(list((await self._conn.execute(query)).scalars()))
+
+    async def invalidate_by_player(self, player_id: str) -> None:
+        """Invalidates standings of tournaments the player played in, e.g. after renaming them."""
+        query = (
+            select(db_models.Table.tournament_id)
+            .join(db_models.Game)
+            .join(db_models.GamePlayer)
+            .where(db_models.GamePlayer.player_id == player_id)
+            .distinct()
+        )
+        await self._invalidate(list((await self._conn.execute(query)).scalars()))
+
+
+class SyncRepo(BaseRepo[AsyncSession]):
+    """Changes of synced records in the order of the transactions which made them.
+
+    Every write of a synced record takes a new `change_seq` value and stores the id of its
+    transaction in `change_xid`, deleted records leave a tombstone with both. Values are taken
+    before the transaction commits, so a later one may commit first. Changes are thus returned in
+    the order of transaction ids and only from transactions older than any still running, which
+    no longer change. The cursor is the id of the last returned transaction, a page never splits a
+    transaction, so it may hold more than `limit` records.
+    """
+
+    _CHANGED_MODELS = {
+        SyncEntity.PLAYER: (db_models.Player, db_models.Player.id),
+        SyncEntity.TOURNAMENT: (db_models.Tournament, db_models.Tournament.id),
+        SyncEntity.TABLE: (db_models.Table, db_models.Table.id),
+        SyncEntity.GAME: (db_models.Game, db_models.Game.id),
+        SyncEntity.RESULT: (db_models.GameResult, db_models.GameResult.game_id),
+    }
+
+    async def mark_changed(
+        self,
+        model: type[db_models.BaseDBModel],
+        *criteria: ColumnElement[bool],
+    ) -> None:
+        await self._conn.execute(update(model).where(*criteria).values(**_NEW_CHANGE))
+
+    async def record_deleted(self, entity: SyncEntity, ids: Select[tuple[str]]) -> None:
+        await self._conn.execute(
+            insert(db_models.DeletedRecord).from_select(
+                [db_models.DeletedRecord.entity, db_models.DeletedRecord.entity_id],
+                select(literal(entity, db_models.DeletedRecord.entity.type), ids.subquery()),
+            )
+        )
+
+    async def record_deleted_tables(self, *criteria: ColumnElement[bool]) -> None:
+        """Records deletion of the tables and of their games and results, deleted in cascade."""
+        table_ids = select(db_models.Table.id).where(*criteria)
+        game_ids = select(db_models.Game.id).where(db_models.Game.table_id.in_(table_ids))
+        await self.record_deleted(SyncEntity.TABLE, table_ids)
+        await self.record_deleted(SyncEntity.GAME, game_ids)
+        await self.record_deleted(
+            SyncEntity.RESULT,
+            select(db_models.GameResult.game_id).where(db_models.GameResult.game_id.in_(game_ids)),
+        )
+
+    async def record_deleted_tournaments(self, *criteria: ColumnElement[bool]) -> None:
+        """Records deletion of the tournaments and of everything in them, deleted in cascade."""
+        tournament_ids = select(db_models.Tournament.id).where(*criteria)
+        await self.record_deleted(SyncEntity.TOURNAMENT, tournament_ids)
+        await self.record_deleted_tables(db_models.Table.tournament_id.in_(tournament_ids))
+
+    async def _get_visibility_horizon(self) -> int:
+        """Returns the id of the oldest running transaction, all older ones have finished."""
+        query = text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+        return (await self._conn.execute(query)).scalar_one()
+
+    async def _select_changes(
+        self,
+        after_xid: int,
+        before_xid: int,
+        limit: int | None = None,
+    ) -> list[tuple[int, str, str, bool]]:
+        """Returns `(change_xid, entity, id, is_deleted)` of changes made between the transactions."""
+        branches = [
+            select(
+                model.change_xid,
+                model.change_seq,
+                literal(entity.name).label("entity"),
+                id_column.label("id"),
+                literal(False).label("is_deleted"),
+            )
+            .where(model.change_xid > after_xid, model.change_xid < before_xid)
+            .order_by(model.change_xid, model.change_seq)
+            .limit(limit)
+            for entity, (model, id_column) in self._CHANGED_MODELS.items()
+        ]
+        branches.append(
+            select(
+                db_models.DeletedRecord.change_xid,
+                db_models.DeletedRecord.change_seq,
+                cast(db_models.DeletedRecord.entity, String),
+                db_models.DeletedRecord.entity_id,
+                literal(True),
+            )
+            .where(
+                db_models.DeletedRecord.change_xid > after_xid,
+                db_models.DeletedRecord.change_xid < before_xid,
+            )
+            .order_by(db_models.DeletedRecord.change_xid, db_models.DeletedRecord.change_seq)
+            .limit(limit)
+        )
+        changes = union_all(*branches).subquery()
+        query = (
+            select(changes.c.change_xid, changes.c.entity, changes.c.id, changes.c.is_deleted)
+            .order_by(changes.c.change_xid, changes.c.change_seq)
+            .limit(limit)
+        )
+        return list((await self._conn.execute(query)).tuples())
+
+    async def get_changes(self, since: int, limit: int) -> SyncChanges:
+        """Returns records changed or deleted after the `since` cursor, see the class docstring."""
+        until = await self._get_visibility_horizon()
+        rows = await self._select_changes(since, until, limit=limit + 1)
+        has_more = len(rows) > limit
+        if has_more:
+            # Drop the transaction which didn't fit, or return the whole of it if it's the only one
+            next_xid = rows[limit][0]
+            rows = [row for row in rows[:limit] if row[0] != next_xid]
+            if not rows:
+                rows = await self._select_changes(next_xid - 1, next_xid + 1)
+
+        changed: defaultdict[SyncEntity, list[str]] = defaultdict(list)
+        deleted = []
+        for _, entity, id_, is_deleted in rows:
+            if is_deleted:
+                deleted.append(construct(DeletedRecord, entity=SyncEntity[entity], id=UUID(id_)))
+            else:
+                changed[SyncEntity[entity]].append(id_)
+        games = GamesRepo(self._conn)
+        results = await games.get_many_results(changed[SyncEntity.RESULT])
+        return construct(
+            SyncChanges,
+            players=await self._get_players(changed[SyncEntity.PLAYER]),
+            tournaments=await self._get_tournaments(changed[SyncEntity.TOURNAMENT]),
+            tables=await self._get_tables(changed[SyncEntity.TABLE]),
+            games=await games.get_many(changed[SyncEntity.GAME]),
+            results=[
+                construct(
+                    SyncGameResult,
+                    game_id=UUID(game_id),
+                    winner=result.winner,
+                    results=result.results,
+                    finished_at=result.finished_at,
+                )
+                for game_id, result in results.items()
+            ],
+            deleted=deleted,
+            # Everything before `until` is returned when there is no more
+            cursor=rows[-1][0] if has_more else max(since, until - 1),
+            has_more=has_more,
+        )
+
+    async def _get_players(self, player_ids: list[str]) -> list[Player]:
+        query = select(db_models.Player).where(db_models.Player.id.in_(player_ids))
+        return [
+            PlayersRepo._db_to_model(player)
+            for player in (await self._conn.execute(query)).scalars()
+        ]
+
+    async def _get_tournaments(self, tournament_ids: list[str]) -> list[Tournament]:
+        query = select(db_models.Tournament).where(db_models.Tournament.id.in_(tournament_ids))
+        return [
+            TournamentsRepo._db_to_model(tournament)
+            for tournament in (await self._conn.execute(query)).scalars()
+        ]
+
+    async def _get_tables(self, table_ids: list[str]) -> list[SyncTable]:
+        query = (
+            select(db_models.Table, db_models.Player.nickname)
+            .join(db_models.Player, db_models.Player.id == db_models.Table.judge_id)
+            .where(db_models.Table.id.in_(table_ids))
+        )
+        return [
+            construct(
+                SyncTable,
+                id=UUID(table.id),
+                number=table.number,
+                judge_nickname=judge_nickname,
+                tournament_id=UUID(table.tournament_id),
+            )
+            for table, judge_nickname in await self._conn.execute(query)
+        ]
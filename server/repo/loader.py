@@ -0,0 +1,85 @@
+import asyncio
+
+from sqlalchemy import inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.util import identity_key
+
+from ..db import models as db_models
+
+
+class RowLoader[M: db_models.BaseDBModel]:
+    """Loads rows of a model by primary key, at most once per session.
+
+    Loaded rows and the ones already in the identity map of the session are returned without a
+    query, unless they were deleted or expired by an update since. Lookups made in the same event
+    loop iteration (e.g. by coroutines run with `asyncio.gather`) are batched into a single `IN`
+    query, like a dataloader.
+    """
+
+    def __init__(self, session: AsyncSession, model: type[M]) -> None:
+        self._session = session
+        self._model = model
+        (self._pk,) = model.__mapper__.primary_key
+        # The identity map only references rows weakly, these stay loaded until the session ends
+        self._rows: dict[str, M] = {}
+        self._pending: dict[str, asyncio.Future[M | None]] = {}
+        self._dispatcher: asyncio.Task[None] | None = None
+
+    def _cached(self, id_: str) -> M | None:
+        row = self._rows.get(id_)
+        if row is None:
+            row = self._session.identity_map.get(identity_key(self._model, id_))
+        if row is None:
+            return None
+        state = inspect(row)
+        if not state.persistent or state.expired_attributes:
+            # Deleted since, or expired by an update: can't be refreshed lazily with asyncio
+            return None
+        return row
+
+    async def load(self, id_: str) -> M | None:
+        id_ = str(id_)
+        row = self._cached(id_)
+        if row is not None:
+            return row
+        future = self._pending.get(id_)
+        if future is None:
+            if not self._pending:
+                self._dispatcher = asyncio.create_task(self._dispatch())
+            future = self._pending[id_] = asyncio.get_running_loop().create_future()
+        return await asyncio.shield(future)
+
+    async def load_many(self, ids: list[str]) -> dict[str, M]:
+        """Returns the existing ones of the rows by primary key."""
+        rows = await asyncio.gather(*(self.load(id_) for id_ in ids))
+        return {str(id_): row for id_, row in zip(ids, rows) if row is not None}
+
+    async def _dispatch(self) -> None:
+        await asyncio.sleep(0)  # Let the other lookups of this iteration join the batch
+        pending, self._pending = self._pending, {}
+        try:
+            query = select(self._model).where(self._pk.in_(pending))
+            rows = {
+                getattr(row, self._pk.key): row
+                for row in (await self._session.execute(query)).scalars()
+            }
+        except Exception as e:
+            for future in pending.values():
+                future.set_exception(e)
+            return
+        except BaseException:
+            for future in pending.values():
+                future.cancel()
+            raise
+        self._rows |= rows
+        for id_, future in pending.items():
+            future.set_result(rows.get(id_))
+
+
+def get_loader[M: db_models.BaseDBModel](session: AsyncSession, model: type[M]) -> RowLoader[M]:
+    """Returns the loader of the model shared by all repos using the session, i.e. the request."""
+    loaders: dict[type, RowLoader] = session.info.setdefault("row_loaders", {})
+    loader = loaders.get(model)
+    if loader is None:
+        loader = loaders[model] = RowLoader(session, model)
+    return loader
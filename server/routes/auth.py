@@ -1,13 +1,14 @@
+import math
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
 
 from ..dependencies.auth import get_current_user_id, login_form_data
-from ..dependencies.repo import get_auth_repo, get_users_repo
+from ..dependencies.repo import get_auth_repo, get_login_throttle_repo, get_users_repo
 from ..dependencies.settings import get_app_settings
 from ..models.auth import AuthData, ChangePasswordModel, LoginModel, RegisterModel, TokensModel
 from ..models.user import User
-from ..repo.cache import AuthRepo
+from ..repo.cache import AuthRepo, LoginThrottleRepo
 from ..repo.db import UsersRepo
 from ..utils.exceptions.repo import (
     InvalidPasswordError,
@@ -15,21 +16,36 @@ from ..utils.exceptions.repo import (
     UserAlreadyExistsError,
     UserNotFoundError,
 )
+from ..utils.routing import FastResponseRoute
 from ..utils.settings import Settings
 
 router = APIRouter(
     prefix="/auth",
     tags=["auth"],
+    route_class=FastResponseRoute,
 )
 
 
 @router.post("/login")
 async def login(
     *,
+    request: Request,
     login_form: Annotated[LoginModel, Depends(login_form_data)],
     users_repo: Annotated[UsersRepo, Depends(get_users_repo)],
     auth_repo: Annotated[AuthRepo, Depends(get_auth_repo)],
+    login_throttle_repo: Annotated[LoginThrottleRepo, Depends(get_login_throttle_repo)],
 ) -> AuthData:
+    # Before the user is queried and the password is hashed, floods of attempts stop here
+    retry_after = await login_throttle_repo.hit(
+        username=login_form.username,
+        ip=request.client.host if request.client is not None else "",
+    )
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts",
+            headers={"Retry-After": str(math.ceil(retry_after.total_seconds()))},
+        )
     try:
         user_id, user = await users_repo.try_login(login_form.username, login_form.password)
     except UserNotFoundError:
@@ -42,6 +58,7 @@ async def login(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid password",
         ) from None
+    await login_throttle_repo.reset_username(login_form.username)
     auth, refresh = await auth_repo.save_user_auth(user_id)
     return AuthData(
         user=user,
@@ -1,37 +1,94 @@
 from typing import Annotated
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Response, status
+import pydantic_core
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Response, status
 
-from ..dependencies.auth import get_current_user_id
-from ..dependencies.repo import get_games_repo, get_tables_repo, get_users_repo
-from ..models.game import Game, GameResult, NewGameResult
-from ..repo.db import GamesRepo, TablesRepo, UsersRepo
+from ..dependencies.auth import get_current_user
+from ..dependencies.live_feed import get_live_feed
+from ..dependencies.repo import get_games_repo, get_tables_repo
+from ..models.game import (
+    Game,
+    GameResult,
+    GameResultsBatchSubmission,
+    GameResultSubmissionOutcome,
+    GamesBatch,
+    GamesBatchGet,
+    GameWithResult,
+    NewGameResult,
+)
+from ..models.user import UserProfile
+from ..repo.db import GamesRepo, TablesRepo
+from ..utils.enums import SubmissionStatus
+from ..utils.etag import check_not_modified
+from ..utils.live_feed import LiveFeed
+from ..utils.model_construct import construct
+from ..utils.routing import FastResponseRoute
 
 router = APIRouter(
     prefix="/games",
     tags=["games"],
+    route_class=FastResponseRoute,
 )
 
 
-@router.get("/{game_id}/")
+@router.post("/batch-get")
+async def batch_get_games(
+    batch: GamesBatchGet,
+    *,
+    games_repo: Annotated[GamesRepo, Depends(get_games_repo)],
+) -> GamesBatch:
+    game_ids = list(dict.fromkeys(str(game_id) for game_id in batch.ids))
+    games = {str(game.id): game for game in await games_repo.get_many(game_ids)}
+    results = await games_repo.get_many_results(game_ids) if batch.include_results else {}
+    return construct(
+        GamesBatch,
+        games=[
+            construct(
+                GameWithResult,
+                id=game.id,
+                number=game.number,
+                players=game.players,
+                table_id=game.table_id,
+                result=results.get(game_id),
+            )
+            for game_id in game_ids
+            if (game := games.get(game_id)) is not None
+        ],
+        missing=[UUID(game_id) for game_id in game_ids if game_id not in games],
+    )
+
+
+@router.get("/{game_id}/", response_model=Game)
 async def get_game(
     game_id: UUID,
+    if_none_match: Annotated[str | None, Header()] = None,
     *,
+    response: Response,
     games_repo: Annotated[GamesRepo, Depends(get_games_repo)],
-) -> Game:
-    game = await games_repo.get_by_id(str(game_id))
-    if game is None:
+) -> Game | Response:
+    version = await games_repo.get_version(str(game_id))
+    if version is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Game not found")
-    return game
+    not_modified = check_not_modified(if_none_match, response, *version)
+    if not_modified is not None:
+        return not_modified
+    return await games_repo.get_by_id(str(game_id))
 
 
 @router.get("/{game_id}/result", response_model=GameResult)
 async def get_game_result(
     game_id: UUID,
+    if_none_match: Annotated[str | None, Header()] = None,
     *,
+    response: Response,
     games_repo: Annotated[GamesRepo, Depends(get_games_repo)],
 ) -> GameResult | Response:
+    version = await games_repo.get_result_version(str(game_id))
+    if version is not None:
+        not_modified = check_not_modified(if_none_match, response, *version)
+        if not_modified is not None:
+            return not_modified
     game = await games_repo.get_by_id(str(game_id))
     if game is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Game not found")
@@ -45,10 +102,11 @@ async def get_game_result(
 async def set_game_result(
     game_id: UUID,
     *,
-    current_user_id: Annotated[str, Depends(get_current_user_id)],
-    users_repo: Annotated[UsersRepo, Depends(get_users_repo)],
+    current_user: Annotated[UserProfile, Depends(get_current_user)],
     tables_repo: Annotated[TablesRepo, Depends(get_tables_repo)],
     games_repo: Annotated[GamesRepo, Depends(get_games_repo)],
+    live_feed: Annotated[LiveFeed, Depends(get_live_feed)],
+    background_tasks: BackgroundTasks,
     result: NewGameResult,
 ) -> GameResult:
     game = await games_repo.get_by_id(str(game_id))
@@ -57,7 +115,6 @@ async def set_game_result(
     table = await tables_repo.get_by_id(str(game.table_id))
     if table is None:
         raise AssertionError("Game table not found")
-    current_user = await users_repo.get_by_id(current_user_id)
     if table.judge_nickname != current_user.nickname:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -69,4 +126,69 @@ async def set_game_result(
             status_code=status.HTTP_409_CONFLICT,
             detail="Game result already set",
         )
-    return await games_repo.set_result(str(game_id), result)
+    game_result = await games_repo.set_result(str(game_id), result)
+    # Background tasks run after the transaction is committed
+    background_tasks.add_task(
+        live_feed.publish_update,
+        await tables_repo.get_tournament_id(str(game.table_id)),
+        "result",
+        pydantic_core.to_json({"game_id": game_id, "result": game_result}),
+    )
+    return game_result
+
+
+@router.post("/batch-set-results")
+async def batch_set_game_results(
+    batch: GameResultsBatchSubmission,
+    *,
+    current_user: Annotated[UserProfile, Depends(get_current_user)],
+    games_repo: Annotated[GamesRepo, Depends(get_games_repo)],
+    live_feed: Annotated[LiveFeed, Depends(get_live_feed)],
+    background_tasks: BackgroundTasks,
+) -> list[GameResultSubmissionOutcome]:
+    games = await games_repo.get_tournaments_and_judges(
+        [str(submission.game_id) for submission in batch.results]
+    )
+    accepted: dict[str, NewGameResult] = {}
+    statuses: list[SubmissionStatus] = []
+    for submission in batch.results:
+        game_id = str(submission.game_id)
+        if game_id not in games:
+            statuses.append(SubmissionStatus.NOT_FOUND)
+        elif games[game_id][1] != current_user.nickname:
+            statuses.append(SubmissionStatus.FORBIDDEN)
+        elif game_id in accepted:
+            statuses.append(SubmissionStatus.CONFLICT)  # Submitted twice in the same batch
+        else:
+            accepted[game_id] = submission
+            statuses.append(SubmissionStatus.CREATED)
+    created = await games_repo.set_many_results(accepted) if accepted else {}
+
+    outcomes = []
+    for submission, status_ in zip(batch.results, statuses):
+        game_id = str(submission.game_id)
+        if status_ is SubmissionStatus.CREATED:
+            result = created.pop(game_id, None)
+            if result is None:
+                status_ = SubmissionStatus.CONFLICT  # The game already had a result
+            else:
+                # Background tasks run after the transaction is committed
+                background_tasks.add_task(
+                    live_feed.publish,
+                    games[game_id][0],
+                    "result",
+                    pydantic_core.to_json({"game_id": submission.game_id, "result": result}),
+                )
+        else:
+            result = None
+        outcomes.append(
+            construct(
+                GameResultSubmissionOutcome,
+                game_id=submission.game_id,
+                status=status_,
+                result=result,
+            )
+        )
+    for tournament_id in {games[game_id][0] for game_id in accepted}:
+        background_tasks.add_task(live_feed.refresh_standings, tournament_id)
+    return outcomes
@@ -1,16 +1,125 @@
-from typing import Literal
+import asyncio
+import time
+from typing import Annotated, Awaitable, Literal
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, Request, Response, status
 from pydantic import BaseModel
+from redis.asyncio import Redis
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import QueuePool
 
-router = APIRouter()
+from ..dependencies.repo import get_cache_connection
+from ..utils.routing import FastResponseRoute
+
+router = APIRouter(
+    prefix="/health",
+    tags=["healthcheck"],
+    route_class=FastResponseRoute,
+)
+
+_PROBE_TIMEOUT = 1.0
+_CACHE_TTL = 2.0
 
 
 class StatusOk(BaseModel):
     status: Literal["ok"] = "ok"
 
 
-@router.get("/health", response_model=StatusOk, tags=["healthcheck"])
+class ProbeResult(BaseModel):
+    status: Literal["ok", "error"]
+    latency_ms: float | None = None
+    error: str | None = None
+
+
+class DatabasePoolStatus(BaseModel):
+    size: int
+    checked_out: int
+    overflow: int
+    saturation: float
+
+
+class ReadinessStatus(BaseModel):
+    status: Literal["ok", "error"]
+    database: ProbeResult
+    cache: ProbeResult
+    database_pool: DatabasePoolStatus | None
+    event_loop_lag_ms: float
+
+
+async def _probe(check: Awaitable[object]) -> ProbeResult:
+    start = time.perf_counter()
+    try:
+        async with asyncio.timeout(_PROBE_TIMEOUT):
+            await check
+    except TimeoutError:
+        return ProbeResult(status="error", error=f"Timed out after {_PROBE_TIMEOUT}s")
+    except Exception as e:
+        return ProbeResult(status="error", error=f"{type(e).__name__}: {e}")
+    return ProbeResult(status="ok", latency_ms=(time.perf_counter() - start) * 1000)
+
+
+async def _ping_database(engine: AsyncEngine) -> None:
+    async with engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+
+
+async def _measure_event_loop_lag() -> float:
+    start = time.perf_counter()
+    await asyncio.sleep(0)
+    return (time.perf_counter() - start) * 1000
+
+
+def _get_pool_status(engine: AsyncEngine) -> DatabasePoolStatus | None:
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return None
+    size, checked_out = pool.size(), pool.checkedout()
+    return DatabasePoolStatus(
+        size=size,
+        checked_out=checked_out,
+        overflow=pool.overflow(),
+        saturation=checked_out / size if size > 0 else 0,
+    )
+
+
+async def _check_readiness(engine: AsyncEngine, redis: Redis) -> ReadinessStatus:
+    event_loop_lag = await _measure_event_loop_lag()
+    database, cache = await asyncio.gather(
+        _probe(_ping_database(engine)),
+        _probe(redis.ping()),
+    )
+    return ReadinessStatus(
+        status="ok" if database.status == cache.status == "ok" else "error",
+        database=database,
+        cache=cache,
+        database_pool=_get_pool_status(engine),
+        event_loop_lag_ms=event_loop_lag,
+    )
+
+
+@router.get("", response_model=StatusOk)
 async def healthcheck() -> StatusOk:
-    # TODO: implement more complex healthcheck
+    # Liveness only: must stay cheap, dependencies are checked by `/health/ready`
     return StatusOk()
+
+
+@router.get("/ready", response_model=ReadinessStatus)
+async def readiness_check(
+    request: Request,
+    response: Response,
+    *,
+    redis: Annotated[Redis, Depends(get_cache_connection)],
+) -> ReadinessStatus:
+    state = request.app.state
+    cached: tuple[float, ReadinessStatus] | None = getattr(state, "readiness", None)
+    if cached is None or time.monotonic() - cached[0] > _CACHE_TTL:
+        async with state.readiness_lock:
+            cached = getattr(state, "readiness", None)
+            if cached is None or time.monotonic() - cached[0] > _CACHE_TTL:
+                readiness = await _check_readiness(state.db_engine, redis)
+                cached = state.readiness = (time.monotonic(), readiness)
+    readiness = cached[1]
+    if readiness.status != "ok":
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return readiness
@@ -1,7 +1,7 @@
 from typing import Annotated
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 
 from ..dependencies.auth import get_current_user_id
 from ..dependencies.repo import get_players_repo, get_users_repo
@@ -10,6 +10,7 @@ from ..models.page import PaginatedResponse
 from ..models.player import NewPlayer, Player
 from ..repo.db import PlayersRepo, UsersRepo
 from ..utils.exceptions.repo import PlayerAlreadyExistsError
+from ..utils.routing import FastResponseRoute
 
 router = APIRouter(
     prefix="/players",
@@ -18,9 +19,20 @@ router = APIRouter(
         Depends(get_current_user_id),
     ],
     tags=["players"],
+    route_class=FastResponseRoute,
 )
 
 
+@router.get("/search")
+async def search_players(
+    q: Annotated[str, Query(min_length=1, max_length=64)],
+    limit: Annotated[int, Query(ge=1, le=50)] = 10,
+    *,
+    players_repo: Annotated[PlayersRepo, Depends(get_players_repo)],
+) -> list[Player]:
+    return await players_repo.search(q, limit=limit)
+
+
 @router.get("/{player_id}")
 async def get_player(
     player_id: UUID,
@@ -0,0 +1,33 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Query
+
+from ..dependencies.auth import get_current_user_id
+from ..dependencies.repo import get_sync_repo
+from ..models.sync import SyncChanges
+from ..repo.db import SyncRepo
+from ..utils.routing import FastResponseRoute
+
+router = APIRouter(
+    prefix="/sync",
+    dependencies=[
+        # protect all endpoints behind authorization
+        Depends(get_current_user_id),
+    ],
+    tags=["sync"],
+    route_class=FastResponseRoute,
+)
+
+
+@router.get("/")
+async def get_changes(
+    since: Annotated[int, Query(ge=0)] = 0,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 500,
+    *,
+    sync_repo: Annotated[SyncRepo, Depends(get_sync_repo)],
+) -> SyncChanges:
+    """Returns records changed or deleted after the `since` cursor, oldest changes first.
+
+    Start with `since=0` and pass the returned `cursor` until `has_more` is false.
+    """
+    return await sync_repo.get_changes(since, limit)
@@ -1,31 +1,53 @@
 from typing import Annotated
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Path, status
+import pydantic_core
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    Header,
+    HTTPException,
+    Path,
+    Response,
+    status,
+)
 
-from ..dependencies.auth import get_current_user_id
-from ..dependencies.repo import get_games_repo, get_tables_repo, get_users_repo
+from ..dependencies.auth import get_current_user, get_current_user_id
+from ..dependencies.live_feed import get_live_feed
+from ..dependencies.repo import get_games_repo, get_tables_repo
 from ..models.game import Game, NewGame
 from ..models.page import PaginatedResponse
 from ..models.tournament import Table
-from ..repo.db import GamesRepo, TablesRepo, UsersRepo
+from ..models.user import UserProfile
+from ..repo.db import GamesRepo, TablesRepo
+from ..utils.etag import check_not_modified
+from ..utils.exceptions.repo import PlayerNotFoundError
+from ..utils.live_feed import LiveFeed
+from ..utils.routing import FastResponseRoute
 
 router = APIRouter(
     prefix="/tables",
     tags=["tables"],
+    route_class=FastResponseRoute,
 )
 
 
-@router.get("/{table_id}/")
+@router.get("/{table_id}/", response_model=Table)
 async def get_table(
     table_id: UUID,
+    if_none_match: Annotated[str | None, Header()] = None,
     *,
+    response: Response,
     tables_repo: Annotated[TablesRepo, Depends(get_tables_repo)],
-) -> Table:
-    table = await tables_repo.get_by_id(str(table_id))
-    if table is None:
+) -> Table | Response:
+    version = await tables_repo.get_version(str(table_id))
+    if version is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Table not found")
-    return table
+    not_modified = check_not_modified(if_none_match, response, *version)
+    if not_modified is not None:
+        return not_modified
+    return await tables_repo.get_by_id(str(table_id))
 
 
 @router.delete("/{table_id}/", status_code=status.HTTP_204_NO_CONTENT)
@@ -34,16 +56,28 @@ async def delete_table(
     *,
     _: Annotated[int, Depends(get_current_user_id)],  # protect endpoint behind authorization
     tables_repo: Annotated[TablesRepo, Depends(get_tables_repo)],
+    live_feed: Annotated[LiveFeed, Depends(get_live_feed)],
+    background_tasks: BackgroundTasks,
 ) -> None:
+    tournament_id = await tables_repo.get_tournament_id(str(table_id))
     await tables_repo.delete(str(table_id))
+    if tournament_id is not None:
+        background_tasks.add_task(live_feed.refresh_standings, tournament_id)
 
 
-@router.get("/{table_id}/games/", tags=["games"])
+@router.get("/{table_id}/games/", tags=["games"], response_model=PaginatedResponse[Game])
 async def get_table_games(
     table_id: UUID,
+    if_none_match: Annotated[str | None, Header()] = None,
     *,
+    response: Response,
     games_repo: Annotated[GamesRepo, Depends(get_games_repo)],
-) -> PaginatedResponse[Game]:
+) -> PaginatedResponse[Game] | Response:
+    version = await games_repo.get_by_table_version(str(table_id))
+    if version is not None:
+        not_modified = check_not_modified(if_none_match, response, *version)
+        if not_modified is not None:
+            return not_modified
     games = await games_repo.get_by_table(str(table_id))
     return PaginatedResponse(
         page=1,
@@ -57,15 +91,15 @@ async def create_table_game_impl(
     game_id: Annotated[UUID | None, Path()],
     *,
     new_game: NewGame,
-    current_user_id: Annotated[str, Depends(get_current_user_id)],
-    users_repo: Annotated[UsersRepo, Depends(get_users_repo)],
+    current_user: Annotated[UserProfile, Depends(get_current_user)],
     tables_repo: Annotated[TablesRepo, Depends(get_tables_repo)],
     games_repo: Annotated[GamesRepo, Depends(get_games_repo)],
+    live_feed: Annotated[LiveFeed, Depends(get_live_feed)],
+    background_tasks: BackgroundTasks,
 ) -> Game:
     table = await tables_repo.get_by_id(str(table_id))
     if table is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Table not found")
-    current_user = await users_repo.get_by_id(current_user_id)
     if table.judge_nickname != current_user.nickname:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -78,7 +112,20 @@ async def create_table_game_impl(
                 status_code=status.HTTP_409_CONFLICT,
                 detail="Cannot edit existing games",
             )
-    game = await games_repo.create(str(table_id), players=new_game.players, id_=game_id)
+    try:
+        game = await games_repo.create(str(table_id), players=new_game.players, id_=game_id)
+    except PlayerNotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f'Player "{e.value}" not found',
+        ) from e
+    # Background tasks run after the transaction is committed
+    background_tasks.add_task(
+        live_feed.publish,
+        await tables_repo.get_tournament_id(str(table_id)),
+        "game",
+        pydantic_core.to_json(game),
+    )
     return game
 
 
@@ -87,19 +134,21 @@ async def create_table_game(
     table_id: UUID,
     *,
     new_game: NewGame,
-    current_user_id: Annotated[str, Depends(get_current_user_id)],
-    users_repo: Annotated[UsersRepo, Depends(get_users_repo)],
+    current_user: Annotated[UserProfile, Depends(get_current_user)],
     tables_repo: Annotated[TablesRepo, Depends(get_tables_repo)],
     games_repo: Annotated[GamesRepo, Depends(get_games_repo)],
+    live_feed: Annotated[LiveFeed, Depends(get_live_feed)],
+    background_tasks: BackgroundTasks,
 ) -> Game:
     return await create_table_game_impl(
         table_id=table_id,
         game_id=None,
         new_game=new_game,
-        current_user_id=current_user_id,
-        users_repo=users_repo,
+        current_user=current_user,
         tables_repo=tables_repo,
         games_repo=games_repo,
+        live_feed=live_feed,
+        background_tasks=background_tasks,
     )
 
 
@@ -109,17 +158,19 @@ async def put_table_game(
     game_id: UUID,
     *,
     new_game: NewGame,
-    current_user_id: Annotated[str, Depends(get_current_user_id)],
-    users_repo: Annotated[UsersRepo, Depends(get_users_repo)],
+    current_user: Annotated[UserProfile, Depends(get_current_user)],
     tables_repo: Annotated[TablesRepo, Depends(get_tables_repo)],
     games_repo: Annotated[GamesRepo, Depends(get_games_repo)],
+    live_feed: Annotated[LiveFeed, Depends(get_live_feed)],
+    background_tasks: BackgroundTasks,
 ) -> Game:
     return await create_table_game_impl(
         table_id=table_id,
         game_id=game_id,
         new_game=new_game,
-        current_user_id=current_user_id,
-        users_repo=users_repo,
+        current_user=current_user,
         tables_repo=tables_repo,
         games_repo=games_repo,
+        live_feed=live_feed,
+        background_tasks=background_tasks,
     )
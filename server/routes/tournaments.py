@@ -1,22 +1,44 @@
 import datetime
+import math
 from typing import Annotated
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from fastapi.responses import Response
+from fastapi import APIRouter, Depends, Header, HTTPException, Path, Query, status
+from fastapi.responses import Response, StreamingResponse
 
 from ..dependencies.auth import get_current_user_id
-from ..dependencies.repo import get_games_repo, get_tables_repo, get_tournaments_repo
+from ..dependencies.live_feed import get_live_feed
+from ..dependencies.repo import (
+    get_games_repo,
+    get_roster_repo,
+    get_standings_repo,
+    get_tables_repo,
+    get_tournaments_repo,
+)
+from ..dependencies.scoring import get_score_calculator
 from ..models.page import PaginatedResponse
-from ..models.score import ScoreRow
-from ..models.tournament import NewTable, NewTournament, Table, Tournament
-from ..repo.db import GamesRepo, TablesRepo, TournamentsRepo
-from ..utils.calc_score import TournamentGame, calc_score
+from ..models.player import Player
+from ..models.score import RankDelta, RankedPlayer, RoundStandings, ScoreRow
+from ..models.tournament import (
+    NewTable,
+    NewTournament,
+    RosterChange,
+    RosterPlayers,
+    Table,
+    Tournament,
+)
+from ..repo.db import GamesRepo, RosterRepo, StandingsRepo, TablesRepo, TournamentsRepo
+from ..utils.calc_score import ScoreCalculator
 from ..utils.datetime_utils import get_current_datetime_utc
+from ..utils.etag import check_not_modified
+from ..utils.live_feed import LiveFeed
+from ..utils.model_construct import construct
+from ..utils.routing import FastResponseRoute
 
 router = APIRouter(
     prefix="/tournaments",
     tags=["tournaments"],
+    route_class=FastResponseRoute,
 )
 
 
@@ -73,40 +95,54 @@ async def create_tournament(
     return tournament
 
 
-@router.get("/{tournament_id}/")
+@router.get("/{tournament_id}/", response_model=Tournament)
 async def get_tournament(
     tournament_id: UUID,
+    if_none_match: Annotated[str | None, Header()] = None,
     *,
+    response: Response,
     tournaments_repo: Annotated[TournamentsRepo, Depends(get_tournaments_repo)],
-) -> Tournament:
-    tournament = await tournaments_repo.get_by_id(str(tournament_id))
-    if tournament is None:
+) -> Tournament | Response:
+    version = await tournaments_repo.get_version(str(tournament_id))
+    if version is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tournament not found")
-    return tournament
+    not_modified = check_not_modified(if_none_match, response, *version)
+    if not_modified is not None:
+        return not_modified
+    return await tournaments_repo.get_by_id(str(tournament_id))
 
 
-@router.get("/{tournament_id}/scores", tags=["scores"])
+@router.get("/{tournament_id}/scores", tags=["scores"], response_model=PaginatedResponse[ScoreRow])
 async def get_tournament_scores(
     tournament_id: UUID,
     from_: Annotated[datetime.datetime | None, Query(alias="from")] = None,
     to: Annotated[datetime.datetime | None, Query()] = None,
+    if_none_match: Annotated[str | None, Header()] = None,
     *,
+    response: Response,
     tournaments_repo: Annotated[TournamentsRepo, Depends(get_tournaments_repo)],
-    tables_repo: Annotated[TablesRepo, Depends(get_tables_repo)],
     games_repo: Annotated[GamesRepo, Depends(get_games_repo)],
-) -> PaginatedResponse[ScoreRow]:
+    calc_score: Annotated[ScoreCalculator, Depends(get_score_calculator)],
+) -> PaginatedResponse[ScoreRow] | Response:
     tournament = await tournaments_repo.get_by_id(str(tournament_id))
     if tournament is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tournament not found")
-    tables = await tables_repo.get_by_tournament(str(tournament_id))
-    data = []
-    for table in tables:
-        games = await games_repo.get_by_table(str(table.id), played_from=from_, played_to=to)
-        for game in games:
-            result = await games_repo.get_result(str(game.id))
-            if result is not None:
-                data.append(TournamentGame(game=game, result=result))
-    score = calc_score(data)
+    not_modified = check_not_modified(
+        if_none_match,
+        response,
+        await games_repo.get_tournament_version(str(tournament_id)),
+        tournament.date_to,
+        from_,
+        to,
+    )
+    if not_modified is not None:
+        return not_modified
+    seats = await games_repo.get_tournament_seats(
+        str(tournament_id),
+        played_from=from_,
+        played_to=to,
+    )
+    score = await calc_score(seats)
     return PaginatedResponse(
         page=1,
         total_pages=1,
@@ -114,6 +150,115 @@ async def get_tournament_scores(
     )
 
 
+@router.get(
+    "/{tournament_id}/live",
+    tags=["scores"],
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}}},
+)
+async def get_tournament_live_feed(
+    tournament_id: UUID,
+    *,
+    tournaments_repo: Annotated[TournamentsRepo, Depends(get_tournaments_repo)],
+    live_feed: Annotated[LiveFeed, Depends(get_live_feed)],
+) -> StreamingResponse:
+    """Server-Sent Events stream of the tournament.
+
+    Sends the current `standings` (same rows as the scores endpoint) on connect, then `game` when a
+    game is created, `result` when its result is set and `standings` again after every change.
+    """
+    tournament = await tournaments_repo.get_by_id(str(tournament_id))
+    if tournament is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tournament not found")
+    # The database session is closed before streaming starts, viewers only hold a queue
+    return StreamingResponse(
+        live_feed.stream(str(tournament_id)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/{tournament_id}/scores/rounds/{round_number}", tags=["scores"])
+async def get_tournament_scores_after_round(
+    tournament_id: UUID,
+    round_number: Annotated[int, Path(ge=1)],
+    *,
+    tournaments_repo: Annotated[TournamentsRepo, Depends(get_tournaments_repo)],
+    standings_repo: Annotated[StandingsRepo, Depends(get_standings_repo)],
+) -> PaginatedResponse[ScoreRow]:
+    tournament = await tournaments_repo.get_by_id(str(tournament_id))
+    if tournament is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tournament not found")
+    standings = await standings_repo.get_after_round(str(tournament_id), round_number)
+    return PaginatedResponse(
+        page=1,
+        total_pages=1,
+        result=standings.to_rows(),
+    )
+
+
+def _ranked(rows: list[ScoreRow]) -> list[RankedPlayer]:
+    return [
+        RankedPlayer(nickname=row.nickname, rank=rank, sum=row.sum)
+        for rank, row in enumerate(rows, start=1)
+    ]
+
+
+@router.get("/{tournament_id}/scores/history", tags=["scores"])
+async def get_tournament_scores_history(
+    tournament_id: UUID,
+    *,
+    tournaments_repo: Annotated[TournamentsRepo, Depends(get_tournaments_repo)],
+    standings_repo: Annotated[StandingsRepo, Depends(get_standings_repo)],
+) -> list[RoundStandings]:
+    tournament = await tournaments_repo.get_by_id(str(tournament_id))
+    if tournament is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tournament not found")
+    return [
+        RoundStandings(round=round_, standings=_ranked(standings.to_rows()))
+        for round_, standings in await standings_repo.get_history(str(tournament_id))
+    ]
+
+
+@router.get("/{tournament_id}/scores/rank-deltas", tags=["scores"])
+async def get_tournament_rank_deltas(
+    tournament_id: UUID,
+    from_round: Annotated[int, Query(ge=0)],
+    to_round: Annotated[int, Query(ge=1)],
+    *,
+    tournaments_repo: Annotated[TournamentsRepo, Depends(get_tournaments_repo)],
+    standings_repo: Annotated[StandingsRepo, Depends(get_standings_repo)],
+) -> list[RankDelta]:
+    tournament = await tournaments_repo.get_by_id(str(tournament_id))
+    if tournament is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tournament not found")
+    if from_round >= to_round:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="from_round must be less than to_round",
+        )
+    before = {
+        player.nickname: player
+        for player in _ranked(
+            (await standings_repo.get_after_round(str(tournament_id), from_round)).to_rows()
+        )
+    }
+    after = _ranked((await standings_repo.get_after_round(str(tournament_id), to_round)).to_rows())
+    deltas = []
+    for player in after:
+        previous = before.get(player.nickname)
+        deltas.append(
+            RankDelta(
+                nickname=player.nickname,
+                rank_from=previous.rank if previous is not None else None,
+                rank_to=player.rank,
+                rank_delta=previous.rank - player.rank if previous is not None else None,
+                sum_delta=player.sum - (previous.sum if previous is not None else 0),
+            )
+        )
+    return deltas
+
+
 @router.get("/{tournament_id}/scores.csv", tags=["scores"], include_in_schema=False)
 async def get_tournament_scores_csv(
     tournament_id: int,
@@ -165,6 +310,73 @@ async def create_table(
     return table
 
 
+@router.get("/{tournament_id}/players", tags=["players"])
+async def get_tournament_players(
+    tournament_id: UUID,
+    page: Annotated[int, Query(ge=1)] = 1,
+    page_size: Annotated[int, Query(ge=1, le=500)] = 100,
+    *,
+    tournaments_repo: Annotated[TournamentsRepo, Depends(get_tournaments_repo)],
+    roster_repo: Annotated[RosterRepo, Depends(get_roster_repo)],
+) -> PaginatedResponse[Player]:
+    tournament = await tournaments_repo.get_by_id(str(tournament_id))
+    if tournament is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tournament not found")
+    players, total = await roster_repo.get_page(str(tournament_id), page=page, page_size=page_size)
+    return PaginatedResponse(
+        page=page,
+        total_pages=max(math.ceil(total / page_size), 1),
+        result=players,
+    )
+
+
+@router.post("/{tournament_id}/players/batch-add", tags=["players"])
+async def add_tournament_players(
+    tournament_id: UUID,
+    roster_players: RosterPlayers,
+    *,
+    _: Annotated[int, Depends(get_current_user_id)],  # protect endpoint behind authorization
+    tournaments_repo: Annotated[TournamentsRepo, Depends(get_tournaments_repo)],
+    roster_repo: Annotated[RosterRepo, Depends(get_roster_repo)],
+) -> RosterChange:
+    tournament = await tournaments_repo.get_by_id(str(tournament_id))
+    if tournament is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tournament not found")
+    player_ids = list(dict.fromkeys(str(player_id) for player_id in roster_players.player_ids))
+    added = set(await roster_repo.add(str(tournament_id), player_ids))
+    return construct(
+        RosterChange,
+        changed=[UUID(player_id) for player_id in player_ids if player_id in added],
+        unchanged=[UUID(player_id) for player_id in player_ids if player_id not in added],
+    )
+
+
+@router.post("/{tournament_id}/players/batch-remove", tags=["players"])
+async def remove_tournament_players(
+    tournament_id: UUID,
+    roster_players: RosterPlayers,
+    *,
+    _: Annotated[int, Depends(get_current_user_id)],  # protect endpoint behind authorization
+    tournaments_repo: Annotated[TournamentsRepo, Depends(get_tournaments_repo)],
+    roster_repo: Annotated[RosterRepo, Depends(get_roster_repo)],
+) -> RosterChange:
+    """Removes players from the roster of the tournament.
+
+    Players join the roster by playing, so a removed player is back on it once seated in a new
+    game of the tournament, see `GamesRepo.create`.
+    """
+    tournament = await tournaments_repo.get_by_id(str(tournament_id))
+    if tournament is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tournament not found")
+    player_ids = list(dict.fromkeys(str(player_id) for player_id in roster_players.player_ids))
+    removed = set(await roster_repo.remove(str(tournament_id), player_ids))
+    return construct(
+        RosterChange,
+        changed=[UUID(player_id) for player_id in player_ids if player_id in removed],
+        unchanged=[UUID(player_id) for player_id in player_ids if player_id not in removed],
+    )
+
+
 @router.put("/{tournament_id}/")
 async def update_tournament(
     tournament_id: UUID,
@@ -2,21 +2,26 @@ from typing import Annotated
 
 from fastapi import APIRouter, Depends
 
-from server.dependencies.auth import get_current_user_id
-from server.dependencies.repo import get_users_repo
-from server.models.user import User
-from server.repo.db import UsersRepo
+from server.dependencies.auth import get_current_user
+from server.models.user import User, UserProfile
+from server.utils.model_construct import construct
+from server.utils.routing import FastResponseRoute
 
 router = APIRouter(
     prefix="/users",
     tags=["users"],
+    route_class=FastResponseRoute,
 )
 
 
 @router.get("/me")
 async def get_me(
     *,
-    user_id: Annotated[str, Depends(get_current_user_id)],
-    users_repo: Annotated[UsersRepo, Depends(get_users_repo)],
+    current_user: Annotated[UserProfile, Depends(get_current_user)],
 ) -> User:
-    return await users_repo.get_by_id(user_id)
+    return construct(
+        User,
+        username=current_user.username,
+        nickname=current_user.nickname,
+        real_name=current_user.real_name,
+    )
@@ -1,18 +1,29 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from contextlib import asynccontextmanager
 from typing import AsyncIterator
 
+import pydantic_core
 from fastapi import FastAPI
 from redis.asyncio import Redis
 from sqlalchemy import URL, select
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from ..db import models as db_models
+from ..db.query_counter import install_query_counter
+from ..db.slow_query_log import SlowQueryLogger
+from ..repo.db import GamesRepo
+from .calc_score import ScoreCalculator
+from .live_feed import LiveFeed
+from .model_construct import set_validation_enabled
 from .settings import Settings
 
 
 @asynccontextmanager
 async def lifespan(current_app: FastAPI) -> AsyncIterator[None]:
     env = Settings.from_env()
+    set_validation_enabled(env.validate_repo_output)
     redis = Redis(
         host=env.redis_host,
         port=env.redis_port,
@@ -29,6 +40,13 @@ async def lifespan(current_app: FastAPI) -> AsyncIterator[None]:
             database=env.postgres_db,
         )
     )
+    if env.sql_query_budget is not None:
+        install_query_counter(engine)
+    if env.slow_query_threshold_ms is not None:
+        SlowQueryLogger(
+            threshold_ms=env.slow_query_threshold_ms,
+            explain_sample_rate=env.slow_query_explain_sample_rate,
+        ).install(engine)
     db_sessions = async_sessionmaker(engine)
     if env.invite_code is None:
         session: AsyncSession
@@ -39,10 +57,40 @@ async def lifespan(current_app: FastAPI) -> AsyncIterator[None]:
                     "Invite code must be set if no users are present in the database"
                 )
 
+    score_executor = None
+    if env.score_offload_threshold is not None:
+        # Workers are spawned rather than forked: forking a process running an event loop and
+        # connection pools is unsafe
+        score_executor = ProcessPoolExecutor(
+            max_workers=env.score_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    score_calculator = ScoreCalculator(
+        executor=score_executor,
+        offload_threshold=env.score_offload_threshold,
+    )
+
+    async def compute_standings(tournament_id: str) -> bytes:
+        async with db_sessions() as session:
+            seats = await GamesRepo(session).get_tournament_seats(tournament_id)
+        return pydantic_core.to_json(await score_calculator(seats))
+
+    live_feed = LiveFeed(redis, compute_standings)
+
     current_app.state.settings = env
     current_app.state.redis_pool = redis
+    current_app.state.db_engine = engine
     current_app.state.db_pool = db_sessions
+    current_app.state.readiness_lock = asyncio.Lock()
+    current_app.state.score_calculator = score_calculator
+    current_app.state.live_feed = live_feed
     yield
 
+    await live_feed.close()
+
+    if score_executor is not None:
+        score_executor.shutdown(cancel_futures=True)
+
     await redis.aclose()
     await engine.dispose()
@@ -1,9 +1,24 @@
+import asyncio
 import dataclasses
-from typing import Any
+from concurrent.futures import Executor
+from typing import Any, Self
 
-from ..models.game import Game, GamePlayer, GameResult, PlayerResult
-from ..models.score import ScoreRow
-from .enums import Team
+from ..models.game import Game, GameResult
+from ..models.score import CountByRole, ScoreRow
+from .enums import Role, Team
+from .model_construct import construct
+from .types import JsonT
+
+_ROLE_INDEX = {role: index for index, role in enumerate(Role)}
+_ROLE_TEAM = {role: role.team for role in Role}
+
+# Everything scoring needs to know about a single non-guest seat of a finished game:
+# (nickname, role, winner, warn count, was kicked, caused other team won, found mafia count,
+# has found sheriff, was killed first night, guessed mafia count, sum of positive extra points,
+# sum of negative extra points)
+type CompactSeat = tuple[
+    str, Role, Team | None, int, bool, bool, int, bool, bool, int, float, float
+]
 
 
 @dataclasses.dataclass(kw_only=True)
@@ -12,56 +27,262 @@ class TournamentGame:
     result: GameResult
 
 
-def _sort_key(item: ScoreRow) -> Any:
-    return -item.sum, -item.play_count, -item.win_rate, item.nickname
+@dataclasses.dataclass(slots=True)
+class _PlayerScore:
+    """Mutable per-player counters, cheap to update in the scoring loop.
 
+    Counters by role are lists indexed the same way as `Role` members are declared.
+    """
 
-def calc_score(games: list[TournamentGame]) -> list[ScoreRow]:
-    players: dict[str, ScoreRow] = {}
-    players_ci_wins: dict[str, list[float]] = {}
+    judge_extra_points: float = 0
+    judge_penalty_points: float = 0
+    best_turn_points: float = 0
+    ci_points: float = 0
+    wins_by_role: list[int] = dataclasses.field(default_factory=lambda: [0] * len(Role))
+    first_night_killed_times: int = 0
+    games_by_role: list[int] = dataclasses.field(default_factory=lambda: [0] * len(Role))
+    warns: int = 0
+    times_kicked: int = 0
+    times_caused_other_team_won: int = 0
+    found_mafia_count: int = 0
+    times_found_sheriff: int = 0
+    times_killed_first_night: int = 0
+    guessed_mafia_counts: list[int] = dataclasses.field(default_factory=lambda: [0, 0, 0, 0])
+    ci_wins: list[float] = dataclasses.field(default_factory=list)
+
+    def merge(self, other: Self) -> None:
+        self.judge_extra_points += other.judge_extra_points
+        self.judge_penalty_points += other.judge_penalty_points
+        self.best_turn_points += other.best_turn_points
+        self.ci_points += other.ci_points
+        self.wins_by_role = [a + b for a, b in zip(self.wins_by_role, other.wins_by_role)]
+        self.first_night_killed_times += other.first_night_killed_times
+        self.games_by_role = [a + b for a, b in zip(self.games_by_role, other.games_by_role)]
+        self.warns += other.warns
+        self.times_kicked += other.times_kicked
+        self.times_caused_other_team_won += other.times_caused_other_team_won
+        self.found_mafia_count += other.found_mafia_count
+        self.times_found_sheriff += other.times_found_sheriff
+        self.times_killed_first_night += other.times_killed_first_night
+        self.guessed_mafia_counts = [
+            a + b for a, b in zip(self.guessed_mafia_counts, other.guessed_mafia_counts)
+        ]
+        self.ci_wins.extend(other.ci_wins)
+
+    def copy(self) -> Self:
+        return dataclasses.replace(
+            self,
+            wins_by_role=self.wins_by_role.copy(),
+            games_by_role=self.games_by_role.copy(),
+            guessed_mafia_counts=self.guessed_mafia_counts.copy(),
+            ci_wins=self.ci_wins.copy(),
+        )
+
+
+def compact_games(games: list[TournamentGame]) -> list[CompactSeat]:
+    """Flattens game models to plain tuples, the way `GamesRepo.get_tournament_seats` returns."""
+    seats: list[CompactSeat] = []
     for game in games:
-        player: GamePlayer
-        result: PlayerResult
         for player, result in zip(game.game.players, game.result.results):
             if player.nickname is None:
                 continue  # Skip guests
-            row = players.setdefault(player.nickname, ScoreRow(nickname=player.nickname))
-            row.games_by_role[player.role] += 1
-            if result.was_killed_first_night:
-                row.first_night_killed_times += 1
-                if result.guessed_mafia_count == 2:
-                    row.best_turn_points += 0.25
-                elif result.guessed_mafia_count == 3:
-                    row.best_turn_points += 0.5
-            if game.result.winner == player.role.team:
-                row.wins_by_role[player.role] += 1
-            row.judge_extra_points += sum(
-                extra.points for extra in result.extra_scores if extra.points > 0
+            seats.append(
+                (
+                    player.nickname,
+                    player.role,
+                    game.result.winner,
+                    result.warn_count,
+                    result.was_kicked,
+                    result.caused_other_team_won,
+                    result.found_mafia_count,
+                    result.has_found_sheriff,
+                    result.was_killed_first_night,
+                    result.guessed_mafia_count,
+                    sum(extra.points for extra in result.extra_scores if extra.points > 0),
+                    sum(extra.points for extra in result.extra_scores if extra.points < 0),
+                )
             )
-            row.judge_penalty_points += sum(
-                extra.points for extra in result.extra_scores if extra.points < 0
-            )
-            row.warns += result.warn_count
-            row.times_kicked += result.was_kicked
-            row.times_caused_other_team_won += result.caused_other_team_won
-            row.found_mafia_count += result.found_mafia_count
-            row.times_found_sheriff += result.has_found_sheriff
-            row.times_killed_first_night += result.was_killed_first_night
-            if result.was_killed_first_night and player.role.team == Team.CITIZEN:
-                row.guessed_mafia_counts[result.guessed_mafia_count] += 1
-                if result.guessed_mafia_count == 0:
-                    ci_k = 0
-                elif game.result.winner == Team.CITIZEN:
-                    ci_k = 0.5
-                else:
-                    ci_k = 1
-                players_ci_wins.setdefault(player.nickname, []).append(ci_k)
-    for nickname, ci_k in players_ci_wins.items():
-        row = players[nickname]
-        total_games = row.games_by_role.sum
-        if total_games < 4:
+    return seats
+
+
+def _accumulate(seats: list[CompactSeat]) -> dict[str, _PlayerScore]:
+    """Sums up players' counters over seats. Pure, so it can run in a worker process."""
+    players: dict[str, _PlayerScore] = {}
+    for (
+        nickname,
+        role,
+        winner,
+        warn_count,
+        was_kicked,
+        caused_other_team_won,
+        found_mafia_count,
+        has_found_sheriff,
+        was_killed_first_night,
+        guessed_mafia_count,
+        extra_points,
+        negative_extra_points,
+    ) in seats:
+        score = players.get(nickname)
+        if score is None:
+            score = players[nickname] = _PlayerScore()
+        role_index = _ROLE_INDEX[role]
+        team = _ROLE_TEAM[role]
+        score.games_by_role[role_index] += 1
+        if winner == team:
+            score.wins_by_role[role_index] += 1
+        score.judge_extra_points += extra_points
+        score.judge_penalty_points += negative_extra_points
+        score.warns += warn_count
+        score.times_kicked += was_kicked
+        score.times_caused_other_team_won += caused_other_team_won
+        score.found_mafia_count += found_mafia_count
+        score.times_found_sheriff += has_found_sheriff
+        if not was_killed_first_night:
             continue
-        ci = round(min(len(ci_k) * 0.4 / round(total_games * 0.4), 0.4), 2)
-        for k in ci_k:
-            row.ci_points += ci * k
-    return list(sorted(players.values(), key=_sort_key))
+        score.first_night_killed_times += 1
+        score.times_killed_first_night += 1
+        if guessed_mafia_count == 2:
+            score.best_turn_points += 0.25
+        elif guessed_mafia_count == 3:
+            score.best_turn_points += 0.5
+        if team == Team.CITIZEN:
+            score.guessed_mafia_counts[guessed_mafia_count] += 1
+            if guessed_mafia_count == 0:
+                ci_k = 0
+            elif winner == Team.CITIZEN:
+                ci_k = 0.5
+            else:
+                ci_k = 1
+            score.ci_wins.append(ci_k)
+    return players
+
+
+def _merge(into: dict[str, _PlayerScore], part: dict[str, _PlayerScore]) -> None:
+    for nickname, other in part.items():
+        score = into.get(nickname)
+        if score is None:
+            into[nickname] = other
+        else:
+            score.merge(other)
+
+
+def _finalize(players: dict[str, _PlayerScore]) -> dict[str, _PlayerScore]:
+    """Adds points depending on the whole ranking."""
+    for score in players.values():
+        total_games = sum(score.games_by_role)
+        if score.ci_wins and total_games >= 4:
+            ci = round(min(len(score.ci_wins) * 0.4 / round(total_games * 0.4), 0.4), 2)
+            for k in score.ci_wins:
+                score.ci_points += ci * k
+    return players
+
+
+def calc_compact_scores(seats: list[CompactSeat]) -> dict[str, _PlayerScore]:
+    return _finalize(_accumulate(seats))
+
+
+def _count_by_role(counts: list[int]) -> CountByRole:
+    return construct(CountByRole, **{role.value: counts[_ROLE_INDEX[role]] for role in Role})
+
+
+def _to_model(nickname: str, score: _PlayerScore) -> ScoreRow:
+    return construct(
+        ScoreRow,
+        nickname=nickname,
+        judge_extra_points=score.judge_extra_points,
+        judge_penalty_points=score.judge_penalty_points,
+        best_turn_points=score.best_turn_points,
+        ci_points=score.ci_points,
+        wins_by_role=_count_by_role(score.wins_by_role),
+        first_night_killed_times=score.first_night_killed_times,
+        games_by_role=_count_by_role(score.games_by_role),
+        warns=score.warns,
+        times_kicked=score.times_kicked,
+        times_caused_other_team_won=score.times_caused_other_team_won,
+        found_mafia_count=score.found_mafia_count,
+        times_found_sheriff=score.times_found_sheriff,
+        times_killed_first_night=score.times_killed_first_night,
+        guessed_mafia_counts=score.guessed_mafia_counts,
+    )
+
+
+def _sort_key(item: ScoreRow) -> Any:
+    return -item.sum, -item.play_count, -item.win_rate, item.nickname
+
+
+def _to_sorted_rows(players: dict[str, _PlayerScore]) -> list[ScoreRow]:
+    return sorted(
+        (_to_model(nickname, score) for nickname, score in players.items()), key=_sort_key
+    )
+
+
+def calc_score(games: list[TournamentGame]) -> list[ScoreRow]:
+    return _to_sorted_rows(calc_compact_scores(compact_games(games)))
+
+
+class Standings:
+    """Cumulative scoring state of a ranking, more seats can be added to it later.
+
+    Unlike a list of `ScoreRow`s, it doesn't contain points depending on the whole ranking yet,
+    so it can be stored as a snapshot and continued from.
+    """
+
+    def __init__(self, players: dict[str, _PlayerScore] | None = None) -> None:
+        self._players = players if players is not None else {}
+
+    def add(self, seats: list[CompactSeat]) -> None:
+        _merge(self._players, _accumulate(seats))
+
+    def copy(self) -> Self:
+        return type(self)({nickname: score.copy() for nickname, score in self._players.items()})
+
+    def to_json(self) -> dict[str, JsonT]:
+        return {nickname: dataclasses.asdict(score) for nickname, score in self._players.items()}
+
+    @classmethod
+    def from_json(cls, data: dict[str, JsonT]) -> Self:
+        return cls({nickname: _PlayerScore(**score) for nickname, score in data.items()})
+
+    def to_rows(self) -> list[ScoreRow]:
+        """Returns the ranking, sorted by place."""
+        return _to_sorted_rows(_finalize(self.copy()._players))
+
+
+class ScoreCalculator:
+    """Scores large rankings in a process pool, so they don't block the event loop.
+
+    Rankings with fewer than `offload_threshold` games are cheaper to score in place than to send
+    to another process. Without an executor everything is scored in place.
+
+    Seats are sent in chunks: a chunk is pickled in one go while holding the GIL, so sending
+    everything at once would block the event loop for as long as pickling all seats takes. Chunks
+    are also spread among all workers of the pool.
+    """
+
+    _CHUNK_SIZE = 50_000
+
+    def __init__(self, *, executor: Executor | None, offload_threshold: int | None) -> None:
+        self._executor = executor
+        self._offload_threshold = offload_threshold
+
+    async def __call__(self, seats: list[CompactSeat]) -> list[ScoreRow]:
+        if (
+            self._executor is None
+            or self._offload_threshold is None
+            # A game has 10 seats, fewer if guests played
+            or len(seats) < self._offload_threshold * 10
+        ):
+            return _to_sorted_rows(calc_compact_scores(seats))
+        loop = asyncio.get_running_loop()
+        parts = await asyncio.gather(
+            *(
+                loop.run_in_executor(
+                    self._executor, _accumulate, seats[start : start + self._CHUNK_SIZE]
+                )
+                for start in range(0, len(seats), self._CHUNK_SIZE)
+            )
+        )
+        players: dict[str, _PlayerScore] = {}
+        for part in parts:
+            _merge(players, part)
+        return _to_sorted_rows(_finalize(players))
@@ -21,3 +21,23 @@ class Role(Enum):
                 return Team.CITIZEN
             case _:
                 raise ValueError(f"Unexpected role: {self}")
+
+
+class SubmissionStatus(Enum):
+    CREATED = "created"
+    NOT_FOUND = "not_found"
+    FORBIDDEN = "forbidden"
+    CONFLICT = "conflict"
+
+
+class SyncEntity(Enum):
+    PLAYER = "player"
+    TOURNAMENT = "tournament"
+    TABLE = "table"
+    GAME = "game"
+    RESULT = "result"
+
+
+class AuthMode(Enum):
+    REDIS = "redis"  # Opaque access tokens looked up in Redis
+    SIGNED = "signed"  # Signed access tokens verified locally
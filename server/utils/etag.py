@@ -0,0 +1,44 @@
+import datetime
+import hashlib
+
+from fastapi import Response, status
+
+from .datetime_utils import get_current_datetime_utc
+
+# Results of a finished tournament may still be corrected for a while, so they aren't immutable
+_FINISHED_MAX_AGE = datetime.timedelta(hours=1)
+
+
+def make_etag(*parts: object) -> str:
+    """Makes a strong entity tag from a row version and everything else a response depends on."""
+    digest = hashlib.blake2b("\x1f".join(map(str, parts)).encode(), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    # `If-None-Match` uses the weak comparison, so a weakened copy of our tag matches too
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def check_not_modified(
+    if_none_match: str | None,
+    response: Response,
+    version: str,
+    tournament_ends_at: datetime.datetime,
+    *parts: object,
+) -> Response | None:
+    """Sets caching headers of a response built from data of the given version.
+
+    Returns a 304 response to send instead if the client already has the same representation.
+    """
+    if tournament_ends_at < get_current_datetime_utc():
+        cache_control = f"public, max-age={int(_FINISHED_MAX_AGE.total_seconds())}"
+    else:
+        cache_control = "no-cache"  # Clients may keep a copy, but must revalidate it
+    headers = {"ETag": make_etag(version, *parts), "Cache-Control": cache_control}
+    if if_none_match is not None and _matches(if_none_match, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
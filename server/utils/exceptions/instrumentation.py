@@ -0,0 +1,6 @@
+class QueryBudgetExceededError(RuntimeError):
+    def __init__(self, route: str, budget: int, repeated: dict[str, int]) -> None:
+        self.route = route
+        self.budget = budget
+        self.repeated = repeated
+        super().__init__(f'Route "{route}" exceeded its query budget of {budget} statements')
@@ -29,6 +29,11 @@ class UserNotFoundError(NotFoundError):
         super().__init__("User", "username", username)
 
 
+class PlayerNotFoundError(NotFoundError):
+    def __init__(self, nickname: str) -> None:
+        super().__init__("Player", "nickname", nickname)
+
+
 class InvalidPasswordError(ValueError):
     def __init__(self) -> None:
         super().__init__("Invalid password")
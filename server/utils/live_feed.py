@@ -0,0 +1,158 @@
+import asyncio
+import logging
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from typing import AsyncIterator, Awaitable, Callable
+
+from redis.asyncio import Redis
+from redis.asyncio.client import PubSub
+
+logger = logging.getLogger(__name__)
+
+
+def format_event(event: str, data: bytes) -> bytes:
+    """Encodes a Server-Sent Events message. `data` must not contain newlines (e.g. compact JSON)."""
+    return b"event: " + event.encode() + b"\ndata: " + data + b"\n\n"
+
+
+class LiveFeed:
+    """Delivers tournament events published through Redis to subscribers of this worker.
+
+    Every worker keeps a single pattern subscription however many viewers are connected. An event
+    is received and encoded once, and the same bytes are queued for every local subscriber.
+
+    The latest standings of a tournament are also kept in Redis, so that new viewers get them
+    right away without scoring the tournament again.
+    """
+
+    _CHANNEL_FORMAT = "tournament:{tournament_id}:events"
+    _STANDINGS_FORMAT = "tournament:{tournament_id}:standings"
+    _STANDINGS_EXPIRE = timedelta(days=1)
+    # A slow subscriber loses its oldest events instead of making the queue grow unbounded
+    _QUEUE_SIZE = 16
+    _KEEPALIVE_INTERVAL = 15
+
+    def __init__(self, redis: Redis, compute_standings: Callable[[str], Awaitable[bytes]]) -> None:
+        self._redis = redis
+        self._compute_standings = compute_standings
+        self._subscribers: defaultdict[str, set[asyncio.Queue[bytes]]] = defaultdict(set)
+        self._pubsub: PubSub | None = None
+        self._listener: asyncio.Task[None] | None = None
+        self._computing: dict[str, asyncio.Task[bytes]] = {}
+
+    async def publish(self, tournament_id: str, event: str, data: bytes) -> None:
+        channel = self._CHANNEL_FORMAT.format(tournament_id=tournament_id)
+        await self._redis.publish(channel, event.encode() + b"\n" + data)
+
+    async def publish_update(self, tournament_id: str, event: str, data: bytes) -> None:
+        """Publishes a change of the tournament games, followed by the new standings."""
+        await self.publish(tournament_id, event, data)
+        await self.refresh_standings(tournament_id)
+
+    async def refresh_standings(self, tournament_id: str) -> None:
+        """Scores the tournament once and publishes the standings to all viewers."""
+        data = await self._compute_standings(tournament_id)
+        await self._redis.set(
+            self._STANDINGS_FORMAT.format(tournament_id=tournament_id),
+            data,
+            ex=self._STANDINGS_EXPIRE,
+        )
+        await self.publish(tournament_id, "standings", data)
+
+    async def get_standings(self, tournament_id: str) -> bytes:
+        """Returns the latest published standings, computing and storing them if there are none.
+
+        Concurrent callers in this worker share a single computation.
+        """
+        data = await self._redis.get(self._STANDINGS_FORMAT.format(tournament_id=tournament_id))
+        if data is not None:
+            return data
+        task = self._computing.get(tournament_id)
+        if task is None:
+            task = self._computing[tournament_id] = asyncio.create_task(
+                self._store_standings(tournament_id)
+            )
+            task.add_done_callback(lambda _: self._computing.pop(tournament_id, None))
+        return await asyncio.shield(task)
+
+    async def _store_standings(self, tournament_id: str) -> bytes:
+        data = await self._compute_standings(tournament_id)
+        await self._redis.set(
+            self._STANDINGS_FORMAT.format(tournament_id=tournament_id),
+            data,
+            ex=self._STANDINGS_EXPIRE,
+            nx=True,  # Don't overwrite standings published in the meantime
+        )
+        return data
+
+    async def stream(self, tournament_id: str) -> AsyncIterator[bytes]:
+        """Yields the current standings, then every event of the tournament as they happen."""
+        # Subscribe first, so that no update is lost between reading standings and subscribing
+        async with self.subscribe(tournament_id) as queue:
+            yield format_event("standings", await self.get_standings(tournament_id))
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), self._KEEPALIVE_INTERVAL)
+                except TimeoutError:
+                    # Keeps proxies from closing an idle connection
+                    yield b": keepalive\n\n"
+
+    @asynccontextmanager
+    async def subscribe(self, tournament_id: str) -> AsyncIterator[asyncio.Queue[bytes]]:
+        """Yields a queue receiving encoded Server-Sent Events of the tournament."""
+        await self._ensure_listening()
+        queue: asyncio.Queue[bytes] = asyncio.Queue(maxsize=self._QUEUE_SIZE)
+        self._subscribers[tournament_id].add(queue)
+        try:
+            yield queue
+        finally:
+            subscribers = self._subscribers[tournament_id]
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[tournament_id]
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    async def _ensure_listening(self) -> None:
+        if self._listener is not None and not self._listener.done():
+            return
+        if self._pubsub is None:
+            self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+            await self._pubsub.psubscribe(self._CHANNEL_FORMAT.format(tournament_id="*"))
+        self._listener = asyncio.create_task(self._listen(self._pubsub))
+
+    async def _listen(self, pubsub: PubSub) -> None:
+        prefix, suffix = self._CHANNEL_FORMAT.split("{tournament_id}")
+        try:
+            async for message in pubsub.listen():
+                channel = message["channel"]
+                if isinstance(channel, bytes):
+                    channel = channel.decode()
+                tournament_id = channel.removeprefix(prefix).removesuffix(suffix)
+                subscribers = self._subscribers.get(tournament_id)
+                if not subscribers:
+                    continue
+                event, _, data = message["data"].partition(b"\n")
+                encoded = format_event(event.decode(), data)
+                for queue in subscribers:
+                    if queue.full():
+                        queue.get_nowait()
+                    queue.put_nowait(encoded)
+        except Exception:
+            # Subscribe again on the next connected viewer
+            logger.exception("Live feed subscription failed")
+            self._pubsub = None
+            await pubsub.aclose()
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
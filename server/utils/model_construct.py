@@ -0,0 +1,34 @@
+from typing import Any
+
+from pydantic import BaseModel
+
+_validate = False
+_object_setattr = object.__setattr__
+
+
+def set_validation_enabled(enabled: bool) -> None:
+    """Makes `construct` validate models again, to check repository output in debug and tests."""
+    global _validate
+    _validate = enabled
+
+
+def construct[M: BaseModel](model: type[M], /, **fields: Any) -> M:
+    """Builds a model from already validated data, e.g. a database row.
+
+    Validation is skipped, so fields must already have their final types (`UUID` instead of
+    `str`, nested models instead of dicts).
+
+    `BaseModel.model_construct` isn't used when all fields are given: it's implemented in Python
+    and handles aliases and defaults for every call, which makes it slower than validation itself.
+    """
+    if _validate:
+        return model(**fields)
+    if fields.keys() != model.model_fields.keys():
+        # Missing or unknown fields (e.g. a misspelled one) get their defaults or are dropped
+        return model.model_construct(**fields)
+    instance = model.__new__(model)
+    _object_setattr(instance, "__dict__", fields)
+    _object_setattr(instance, "__pydantic_fields_set__", set(fields))
+    _object_setattr(instance, "__pydantic_extra__", None)
+    _object_setattr(instance, "__pydantic_private__", None)
+    return instance
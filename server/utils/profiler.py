@@ -0,0 +1,92 @@
+import sys
+import threading
+from collections import Counter
+from types import FrameType
+from typing import Self
+
+# Samplers may overlap, the switch interval is lowered while any of them runs and restored to the
+# original one when the last of them stops
+_switch_interval_lock = threading.Lock()
+_active_intervals: Counter[float] = Counter()
+_original_switch_interval = sys.getswitchinterval()
+
+
+def _acquire_switch_interval(interval: float) -> None:
+    global _original_switch_interval
+    with _switch_interval_lock:
+        if not _active_intervals:
+            _original_switch_interval = sys.getswitchinterval()
+        _active_intervals[interval] += 1
+        sys.setswitchinterval(min([_original_switch_interval, *_active_intervals]))
+
+
+def _release_switch_interval(interval: float) -> None:
+    with _switch_interval_lock:
+        _active_intervals[interval] -= 1
+        if _active_intervals[interval] == 0:
+            del _active_intervals[interval]
+        sys.setswitchinterval(min([_original_switch_interval, *_active_intervals]))
+
+
+def _frame_name(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_qualname} ({code.co_filename}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Periodically samples the call stack of a thread from a background thread.
+
+    The result is rendered in the collapsed stack format (one `frame;frame;frame count` line per
+    unique stack), which flamegraph.pl, speedscope and inferno consume directly.
+
+    While sampling, the interpreter switch interval is lowered to the sampling interval, otherwise
+    CPU-bound code would hold the GIL (and starve the sampler) for 5 ms at a time.
+
+    Note that the event loop thread also runs other requests' coroutines, so their frames may show
+    up in the profile of a concurrent request.
+    """
+
+    def __init__(self, *, interval: float, thread_id: int | None = None) -> None:
+        self._interval = interval
+        self._thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self._stacks: Counter[str] = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._started = False
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self._interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+            stack: list[str] = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            self._stacks[";".join(reversed(stack))] += 1
+
+    @property
+    def sample_count(self) -> int:
+        return self._stacks.total()
+
+    def start(self) -> None:
+        _acquire_switch_interval(self._interval)
+        self._started = True
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+        if self._started:
+            self._started = False
+            _release_switch_interval(self._interval)
+
+    def __enter__(self) -> Self:
+        self.start()
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.stop()
+
+    def render_collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self._stacks.most_common())
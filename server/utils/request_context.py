@@ -0,0 +1,49 @@
+import dataclasses
+from collections import Counter
+from contextvars import ContextVar
+
+from fastapi.routing import APIRoute
+from starlette.types import Scope
+
+
+@dataclasses.dataclass(kw_only=True)
+class RequestContext:
+    """Per-request state shared between middlewares and database instrumentation."""
+
+    scope: Scope
+    query_budget: int | None = None
+    query_budget_strict: bool = False
+    statements: Counter[str] = dataclasses.field(default_factory=Counter)
+
+    @property
+    def route(self) -> APIRoute | None:
+        route = self.scope.get("route")
+        return route if isinstance(route, APIRoute) else None
+
+    @property
+    def route_path(self) -> str:
+        route = self.route
+        return route.path if route is not None else self.scope.get("path", "")
+
+    @property
+    def operation_id(self) -> str | None:
+        route = self.route
+        return route.operation_id if route is not None else None
+
+    @property
+    def query_count(self) -> int:
+        return self.statements.total()
+
+    def repeated_statements(self) -> dict[str, int]:
+        """Returns fingerprints of statements executed more than once, most frequent first."""
+        return {stmt: count for stmt, count in self.statements.most_common() if count > 1}
+
+
+current_request_context: ContextVar[RequestContext | None] = ContextVar(
+    "current_request_context",
+    default=None,
+)
+
+
+def get_request_context() -> RequestContext | None:
+    return current_request_context.get()
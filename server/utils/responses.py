@@ -0,0 +1,23 @@
+from typing import Any
+
+import pydantic_core
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response encoded by pydantic-core.
+
+    Unlike the stdlib encoder, it serializes Pydantic models, UUIDs, enums and datetimes directly
+    to bytes, so endpoints can hand over models without converting them to dicts first. Given an
+    adapter, the content is serialized as its type, e.g. fields of subclasses are left out.
+    """
+
+    def __init__(self, content: Any, *args: Any, adapter: TypeAdapter | None = None, **kwargs: Any):
+        self._adapter = adapter  # `render` is called by the base constructor
+        super().__init__(content, *args, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        if self._adapter is not None:
+            return self._adapter.dump_json(content)
+        return pydantic_core.to_json(content)
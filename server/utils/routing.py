@@ -0,0 +1,48 @@
+import asyncio
+import functools
+from typing import Any, Callable
+
+from fastapi import Response
+from fastapi.routing import APIRoute
+from pydantic import TypeAdapter
+
+from .responses import FastJSONResponse
+
+
+class FastResponseRoute(APIRoute):
+    """Route encoding returned models straight into a `FastJSONResponse`.
+
+    By default FastAPI dumps a returned model to a dict, validates the dict against the response
+    model again, dumps it once more and encodes the result with the stdlib `json`. Endpoints here
+    return models built by the repositories from trusted data, so all of that is skipped. They are
+    serialized once, as the response model, so the model still leaves out fields it doesn't declare
+    (e.g. ones of a returned subclass) and is used for the OpenAPI schema.
+
+    Headers and status code set on an injected `Response` parameter are honored, the same way
+    FastAPI does. Endpoints returning a `Response` themselves are left untouched.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        super().__init__(path, endpoint, **kwargs)
+        call = self.dependant.call
+        if self.response_field is None or not asyncio.iscoroutinefunction(call):
+            return
+        status_code = self.status_code or 200
+        adapter = TypeAdapter(self.response_model)
+        response_param_name = self.dependant.response_param_name
+
+        @functools.wraps(call)
+        async def call_and_encode(**kwargs: Any) -> Any:
+            content = await call(**kwargs)
+            if isinstance(content, Response):
+                return content
+            response = FastJSONResponse(content, status_code=status_code, adapter=adapter)
+            if response_param_name is not None:
+                sub_response: Response = kwargs[response_param_name]
+                if sub_response.status_code:
+                    response.status_code = sub_response.status_code
+                response.headers.raw.extend(sub_response.headers.raw)
+            return response
+
+        # The request handler built by `APIRoute` looks the endpoint up on the dependant
+        self.dependant.call = call_and_encode
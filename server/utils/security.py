@@ -1,3 +1,6 @@
+import base64
+import hashlib
+import hmac
 import secrets
 
 from passlib.context import CryptContext
@@ -14,3 +17,25 @@ def generate_auth_token() -> str:
 
 def generate_refresh_token() -> str:
     return secrets.token_urlsafe(32)
+
+
+def _sign(secret: bytes, payload: str) -> bytes:
+    digest = hmac.digest(secret, payload.encode(), hashlib.sha256)
+    return base64.urlsafe_b64encode(digest).rstrip(b"=")
+
+
+def sign_access_token(secret: bytes, user_id: str, *, expires_at: int) -> str:
+    """Returns a token carrying the user ID, verifiable with the secret until `expires_at`."""
+    payload = f"{user_id}.{expires_at}"
+    return f"{payload}.{_sign(secret, payload).decode()}"
+
+
+def verify_access_token(secret: bytes, token: str, *, now: float) -> str | None:
+    """Returns the user ID of a token signed with the secret, or None if it's invalid or expired."""
+    payload, _, signature = token.rpartition(".")
+    if not hmac.compare_digest(_sign(secret, payload), signature.encode()):
+        return None
+    user_id, _, expires_at = payload.partition(".")
+    if int(expires_at) <= now:
+        return None
+    return user_id
@@ -2,6 +2,8 @@ import os
 from dataclasses import dataclass
 from typing import Self
 
+from .enums import AuthMode
+
 
 # black has a bug with new type syntax: https://github.com/psf/black/issues/4071
 # fmt: off
@@ -22,6 +24,20 @@ def _get_env[T](
     return type_(value)
 
 
+def _parse_list(value: str) -> tuple[str, ...]:
+    return tuple(item.strip() for item in value.split(",") if item.strip())
+
+
+def _parse_bool(value: str) -> bool:
+    match value.lower():
+        case "1" | "true" | "yes" | "on":
+            return True
+        case "0" | "false" | "no" | "off" | "":
+            return False
+        case _:
+            raise ValueError(f"Invalid boolean value: {value!r}")
+
+
 @dataclass(kw_only=True)
 class Settings:
     postgres_host: str
@@ -37,6 +53,43 @@ class Settings:
 
     invite_code: str | None = None
 
+    auth_mode: AuthMode = AuthMode.REDIS
+    auth_secret: str | None = None
+    auth_access_token_ttl: int = 5 * 60
+
+    sql_query_budget: int | None = None
+    sql_query_budget_strict: bool = False
+
+    slow_query_threshold_ms: float | None = None
+    slow_query_explain_sample_rate: float = 0.0
+
+    profiler_token: str | None = None
+    profiler_interval_ms: float = 1.0
+
+    validate_repo_output: bool = False
+
+    score_offload_threshold: int | None = None
+    score_workers: int = 1
+
+    compression_encodings: tuple[str, ...] = ("zstd", "br", "gzip")
+    compression_min_size: int = 1024
+    compression_gzip_level: int = 5
+    compression_brotli_quality: int = 4
+    compression_zstd_level: int = 3
+
+    idempotency_key_ttl: int = 24 * 60 * 60
+    idempotency_lock_ttl: int = 30
+
+    profile_cache_ttl: int = 5 * 60
+
+    login_throttle_window: int = 60
+    login_throttle_username_limit: int = 5
+    login_throttle_ip_limit: int = 30
+
+    def __post_init__(self) -> None:
+        if self.auth_mode is AuthMode.SIGNED and not self.auth_secret:
+            raise ValueError("AUTH_SECRET is required when AUTH_MODE is signed")
+
     @classmethod
     def from_env(cls) -> Self:
         return cls(
@@ -50,4 +103,107 @@ class Settings:
             redis_db=_get_env("REDIS_DB", int, is_optional=True, default=0),
             redis_password=_get_env("REDIS_PASSWORD", is_optional=True),
             invite_code=_get_env("INVITE_CODE", is_optional=True),
+            auth_mode=_get_env("AUTH_MODE", AuthMode, is_optional=True, default=AuthMode.REDIS),
+            auth_secret=_get_env("AUTH_SECRET", is_optional=True),
+            auth_access_token_ttl=_get_env(
+                "AUTH_ACCESS_TOKEN_TTL",
+                int,
+                is_optional=True,
+                default=5 * 60,
+            ),
+            sql_query_budget=_get_env("SQL_QUERY_BUDGET", int, is_optional=True),
+            sql_query_budget_strict=_get_env(
+                "SQL_QUERY_BUDGET_STRICT",
+                _parse_bool,
+                is_optional=True,
+                default=False,
+            ),
+            slow_query_threshold_ms=_get_env("SLOW_QUERY_THRESHOLD_MS", float, is_optional=True),
+            slow_query_explain_sample_rate=_get_env(
+                "SLOW_QUERY_EXPLAIN_SAMPLE_RATE",
+                float,
+                is_optional=True,
+                default=0.0,
+            ),
+            profiler_token=_get_env("PROFILER_TOKEN", is_optional=True),
+            profiler_interval_ms=_get_env(
+                "PROFILER_INTERVAL_MS",
+                float,
+                is_optional=True,
+                default=1.0,
+            ),
+            validate_repo_output=_get_env(
+                "VALIDATE_REPO_OUTPUT",
+                _parse_bool,
+                is_optional=True,
+                default=False,
+            ),
+            score_offload_threshold=_get_env("SCORE_OFFLOAD_THRESHOLD", int, is_optional=True),
+            score_workers=_get_env("SCORE_WORKERS", int, is_optional=True, default=1),
+            compression_encodings=_get_env(
+                "COMPRESSION_ENCODINGS",
+                _parse_list,
+                is_optional=True,
+                default=("zstd", "br", "gzip"),
+            ),
+            compression_min_size=_get_env(
+                "COMPRESSION_MIN_SIZE",
+                int,
+                is_optional=True,
+                default=1024,
+            ),
+            compression_gzip_level=_get_env(
+                "COMPRESSION_GZIP_LEVEL",
+                int,
+                is_optional=True,
+                default=5,
+            ),
+            compression_brotli_quality=_get_env(
+                "COMPRESSION_BROTLI_QUALITY",
+                int,
+                is_optional=True,
+                default=4,
+            ),
+            compression_zstd_level=_get_env(
+                "COMPRESSION_ZSTD_LEVEL",
+                int,
+                is_optional=True,
+                default=3,
+            ),
+            idempotency_key_ttl=_get_env(
+                "IDEMPOTENCY_KEY_TTL",
+                int,
+                is_optional=True,
+                default=24 * 60 * 60,
+            ),
+            idempotency_lock_ttl=_get_env(
+                "IDEMPOTENCY_LOCK_TTL",
+                int,
+                is_optional=True,
+                default=30,
+            ),
+            profile_cache_ttl=_get_env(
+                "PROFILE_CACHE_TTL",
+                int,
+                is_optional=True,
+                default=5 * 60,
+            ),
+            login_throttle_window=_get_env(
+                "LOGIN_THROTTLE_WINDOW",
+                int,
+                is_optional=True,
+                default=60,
+            ),
+            login_throttle_username_limit=_get_env(
+                "LOGIN_THROTTLE_USERNAME_LIMIT",
+                int,
+                is_optional=True,
+                default=5,
+            ),
+            login_throttle_ip_limit=_get_env(
+                "LOGIN_THROTTLE_IP_LIMIT",
+                int,
+                is_optional=True,
+                default=30,
+            ),
         )